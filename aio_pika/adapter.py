@@ -9,10 +9,11 @@ LOGGER = logging.getLogger(__name__)
 
 
 class IOLoopAdapter:
-    __slots__ = 'loop',
+    __slots__ = 'loop', 'handlers'
 
     def __init__(self, loop: asyncio.AbstractEventLoop):
         self.loop = loop
+        self.handlers = {}
 
     def add_timeout(self, deadline, callback_method):
         return self.loop.call_later(deadline, callback_method)
@@ -22,17 +23,28 @@ class IOLoopAdapter:
         return handle.cancel()
 
     def add_handler(self, fd, cb, event_state):
-        if event_state & base_connection.BaseConnection.READ:
-            self.loop.add_reader(fd, partial(cb, fd=fd, events=base_connection.BaseConnection.READ))
-        if event_state & base_connection.BaseConnection.WRITE:
-            self.loop.add_writer(fd, partial(cb, fd=fd, events=base_connection.BaseConnection.WRITE))
+        self.handlers[fd] = cb
+        self.update_handler(fd, event_state)
 
     def remove_handler(self, fd):
+        self.handlers.pop(fd, None)
         self.loop.remove_reader(fd)
         self.loop.remove_writer(fd)
 
     def update_handler(self, fd, event_state):
-        raise NotImplementedError()
+        # pika asks for WRITE events while the outbound buffer
+        # isn't flushed (partial socket write) and drops them after
+        cb = self.handlers[fd]
+
+        if event_state & base_connection.BaseConnection.READ:
+            self.loop.add_reader(fd, partial(cb, fd=fd, events=base_connection.BaseConnection.READ))
+        else:
+            self.loop.remove_reader(fd)
+
+        if event_state & base_connection.BaseConnection.WRITE:
+            self.loop.add_writer(fd, partial(cb, fd=fd, events=base_connection.BaseConnection.WRITE))
+        else:
+            self.loop.remove_writer(fd)
 
     def start(self):
         return True
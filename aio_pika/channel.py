@@ -1,11 +1,19 @@
 import asyncio
 import pika.channel
+import pika.exceptions
+import pika.frame
+import pika.spec
+from collections import OrderedDict
 from logging import getLogger
+from time import perf_counter
 from types import FunctionType
 from . import exceptions
 from .exchange import Exchange, ExchangeType
 from .queue import Queue
 from .common import BaseChannel, FutureStore, ConfirmationTypes
+from .compression import Compression
+from .instrumentation import Stage
+from .metrics import ChannelMetrics
 
 
 log = getLogger(__name__)
@@ -15,22 +23,31 @@ class Channel(BaseChannel):
     """ Channel abstraction """
 
     __slots__ = ('__connection', '__closing', '__confirmations', '__delivery_tag',
-                 'loop', '_futures', '__channel', 'default_exchange')
+                 'loop', '_futures', '__channel', 'default_exchange', 'publisher_confirms',
+                 'metrics', 'compression')
 
     def __init__(self, connection,
-                 loop: asyncio.AbstractEventLoop, future_store: FutureStore):
+                 loop: asyncio.AbstractEventLoop, future_store: FutureStore, publisher_confirms: bool = True,
+                 compression: Compression = None):
         """
 
         :param connection: :class:`aio_pika.adapter.AsyncioConnection` instance
         :param loop: Event loop (:func:`asyncio.get_event_loop()` when :class:`None`)
         :param future_store: :class:`aio_pika.common.FutureStore` instance
+        :param publisher_confirms: when :class:`False` the publishing doesn't wait for the broker \
+        confirmation (fire and forget)
+        :param compression: :class:`aio_pika.compression.Compression` of the published messages
         """
         super().__init__(loop, future_store.get_child())
 
         self.__channel = None  # type: pika.channel.Channel
         self.__connection = connection
-        self.__confirmations = {}
+        # Delivery tags are added in the ascending order
+        self.__confirmations = OrderedDict()
         self.__delivery_tag = 0
+        self.publisher_confirms = publisher_confirms
+        self.compression = compression
+        self.metrics = ChannelMetrics(self.__confirmations)
 
         self.default_exchange = Exchange(
             self.__channel,
@@ -42,6 +59,10 @@ class Channel(BaseChannel):
             arguments=None,
             loop=self.loop,
             future_store=self._futures.get_child(),
+            loopback=connection.loopback,
+            observer=connection.observer,
+            publish_nowait_method=self._publish_nowait,
+            publish_many_method=self._publish_many,
         )
 
     def __str__(self):
@@ -55,7 +76,19 @@ class Channel(BaseChannel):
         log.error("Channel %r closed: %d - %s", channel, code, reason)
 
         self._futures.reject_all(exc)
-        self._closing.set_exception(exc)
+        self.__connection.metrics.channels.pop(self.metrics, None)
+
+        for confirmation in self.__confirmations.values():
+            if confirmation is not None and not isinstance(confirmation, asyncio.Future):
+                self.loop.call_soon(confirmation, exc)
+
+        self.__confirmations.clear()
+
+        if self.__connection.loopback is not None:
+            self.__connection.loopback.remove_owner(channel)
+
+        if not self._closing.done():
+            self._closing.set_exception(exc)
 
     def add_close_callback(self, callback: FunctionType):
         self._closing.add_done_callback(lambda r: callback(r))
@@ -70,31 +103,86 @@ class Channel(BaseChannel):
         self.__connection._connection.channel(future.set_result)
 
         channel = yield from future  # type: pika.channel.Channel
-        channel.confirm_delivery(self._on_delivery_confirmation)
+
+        if self.publisher_confirms:
+            channel.confirm_delivery(self._on_delivery_confirmation)
+
         channel.add_on_close_callback(self._on_channel_close)
+        channel.add_on_return_callback(self._on_return)
 
         self.__channel = channel
 
+        self.metrics.channel_number = channel.channel_number
+        self.__connection.metrics.channels[self.metrics] = None
+
+    def _on_return(self, channel: pika.channel.Channel, method, properties, body: bytes):
+        log.warning("Message returned by the broker: %d - %s", method.reply_code, method.reply_text)
+        self.metrics.returned += 1
+
     def _on_delivery_confirmation(self, method_frame):
-        future = self.__confirmations.pop(method_frame.method.delivery_tag, None)
+        method = method_frame.method
+
+        if method.multiple:
+            # The acknowledged tags are at the front
+            delivery_tags = []
+
+            for delivery_tag in self.__confirmations:
+                if delivery_tag > method.delivery_tag:
+                    break
+
+                delivery_tags.append(delivery_tag)
+        else:
+            delivery_tags = (method.delivery_tag,)
 
-        if not future:
+        try:
+            confirmation_type = ConfirmationTypes(method.NAME.split('.')[1].lower())
+        except ValueError:
+            confirmation_type = None
+
+        for delivery_tag in delivery_tags:
+            self._on_message_confirmation(method_frame, delivery_tag, confirmation_type)
+
+    def _on_message_confirmation(self, method_frame, delivery_tag: int, confirmation_type: ConfirmationTypes):
+        if delivery_tag not in self.__confirmations:
             log.warning(
                 "Unknown delivery tag %d for message confirmation \"%s\"",
-                method_frame.method.delivery_tag, method_frame.method.NAME)
+                delivery_tag, method_frame.method.NAME)
             return
 
-        try:
-            confirmation_type = ConfirmationTypes(method_frame.method.NAME.split('.')[1].lower())
+        # Future of Channel._publish or callback of Channel._publish_nowait
+        confirmation = self.__confirmations.pop(delivery_tag)
 
-            if confirmation_type == ConfirmationTypes.ACK:
-                future.set_result(True)
-            elif confirmation_type == ConfirmationTypes.NACK:
-                future.set_exception(exceptions.NackError(method_frame))
-        except ValueError:
-            future.set_exception(RuntimeError('Unknown method frame', method_frame))
-        except Exception as e:
-            future.set_exception(e)
+        if self.__connection.observer is not None:
+            self.__connection.observer(
+                Stage.CONFIRM_RECEIVED, self.__channel.channel_number, delivery_tag, perf_counter()
+            )
+
+        if confirmation_type == ConfirmationTypes.ACK:
+            self.metrics.confirmed += 1
+            exc = None
+        elif confirmation_type == ConfirmationTypes.NACK:
+            self.metrics.nacked += 1
+            exc = exceptions.NackError([method_frame])
+        else:
+            exc = RuntimeError('Unknown method frame', method_frame)
+
+        if isinstance(confirmation, asyncio.Future):
+            if confirmation.done():
+                return
+            elif exc is None:
+                confirmation.set_result(True)
+            else:
+                confirmation.set_exception(exc)
+        elif confirmation is not None:
+            try:
+                confirmation(exc)
+            except Exception:
+                log.exception("Unhandled exception in the confirmation callback of message %d", delivery_tag)
+        elif exc is not None:
+            log.error(
+                "Message %d published without confirmation callback is not confirmed: %s",
+                delivery_tag, method_frame.method.NAME
+            )
 
     @BaseChannel._ensure_channel_is_open
     @asyncio.coroutine
@@ -119,6 +207,8 @@ class Channel(BaseChannel):
             self.__channel, self._publish, name, type,
             durable=durable, auto_delete=auto_delete, arguments=arguments,
             loop=self.loop, future_store=self._futures.get_child(),
+            loopback=self.__connection.loopback, observer=self.__connection.observer,
+            publish_nowait_method=self._publish_nowait, publish_many_method=self._publish_many,
         )
 
         log.debug("Exchange declared %r", exchange)
@@ -127,29 +217,179 @@ class Channel(BaseChannel):
 
     @BaseChannel._ensure_channel_is_open
     @asyncio.coroutine
-    def _publish(self, queue_name, routing_key, body, properties, mandatory, immediate):
+    def _publish(self, queue_name, routing_key, body, properties, mandatory, immediate, enqueued=None):
+        observer = self.__connection.observer
+
+        if observer is not None and enqueued is None:
+            enqueued = perf_counter()
+
         while self.__connection.is_closed:
             log.debug("Can't publish message because connection is inactive")
             yield from asyncio.sleep(1, loop=self.loop)
 
+        if self.compression is not None:
+            body = self.compression.compress(body, properties)
+
+        if not self.publisher_confirms:
+            try:
+                result = self.__channel.basic_publish(
+                    queue_name, routing_key, body, properties, mandatory, immediate
+                )
+            except (AttributeError, RuntimeError) as exc:
+                self._on_publish_error(exc)
+                raise exceptions.ChannelClosed(-1, exc) from exc
+
+            self.metrics.published += 1
+
+            if observer is not None:
+                self._observe_publish(observer, None, enqueued)
+
+            return result
+
         f = self._create_future()
 
         try:
             self.__channel.basic_publish(queue_name, routing_key, body, properties, mandatory, immediate)
         except (AttributeError, RuntimeError) as exc:
-            log.exception("Failed to send data to client. Conection unexpected closed.")
-            self._on_channel_close(self.__channel, -1, exc)
-            self.__connection.close(reply_code=500, reply_text="Incorrect state")
+            self._on_publish_error(exc)
         else:
             self.__delivery_tag += 1
             self.__confirmations[self.__delivery_tag] = f
+            self.metrics.published += 1
+
+            if observer is not None:
+                self._observe_publish(observer, self.__delivery_tag, enqueued)
 
         return (yield from f)
 
+    def _on_publish_error(self, exc: Exception):
+        log.exception("Failed to send data to client. Conection unexpected closed.")
+        self._on_channel_close(self.__channel, -1, exc)
+        self.__connection._connection.close(reply_code=500, reply_text="Incorrect state")
+
+    @BaseChannel._ensure_channel_is_open
+    def _publish_nowait(self, queue_name, routing_key, body, properties, mandatory, immediate, callback=None,
+                        enqueued=None):
+        observer = self.__connection.observer
+
+        if observer is not None and enqueued is None:
+            enqueued = perf_counter()
+
+        if callback is not None and not self.publisher_confirms:
+            raise RuntimeError("Confirmation callback requires the channel with publisher confirms")
+
+        if not self.__channel.is_open:
+            raise pika.exceptions.ChannelClosed()
+
+        if self.compression is not None:
+            body = self.compression.compress(body, properties)
+
+        try:
+            self.__channel.basic_publish(queue_name, routing_key, body, properties, mandatory, immediate)
+        except (AttributeError, RuntimeError) as exc:
+            self._on_publish_error(exc)
+            raise exceptions.ChannelClosed(-1, exc) from exc
+
+        self.metrics.published += 1
+
+        if not self.publisher_confirms:
+            delivery_tag = None
+        else:
+            self.__delivery_tag += 1
+            delivery_tag = self.__delivery_tag
+            self.__confirmations[delivery_tag] = callback
+
+        if observer is not None:
+            self._observe_publish(observer, delivery_tag, enqueued)
+
+        return delivery_tag
+
+    @BaseChannel._ensure_channel_is_open
+    def _publish_many(self, queue_name, routing_keys, body, properties, mandatory, immediate,
+                      enqueued=None) -> list:
+        """ Publish the message to every routing key with one write. The content header and body
+        frames are marshaled once and repeated after the ``basic.publish`` frame of each routing key.
+
+        :return: :class:`list` of the confirmation futures (:class:`None` without publisher confirms)
+        """
+
+        observer = self.__connection.observer
+
+        if observer is not None and enqueued is None:
+            enqueued = perf_counter()
+
+        if not self.__channel.is_open:
+            raise pika.exceptions.ChannelClosed()
+
+        if self.compression is not None:
+            body = self.compression.compress(body, properties)
+
+        # The frames are written to the pika connection directly, so this depends on
+        # the private API of pika<0.11 (pinned in setup.py): check it when bumping the pin
+        connection = self.__channel.connection
+
+        if connection.is_closed:
+            log.critical("Attempted to publish when the connection is closed")
+            raise exceptions.ConnectionClosed()
+
+        channel_number = self.__channel.channel_number
+        step = connection._body_max_length
+
+        content = [pika.frame.Header(channel_number, len(body), properties).marshal()]
+
+        for offset in range(0, len(body), step):
+            content.append(pika.frame.Body(channel_number, body[offset:offset + step]).marshal())
+
+        frames = []
+
+        for routing_key in routing_keys:
+            frames.append(pika.frame.Method(channel_number, pika.spec.Basic.Publish(
+                exchange=queue_name, routing_key=routing_key, mandatory=mandatory, immediate=immediate,
+            )).marshal())
+            frames.extend(content)
+
+        # Like pika.connection.Connection._send_message does for one message
+        with connection._write_lock:
+            connection.outbound_buffer += frames
+            connection.frames_sent += len(frames)
+            connection._flush_outbound()
+
+            if connection.params.backpressure_detection:
+                connection._detect_backpressure()
+
+        self.metrics.published += len(routing_keys)
+
+        if not self.publisher_confirms:
+            if observer is not None:
+                for _ in routing_keys:
+                    self._observe_publish(observer, None, enqueued)
+
+            return [None] * len(routing_keys)
+
+        futures = []
+
+        for _ in routing_keys:
+            self.__delivery_tag += 1
+            f = self._create_future()
+            self.__confirmations[self.__delivery_tag] = f
+            futures.append(f)
+
+            if observer is not None:
+                self._observe_publish(observer, self.__delivery_tag, enqueued)
+
+        return futures
+
+    def _observe_publish(self, observer, delivery_tag, enqueued):
+        # basic_publish writes the frames to the socket before returning
+        written = perf_counter()
+        observer(Stage.PUBLISH_ENQUEUED, self.__channel.channel_number, delivery_tag, enqueued)
+        observer(Stage.FRAMES_WRITTEN, self.__channel.channel_number, delivery_tag, written)
+
     @BaseChannel._ensure_channel_is_open
     @asyncio.coroutine
     def declare_queue(self, name: str = None, *, durable: bool = None, exclusive: bool = False,
-                      auto_delete: bool = False, arguments: dict = None, timeout: int = None) -> Queue:
+                      auto_delete: bool = False, arguments: dict = None, passive: bool = False,
+                      timeout: int = None) -> Queue:
         """
 
         :param name: queue name
@@ -159,6 +399,8 @@ class Channel(BaseChannel):
         closes. Passive declaration of an exclusive queue by other connections are not allowed.
         :param auto_delete: Delete queue when channel will be closed.
         :param arguments: pika additional arguments
+        :param passive: Only check the queue exists and fetch its message and consumer counters. \
+        The broker closes the channel when the queue does not exist.
         :param timeout: execution timeout
         :return: :class:`aio_pika.queue.Queue` instance
         """
@@ -168,15 +410,38 @@ class Channel(BaseChannel):
 
         queue = Queue(
             self.loop, self._futures.get_child(), self.__channel, name,
-            durable, exclusive, auto_delete, arguments
+            durable, exclusive, auto_delete, arguments,
+            loopback=self.__connection.loopback, observer=self.__connection.observer,
+            timing=self.__connection.handler_timing, metrics=self.metrics,
         )
 
-        yield from queue.declare(timeout)
+        yield from queue.declare(timeout, passive=passive)
         return queue
 
+    @BaseChannel._ensure_channel_is_open
+    def get_queue(self, name: str) -> Queue:
+        """ Returns queue instance without declaration. Useful for the queues which
+        can't or shouldn't be declared, like RabbitMQ ``amq.rabbitmq.reply-to`` pseudo-queue.
+
+        :param name: queue name
+        :return: :class:`aio_pika.queue.Queue` instance
+        """
+
+        return Queue(
+            self.loop, self._futures.get_child(), self.__channel, name,
+            None, False, False, None,
+            loopback=self.__connection.loopback, observer=self.__connection.observer,
+            timing=self.__connection.handler_timing, metrics=self.metrics,
+        )
+
     @BaseChannel._ensure_channel_is_open
     @asyncio.coroutine
     def close(self) -> None:
+        self.__connection.metrics.channels.pop(self.metrics, None)
+
+        if self.__connection.loopback is not None:
+            self.__connection.loopback.remove_owner(self.__channel)
+
         self.__channel.close()
 
         if not self._closing.done():
@@ -184,6 +449,35 @@ class Channel(BaseChannel):
 
         self.__channel = None
 
+    @BaseChannel._ensure_channel_is_open
+    def ack(self, delivery_tag: int):
+        """ Acknowledge one message received with :func:`aio_pika.queue.Queue.consume` ``(raw=True)``
+
+        :param delivery_tag: delivery tag passed to the consumer callback
+        """
+
+        self.__channel.basic_ack(delivery_tag=delivery_tag)
+
+    @BaseChannel._ensure_channel_is_open
+    def ack_multiple(self, delivery_tag: int):
+        """ Acknowledge all unacknowledged messages of the channel up to and including the delivery tag
+        with one ``basic.ack`` frame
+
+        :param delivery_tag: delivery tag of the last processed message
+        """
+
+        self.__channel.basic_ack(delivery_tag=delivery_tag, multiple=True)
+
+    @BaseChannel._ensure_channel_is_open
+    def reject(self, delivery_tag: int, requeue: bool = False):
+        """ Reject one message received with :func:`aio_pika.queue.Queue.consume` ``(raw=True)``
+
+        :param delivery_tag: delivery tag passed to the consumer callback
+        :param requeue: return the message to the queue instead of dropping it
+        """
+
+        self.__channel.basic_reject(delivery_tag=delivery_tag, requeue=requeue)
+
     @BaseChannel._ensure_channel_is_open
     def set_qos(self, prefetch_count: int = 0, prefetch_size: int = 0, all_channels=False, timeout: int = None):
         f = self._create_future(timeout=timeout)
@@ -4,6 +4,7 @@ import pika.exceptions
 from logging import getLogger
 from functools import wraps
 from enum import Enum, unique
+from weakref import WeakSet
 from .tools import create_future
 
 
@@ -32,16 +33,28 @@ def future_with_timeout(loop, timeout, future=None):
 
 
 class FutureStore:
-    __slots__ = "__collection", "__loop", "__main_store"
+    """ Hierarchical registry of the pending futures.
+
+    Every future is registered once, in the store which created it, and removed by the single
+    done callback. Parent stores keep their children in a weak set, so :func:`FutureStore.reject_all`
+    rejects the futures of the whole subtree while the stores of the forgotten
+    exchanges and queues are collected. The pending future keeps its store and
+    the store keeps its parents alive.
+    """
+
+    __slots__ = "__collection", "__loop", "__main_store", "__children", "__weakref__"
 
     def __init__(self, loop: asyncio.AbstractEventLoop, main_store: 'FutureStore'=None):
         self.__main_store = main_store
         self.__collection = set()
+        self.__children = WeakSet()
         self.__loop = loop or asyncio.get_event_loop()
 
+        if main_store is not None:
+            main_store.__children.add(self)
+
     def _on_future_done(self, future):
-        if future in self.__collection:
-            self.__collection.remove(future)
+        self.__collection.discard(future)
 
     @staticmethod
     def _reject_future(future: asyncio.Future, exception: Exception):
@@ -51,17 +64,18 @@ class FutureStore:
         future.set_exception(exception)
 
     def add(self, future: asyncio.Future):
-        if self.__main_store:
-            self.__main_store.add(future)
-
         self.__collection.add(future)
         future.add_done_callback(self._on_future_done)
 
     def reject_all(self, exception: Exception):
-        for future in list(self.__collection):
-            self.__collection.remove(future)
+        for future in self.__collection:
             self.__loop.call_soon(self._reject_future, future, exception)
 
+        self.__collection.clear()
+
+        for child in list(self.__children):
+            child.reject_all(exception)
+
     @staticmethod
     def _on_timeout(future: asyncio.Future):
         if future.done():
@@ -71,12 +85,7 @@ class FutureStore:
 
     def create_future(self, timeout=None):
         future = future_with_timeout(self.__loop, timeout)
-
         self.add(future)
-
-        if self.__main_store:
-            self.__main_store.add(future)
-
         return future
 
     def get_child(self):
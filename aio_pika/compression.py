@@ -0,0 +1,320 @@
+import hashlib
+import zlib
+from collections import Counter
+from logging import getLogger
+from typing import Iterable
+
+from pika import BasicProperties
+
+from .exceptions import DecompressionLimitError
+
+
+log = getLogger(__name__)
+
+#: Default limit of the decompressed body size in bytes
+MAX_SIZE = 64 * 1024 * 1024
+
+
+class Codec:
+    """ Compression algorithm of one ``content_encoding`` value. Subclass it and pass
+    the instance to :func:`register` to support another algorithm.
+
+    The decompressed body is limited by ``max_size`` bytes (:class:`None` for no limit),
+    so a small malicious message can't expand into the whole memory:
+
+        >>> CODECS['gzip'].max_size = 16 * 1024 * 1024
+
+    """
+
+    __slots__ = 'name', 'max_size'
+
+    def __init__(self, name: str, *, max_size: int = MAX_SIZE):
+        self.name = name
+        self.max_size = max_size
+
+    def __repr__(self):
+        return "<%s: %s>" % (self.__class__.__name__, self.name)
+
+    def compress(self, body: bytes, level: int, properties: BasicProperties) -> bytes:
+        """ Compress the body of the published message
+
+        :param body: message body
+        :param level: compression level
+        :param properties: properties of the message, the codec may add the headers it needs
+        """
+        raise NotImplementedError
+
+    def decompress(self, body: bytes, properties: BasicProperties) -> bytes:
+        """ Decompress the body of the received message
+
+        :raises aio_pika.exceptions.DecompressionLimitError: when the body exceeds ``max_size``
+        """
+        raise NotImplementedError
+
+
+def _inflate(decompressor, body: bytes, max_size: int, name: str) -> bytes:
+    # The output is never expanded beyond one byte over the limit, the rest of the input is left
+    # unconsumed. The extra byte tells the body of exactly max_size bytes from the larger one.
+    result = decompressor.decompress(body, max_size + 1 if max_size else 0)
+
+    if max_size and len(result) > max_size:
+        raise DecompressionLimitError("Decompressed body exceeds %d bytes" % max_size)
+
+    if not decompressor.eof:
+        raise zlib.error("Truncated %s stream" % name)
+
+    return result
+
+
+class DeflateCodec(Codec):
+    """ zlib stream, ``content_encoding`` ``deflate`` """
+
+    __slots__ = ()
+
+    def compress(self, body: bytes, level: int, properties: BasicProperties) -> bytes:
+        return zlib.compress(body, level)
+
+    def decompress(self, body: bytes, properties: BasicProperties) -> bytes:
+        return _inflate(zlib.decompressobj(), body, self.max_size, 'deflate')
+
+
+class GzipCodec(Codec):
+    """ gzip file format, ``content_encoding`` ``gzip`` """
+
+    __slots__ = ()
+
+    # zlib writes the gzip header itself, it's much cheaper than gzip.GzipFile for small bodies
+    WBITS = 16 + zlib.MAX_WBITS
+
+    def compress(self, body: bytes, level: int, properties: BasicProperties) -> bytes:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, self.WBITS)
+        return compressor.compress(body) + compressor.flush()
+
+    def decompress(self, body: bytes, properties: BasicProperties) -> bytes:
+        return _inflate(zlib.decompressobj(self.WBITS), body, self.max_size, 'gzip')
+
+
+class DictionaryCodec(Codec):
+    """ Raw deflate with the preset dictionary (``zdict``) shared by the publishers and the consumers.
+
+    Small structured messages barely compress alone, but most of their bytes (field names,
+    enumerations) are found in the dictionary trained on the sample messages (see :func:`train`).
+    The dictionary id is sent in the :attr:`HEADER` header, so the consumer decompresses the messages
+    compressed with any dictionary it has:
+
+        >>> dictionary_id = ZDICT.add(train(samples))
+        >>> channel = yield from connection.channel(compression=Compression(ZDICT.name, threshold=0))
+
+    """
+
+    __slots__ = 'dictionaries', 'default', '_compressors',
+
+    HEADER = 'x-zdict-id'
+
+    def __init__(self, name: str, *, max_size: int = MAX_SIZE):
+        super().__init__(name, max_size=max_size)
+
+        #: dictionary id: dictionary
+        self.dictionaries = {}
+        self.default = None
+
+        # (dictionary id, level): compressor primed with the dictionary
+        self._compressors = {}
+
+    def add(self, zdict: bytes, dictionary_id: str = None, *, default: bool = True) -> str:
+        """ Register the dictionary
+
+        :param zdict: dictionary, see :func:`train`
+        :param dictionary_id: id sent with the messages, the hash of the dictionary when omitted
+        :param default: compress the published messages with this dictionary
+        :return: dictionary id
+        """
+
+        if dictionary_id is None:
+            dictionary_id = hashlib.sha1(zdict).hexdigest()[:8]
+
+        self.dictionaries[dictionary_id] = bytes(zdict)
+
+        for key in [key for key in self._compressors if key[0] == dictionary_id]:
+            del self._compressors[key]
+
+        if default:
+            self.default = dictionary_id
+
+        return dictionary_id
+
+    def compress(self, body: bytes, level: int, properties: BasicProperties) -> bytes:
+        if self.default is None:
+            raise RuntimeError("No default dictionary of %r" % self)
+
+        primed = self._compressors.get((self.default, level))
+
+        if primed is None:
+            primed = self._compressors[self.default, level] = zlib.compressobj(
+                level, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=self.dictionaries[self.default]
+            )
+
+        # Copying the state is about twice cheaper than loading the dictionary again
+        compressor = primed.copy()
+
+        # The headers dict may be shared with the Message
+        properties.headers = dict(properties.headers or {})
+        properties.headers[self.HEADER] = self.default
+
+        return compressor.compress(body) + compressor.flush()
+
+    def decompress(self, body: bytes, properties: BasicProperties) -> bytes:
+        dictionary_id = (properties.headers or {}).get(self.HEADER)
+
+        if isinstance(dictionary_id, bytes):
+            dictionary_id = dictionary_id.decode()
+
+        if dictionary_id not in self.dictionaries:
+            raise KeyError("Unknown dictionary: %r" % dictionary_id)
+
+        decompressor = zlib.decompressobj(-zlib.MAX_WBITS, zdict=self.dictionaries[dictionary_id])
+        return _inflate(decompressor, body, self.max_size, 'deflate')
+
+
+def train(samples: Iterable[bytes], size: int = 16 * 1024, segment: int = 8) -> bytes:
+    """ Build the preset dictionary from the sample messages.
+
+    The samples covering the most frequent substrings are chosen greedily until the dictionary
+    is full. The most useful ones are placed at the end, where deflate references are the shortest.
+
+    :param samples: message bodies similar to the published ones
+    :param size: maximal dictionary size in bytes (deflate window is 32 KiB)
+    :param segment: length of the substrings counted in the samples
+    :return: dictionary for :func:`DictionaryCodec.add`
+    """
+
+    samples = list({bytes(sample) for sample in samples if sample})
+    segments = [
+        {sample[i:i + segment] for i in range(max(1, len(sample) - segment + 1))}
+        for sample in samples
+    ]
+
+    # How many samples contain the substring
+    counts = Counter()
+
+    for sample_segments in segments:
+        counts.update(sample_segments)
+
+    chosen = []
+    length = 0
+    covered = set()
+    candidates = set(range(len(samples)))
+
+    while candidates and length < size:
+        scores = {
+            i: sum(counts[s] - 1 for s in segments[i] - covered) / len(samples[i])
+            for i in candidates
+        }
+
+        best = max(scores, key=scores.get)
+
+        if scores[best] <= 0:
+            break
+
+        candidates.remove(best)
+        covered |= segments[best]
+        chosen.append(samples[best])
+        length += len(samples[best])
+
+    return b''.join(reversed(chosen))[-size:]
+
+
+#: content_encoding: :class:`Codec`
+CODECS = {}
+
+
+def register(codec: Codec):
+    """ Decompress the received messages with the codec and allow :class:`Compression` to use it """
+
+    CODECS[codec.name] = codec
+
+
+register(DeflateCodec('deflate'))
+register(GzipCodec('gzip'))
+
+#: Registry of the preset dictionaries, ``content_encoding`` ``x-zdict``
+ZDICT = DictionaryCodec('x-zdict')
+register(ZDICT)
+
+
+def decompress(body: bytes, properties: BasicProperties):
+    """ Decompress the body when the ``content_encoding`` of the message has the registered codec.
+    The body which can't be decompressed is returned as is.
+
+    :return: :class:`tuple` of the body and the ``content_encoding`` left after the decompression
+    :raises aio_pika.exceptions.DecompressionLimitError: when the body exceeds ``max_size`` of the codec, \
+    the message must be rejected
+    """
+
+    codec = CODECS.get(properties.content_encoding)
+
+    if codec is None:
+        return body, properties.content_encoding
+
+    try:
+        return codec.decompress(body, properties), None
+    except DecompressionLimitError:
+        raise
+    except Exception:
+        log.exception("Can't decompress message body with %r", codec)
+        return body, properties.content_encoding
+
+
+class Compression:
+    """ Compression of the published messages. Pass it to :func:`aio_pika.connection.Connection.channel`:
+
+        >>> channel = yield from connection.channel(compression=Compression('gzip', threshold=1024))
+
+    Only the bodies of at least ``threshold`` bytes are compressed. The message is sent uncompressed
+    when the compressed body isn't smaller or when it already has the ``content_encoding``.
+    """
+
+    __slots__ = 'codec', 'threshold', 'level',
+
+    def __init__(self, encoding: str = 'gzip', *, threshold: int = 1024, level: int = 6):
+        """ Creates a new instance of :class:`Compression`
+
+        :param encoding: ``content_encoding`` of the registered :class:`Codec`
+        :param threshold: minimal body size in bytes
+        :param level: compression level passed to the codec
+        """
+
+        if encoding not in CODECS:
+            raise ValueError("Unknown content encoding: %r" % encoding)
+
+        self.codec = CODECS[encoding]
+        self.threshold = threshold
+        self.level = level
+
+    def __repr__(self):
+        return "<Compression: %s threshold=%d level=%d>" % (self.codec.name, self.threshold, self.level)
+
+    def compress(self, body: bytes, properties: BasicProperties) -> bytes:
+        """ Compress the body and set ``content_encoding`` of the properties
+
+        :return: body to publish
+        """
+
+        if len(body) < self.threshold or properties.content_encoding:
+            return body
+
+        headers = properties.headers
+        compressed = self.codec.compress(body, self.level, properties)
+
+        if len(compressed) >= len(body):
+            properties.headers = headers
+            return body
+
+        properties.content_encoding = self.codec.name
+        return compressed
+
+
+__all__ = (
+    'CODECS', 'Codec', 'Compression', 'DeflateCodec', 'DictionaryCodec', 'GzipCodec', 'MAX_SIZE', 'ZDICT',
+    'decompress', 'register', 'train',
+)
@@ -2,7 +2,7 @@ import asyncio
 import warnings
 from functools import wraps
 from logging import getLogger
-from typing import Callable
+from typing import Callable, Iterable
 
 from pika import ConnectionParameters
 from pika.credentials import PlainCredentials
@@ -10,6 +10,9 @@ from pika.spec import REPLY_SUCCESS
 from yarl import URL
 from .channel import Channel
 from .common import FutureStore
+from .compression import Compression
+from .loopback import Loopback
+from .metrics import ConnectionMetrics
 from .tools import copy_future
 from .adapter import AsyncioConnection
 
@@ -34,15 +37,19 @@ class Connection:
     __slots__ = (
         'loop', '__closing', '_connection', '_futures', '__sender_lock',
         '_io_loop', '__connecting', '__connection_parameters', '__credentials',
-        '__connection_lock',
+        '__connection_lock', 'loopback', 'observer', 'handler_timing', 'metrics',
     )
 
     def __init__(self, host: str = 'localhost', port: int = 5672, login: str = 'guest',
                  password: str = 'guest', virtual_host: str = '/',
-                 ssl: bool = False, *, loop=None, **kwargs):
+                 ssl: bool = False, *, loop=None, loopback: Iterable[str] = None,
+                 observer: Callable = None, handler_timing: bool = False, **kwargs):
 
         self.loop = loop if loop else asyncio.get_event_loop()
         self._futures = FutureStore(loop=self.loop)
+        self.loopback = Loopback(loopback, loop=self.loop) if loopback is not None else None
+        self.observer = observer
+        self.handler_timing = handler_timing
 
         self.__credentials = PlainCredentials(login, password) if login else None
 
@@ -55,6 +62,8 @@ class Connection:
             **kwargs
         )
 
+        self.metrics = ConnectionMetrics(str(self))
+
         self._connection = None
         self.__connection_lock = asyncio.Lock(loop=self.loop)
         self.__connecting = self._futures.create_future()
@@ -149,14 +158,21 @@ class Connection:
             log.debug("Connection ready: %r", self)
 
             self._connection = connection
+            self.metrics.connected(connection)
 
     @_ensure_connection
     @asyncio.coroutine
-    def channel(self) -> Channel:
-        """ Get a channel """
+    def channel(self, publisher_confirms: bool = True, compression: Compression = None) -> Channel:
+        """ Get a channel
+
+        :param publisher_confirms: wait for the broker confirmation of every published message
+        :param compression: :class:`aio_pika.compression.Compression` of the messages published \
+        through the channel
+        """
         log.debug("Creating AMQP channel for conneciton: %r", self)
 
-        channel = Channel(self, self.loop, self._futures)
+        channel = Channel(self, self.loop, self._futures, publisher_confirms=publisher_confirms,
+                          compression=compression)
 
         yield from channel.initialize()
 
@@ -186,6 +202,14 @@ def connect(url: str=None, *, host: str='localhost',
     :param virtualhost: virtualhost parameter. `'/'` by default
     :param ssl: use SSL for connection. Should be used with addition kwargs. See `pika documentation`_ for more info.
     :param loop: Event loop (:func:`asyncio.get_event_loop()` when :class:`None`)
+    :param loopback: names of the exchanges which messages may be delivered to the consumers \
+    of this connection without the broker round trip. See :class:`aio_pika.loopback.Loopback`.
+    :param observer: callable which receives the :class:`aio_pika.instrumentation.Stage`, the channel \
+    number, the delivery tag and the :func:`time.perf_counter` timestamp of every message stage, \
+    e.g. :class:`aio_pika.instrumentation.LatencyRecorder`.
+    :param handler_timing: measure the consumer callbacks for the ``aio_pika_handler_seconds`` \
+    metric (:attr:`aio_pika.metrics.QueueMetrics.handler_seconds`). The callbacks are called \
+    directly when it's disabled and there is no ``observer``.
     :param kwargs: addition parameters which will be passed to the pika connection.
     :return: :class:`aio_pika.connection.Connection`
 
@@ -16,8 +16,16 @@ class MessageProcessError(AMQPException):
     pass
 
 
+class RPCError(AMQPException):
+    pass
+
+
+class DecompressionLimitError(AMQPException):
+    pass
+
+
 __all__ = (
-    'AMQPException', 'MessageProcessError', 'ProbableAuthenticationError',
+    'AMQPException', 'DecompressionLimitError', 'MessageProcessError', 'RPCError', 'ProbableAuthenticationError',
     'AMQPChannelError', 'AMQPConnectionError', 'AMQPError', 'ChannelClosed', 'ChannelError',
     'AuthenticationError', 'BodyTooLongError', 'ConnectionClosed', 'ConsumerCancelled', 'DuplicateConsumerTag',
     'IncompatibleProtocolError', 'InvalidChannelNumber', 'InvalidFieldTypeException', 'InvalidFrameError',
@@ -1,6 +1,8 @@
 import asyncio
 from enum import Enum, unique
 from logging import getLogger
+from time import perf_counter
+from typing import Callable, Iterable
 from pika.channel import Channel
 from .common import BaseChannel, FutureStore
 from .message import Message
@@ -20,21 +22,29 @@ class ExchangeType(Enum):
 class Exchange(BaseChannel):
     """ Exchange abstraction """
 
-    __slots__ = 'name', '__type', '__publish_method', 'arguments', 'durable', 'auto_delete', '_channel'
+    __slots__ = (
+        'name', '__type', '__publish_method', '__publish_nowait_method', '__publish_many_method',
+        'arguments', 'durable', 'auto_delete', '_channel', '_loopback', '_observer',
+    )
 
     def __init__(self, channel: Channel, publish_method, name: str,
                  type: ExchangeType=ExchangeType.DIRECT, *, auto_delete: bool,
-                 durable: bool, arguments: dict, loop: asyncio.AbstractEventLoop, future_store: FutureStore):
+                 durable: bool, arguments: dict, loop: asyncio.AbstractEventLoop, future_store: FutureStore,
+                 loopback=None, observer=None, publish_nowait_method=None, publish_many_method=None):
 
         super().__init__(loop, future_store)
 
         self._channel = channel
         self.__publish_method = publish_method
+        self.__publish_nowait_method = publish_nowait_method
+        self.__publish_many_method = publish_many_method
         self.__type = type.value
         self.name = name
         self.auto_delete = auto_delete
         self.durable = durable
         self.arguments = arguments
+        self._loopback = loopback
+        self._observer = observer
 
     def __str__(self):
         return self.name
@@ -52,10 +62,22 @@ class Exchange(BaseChannel):
 
         .. _publisher confirms: https://www.rabbitmq.com/confirms.html
 
+        When the exchange is configured for the loopback (see :class:`aio_pika.loopback.Loopback`)
+        and the routing key is matched by the in-process consumers only, the message is delivered
+        to them directly.
+
         """
 
+        # The observed publishing includes the encoding of the properties
+        enqueued = perf_counter() if self._observer is not None else None
+
         log.debug("Publishing message via exchange %s: %r", self, message)
 
+        if self._loopback is not None and self._loopback.publish(
+            self.name, self.__type, routing_key, message.body, message.properties
+        ):
+            return True
+
         return (
             yield from self.__publish_method(
                 self.name,
@@ -63,10 +85,102 @@ class Exchange(BaseChannel):
                 message.body,
                 properties=message.properties,
                 mandatory=mandatory,
-                immediate=immediate
+                immediate=immediate,
+                enqueued=enqueued,
             )
         )
 
+    @BaseChannel._ensure_channel_is_open
+    def publish_nowait(self, message: Message, routing_key, *,
+                       on_confirm: Callable[[Exception], None] = None, mandatory=True, immediate=False) -> int:
+        """ Publish the message without waiting for the broker confirmation. Unlike :func:`publish`
+        it doesn't create a future, only the callback is kept until the confirmation arrives.
+
+            >>> def on_confirm(exc):
+            ...     if exc is not None:
+            ...         log.error("Message is not delivered: %r", exc)
+            >>> exchange.publish_nowait(Message(b'data'), 'key', on_confirm=on_confirm)
+
+        :param message: :class:`aio_pika.message.Message` instance
+        :param routing_key: routing key
+        :param on_confirm: called with :class:`None` when the broker confirms the message, \
+        :class:`aio_pika.exceptions.NackError` when the broker rejects it or \
+        :class:`aio_pika.exceptions.ChannelClosed` when the channel is closed before the confirmation. \
+        When omitted the rejected messages are logged.
+        :return: delivery tag of the message or :class:`None` when the channel is opened \
+        without publisher confirms or the message is delivered by the loopback
+        """
+
+        enqueued = perf_counter() if self._observer is not None else None
+
+        log.debug("Publishing message via exchange %s: %r", self, message)
+
+        if self._loopback is not None and self._loopback.publish(
+            self.name, self.__type, routing_key, message.body, message.properties
+        ):
+            if on_confirm is not None:
+                self.loop.call_soon(on_confirm, None)
+
+            return None
+
+        return self.__publish_nowait_method(
+            self.name, routing_key, message.body, message.properties, mandatory, immediate, on_confirm,
+            enqueued=enqueued,
+        )
+
+    @BaseChannel._ensure_channel_is_open
+    @asyncio.coroutine
+    def publish_many(self, message: Message, routing_keys: Iterable[str], *,
+                     mandatory=True, immediate=False) -> list:
+        """ Publish the same message to many routing keys. The message properties and body are
+        encoded once and the frames of all routing keys are written at once, then the
+        confirmations are awaited together.
+
+            >>> keys = ['tenant.%d' % tenant for tenant in range(100)]
+            >>> results = yield from exchange.publish_many(Message(b'data'), keys)
+            >>> failed = [key for key, result in zip(keys, results) if isinstance(result, Exception)]
+
+        :param message: :class:`aio_pika.message.Message` instance
+        :param routing_keys: routing keys
+        :return: :class:`list` with the result for every routing key in order: :class:`True` when \
+        the broker confirms the message, :class:`aio_pika.exceptions.NackError` or other exception \
+        when it's not delivered, :class:`None` when the channel is opened without publisher confirms
+        """
+
+        # Built once for all routing keys, so unlike publish the encoding isn't observed
+        properties = message.properties
+        enqueued = perf_counter() if self._observer is not None else None
+
+        routing_keys = list(routing_keys)
+        log.debug("Publishing message via exchange %s to %d routing keys: %r", self, len(routing_keys), message)
+
+        results = [None] * len(routing_keys)
+        indexes = []
+
+        for index, routing_key in enumerate(routing_keys):
+            if self._loopback is not None and self._loopback.publish(
+                self.name, self.__type, routing_key, message.body, properties
+            ):
+                results[index] = True
+            else:
+                indexes.append(index)
+
+        if not indexes:
+            return results
+
+        futures = self.__publish_many_method(
+            self.name, [routing_keys[index] for index in indexes], message.body,
+            properties, mandatory, immediate, enqueued=enqueued,
+        )
+
+        if futures[0] is not None:
+            futures = yield from asyncio.gather(*futures, loop=self.loop, return_exceptions=True)
+
+        for index, result in zip(indexes, futures):
+            results[index] = result
+
+        return results
+
     @BaseChannel._ensure_channel_is_open
     def delete(self, if_unused=False) -> asyncio.Future:
         """ Delete the queue
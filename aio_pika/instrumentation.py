@@ -0,0 +1,233 @@
+from collections import OrderedDict
+from enum import Enum, unique
+from math import ceil, log2
+
+
+@unique
+class Stage(Enum):
+    """ Stages of the message passed to the observer """
+
+    #: :func:`aio_pika.exchange.Exchange.publish` is called (before the properties are built)
+    PUBLISH_ENQUEUED = 'publish_enqueued'
+    #: pika encoded the frames and wrote them to the socket (as much as the socket accepted)
+    FRAMES_WRITTEN = 'frames_written'
+    #: the broker confirmed or rejected the message
+    CONFIRM_RECEIVED = 'confirm_received'
+    #: the consumer received the message from pika
+    DELIVERY_RECEIVED = 'delivery_received'
+    #: the consumer callback is started
+    HANDLER_START = 'handler_start'
+    #: the consumer callback is finished (returned or raised)
+    HANDLER_END = 'handler_end'
+    #: ``basic.ack`` or ``basic.reject`` is sent
+    ACK_SENT = 'ack_sent'
+
+
+PUBLISH_STAGES = frozenset((Stage.PUBLISH_ENQUEUED, Stage.FRAMES_WRITTEN, Stage.CONFIRM_RECEIVED))
+
+
+class Histogram:
+    """ HDR-style histogram with the fixed relative precision.
+
+    Values are counted in the buckets which width grows with the value, so the memory
+    doesn't depend on the number of recorded values and every percentile is reported
+    with no more than ``10 ** -significant_digits`` relative error.
+
+        >>> histogram = Histogram()
+        >>> histogram.record(0.0012)
+        >>> histogram.percentile(99)
+
+    """
+
+    __slots__ = 'unit', 'significant_digits', 'counts', 'count', 'total', 'min', 'max', '_bits'
+
+    def __init__(self, significant_digits: int = 2, unit: float = 1e-6):
+        """ Creates a new instance of :class:`Histogram`
+
+        :param significant_digits: precision of the recorded values
+        :param unit: the smallest distinguishable value, microsecond by default
+        """
+
+        self.unit = unit
+        self.significant_digits = significant_digits
+        self.counts = {}
+        self.count = 0
+        self.total = 0.
+        self.min = None
+        self.max = None
+
+        # Mantissa bits of the bucket
+        self._bits = int(ceil(log2(2 * 10 ** significant_digits)))
+
+    def _index(self, value: int) -> int:
+        shift = value.bit_length() - self._bits
+
+        if shift <= 0:
+            return value
+
+        return ((shift + 1) << (self._bits - 1)) + (value >> shift) - (1 << (self._bits - 1))
+
+    def _highest(self, index: int) -> int:
+        half = 1 << (self._bits - 1)
+
+        if index < 2 * half:
+            return index
+
+        shift, mantissa = divmod(index - 2 * half, half)
+        shift += 1
+        return ((mantissa + half + 1) << shift) - 1
+
+    def record(self, value: float, count: int = 1):
+        """ Record the value
+
+        :param value: non negative value in the seconds (or in the same units as :attr:`unit`)
+        :param count: how many times the value was observed
+        """
+
+        index = self._index(round(max(value, 0) / self.unit))
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+
+        if self.min is None or value < self.min:
+            self.min = value
+
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other: 'Histogram'):
+        """ Add values of the other histogram with the same precision and unit """
+
+        if (other.unit, other.significant_digits) != (self.unit, self.significant_digits):
+            raise ValueError("Histograms have different precision")
+
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+
+        self.count += other.count
+        self.total += other.total
+
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else None
+
+    def percentile(self, percent: float) -> float:
+        """ The highest value equivalent to the value at the percentile
+
+        :param percent: percentile from 0 to 100
+        :return: :class:`float` or :class:`None` when nothing is recorded
+        """
+
+        if not self.count:
+            return None
+
+        rank = max(1, int(ceil(self.count * percent / 100.)))
+        seen = 0
+
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+
+            if seen >= rank:
+                return min(self._highest(index) * self.unit, self.max)
+
+        return self.max
+
+    def summary(self, percentiles=(50, 90, 99, 99.9)) -> dict:
+        """ :class:`dict` with count, min, mean, max and the percentiles named like ``p99`` """
+
+        result = {'count': self.count, 'min': self.min, 'mean': self.mean, 'max': self.max}
+
+        for percent in percentiles:
+            result['p%s' % ('%g' % percent).replace('.', '_')] = self.percentile(percent)
+
+        return result
+
+
+class LatencyRecorder:
+    """ Observer aggregating the time between the stages of every message into :class:`Histogram`.
+
+        >>> recorder = LatencyRecorder()
+        >>> connection = yield from connect(url, observer=recorder)
+        ...
+        >>> recorder.histograms['confirm'].percentile(99)
+
+    Intervals are matched by the channel number and the delivery tag. The stages of the
+    messages which never reach the end of the interval (e.g. deliveries of the ``no_ack``
+    consumers are never acknowledged) are forgotten after ``max_pending`` newer messages.
+    """
+
+    #: interval name: (start stage, end stage)
+    INTERVALS = OrderedDict((
+        ('write', (Stage.PUBLISH_ENQUEUED, Stage.FRAMES_WRITTEN)),
+        ('confirm', (Stage.FRAMES_WRITTEN, Stage.CONFIRM_RECEIVED)),
+        ('publish', (Stage.PUBLISH_ENQUEUED, Stage.CONFIRM_RECEIVED)),
+        ('dispatch', (Stage.DELIVERY_RECEIVED, Stage.HANDLER_START)),
+        ('handler', (Stage.HANDLER_START, Stage.HANDLER_END)),
+        ('settle', (Stage.DELIVERY_RECEIVED, Stage.ACK_SENT)),
+    ))
+
+    __slots__ = 'histograms', 'max_pending', '_pending', '_ending', '_starting'
+
+    def __init__(self, significant_digits: int = 2, max_pending: int = 100000):
+        """ Creates a new instance of :class:`LatencyRecorder`
+
+        :param significant_digits: precision of the histograms
+        :param max_pending: how many messages in the middle of the intervals are tracked
+        """
+
+        self.histograms = OrderedDict(
+            (name, Histogram(significant_digits)) for name in self.INTERVALS
+        )
+        self.max_pending = max_pending
+        self._pending = OrderedDict()
+
+        self._ending = {}
+        self._starting = set()
+
+        for name, (start, end) in self.INTERVALS.items():
+            self._ending.setdefault(end, []).append((name, start))
+            self._starting.add(start)
+
+    def __call__(self, stage: Stage, channel_number: int, delivery_tag: int, timestamp: float):
+        key = stage in PUBLISH_STAGES, channel_number, delivery_tag
+        marks = self._pending.get(key)
+
+        if marks is None:
+            if stage not in self._starting:
+                return
+
+            marks = self._pending[key] = {}
+
+            if len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+
+        marks[stage] = timestamp
+
+        for name, start in self._ending.get(stage, ()):
+            started = marks.get(start)
+
+            if started is not None:
+                self.histograms[name].record(timestamp - started)
+
+        # Nothing else could end the intervals started by this message
+        for name, (start, end) in self.INTERVALS.items():
+            if start in marks and end not in marks:
+                return
+
+        del self._pending[key]
+
+    def summary(self, percentiles=(50, 90, 99, 99.9)) -> dict:
+        """ :func:`Histogram.summary` of every interval with recorded values """
+
+        return OrderedDict(
+            (name, histogram.summary(percentiles))
+            for name, histogram in self.histograms.items() if histogram.count
+        )
+
+
+__all__ = 'Histogram', 'LatencyRecorder', 'Stage',
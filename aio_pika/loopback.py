@@ -0,0 +1,244 @@
+import asyncio
+from collections import deque
+from itertools import count
+from logging import getLogger
+from typing import Callable, Iterable
+
+from pika.spec import Basic, BasicProperties
+
+from .tools import topic_match
+
+
+log = getLogger(__name__)
+
+
+class _Consumer:
+    """ Plays the role of the pika channel for :class:`aio_pika.message.IncomingMessage`,
+    so ``ack``, ``reject`` and ``nack`` of the short-circuited messages are settled by the local queue """
+
+    __slots__ = 'queue', 'owner', 'tag', 'callback', 'no_ack'
+
+    def __init__(self, queue, owner, tag, callback, no_ack):
+        self.queue = queue
+        self.owner = owner
+        self.tag = tag
+        self.callback = callback
+        self.no_ack = no_ack
+
+    @property
+    def channel_number(self) -> int:
+        return self.owner.channel_number
+
+    def basic_ack(self, delivery_tag=0, multiple=False):
+        self.queue.settle(delivery_tag, multiple, False)
+
+    def basic_reject(self, delivery_tag, requeue=True):
+        self.queue.settle(delivery_tag, False, requeue)
+
+    def basic_nack(self, delivery_tag=None, multiple=False, requeue=True):
+        self.queue.settle(delivery_tag, multiple, requeue)
+
+
+class _LocalQueue:
+    """ Delivers the short-circuited messages to the local consumers of one queue """
+
+    __slots__ = 'name', 'loop', 'consumers', 'messages', 'unacked', '_delivery_tags'
+
+    def __init__(self, name: str, loop: asyncio.AbstractEventLoop):
+        self.name = name
+        self.loop = loop
+        self.consumers = deque()
+        self.messages = deque()
+        self.unacked = {}
+        self._delivery_tags = count(1)
+
+    def enqueue(self, exchange, routing_key, body, properties, redelivered=False):
+        self.messages.append((exchange, routing_key, body, properties, redelivered))
+        self.dispatch()
+
+    def dispatch(self):
+        while self.messages and self.consumers:
+            exchange, routing_key, body, properties, redelivered = self.messages.popleft()
+
+            # Round robin between the consumers of the queue
+            consumer = self.consumers[0]
+            self.consumers.rotate(-1)
+
+            delivery_tag = next(self._delivery_tags)
+            envelope = Basic.Deliver(
+                consumer_tag=consumer.tag, delivery_tag=delivery_tag,
+                redelivered=redelivered, exchange=exchange, routing_key=routing_key,
+            )
+
+            if not consumer.no_ack:
+                self.unacked[delivery_tag] = consumer, (exchange, routing_key, body, properties)
+
+            # The pika consumer callback of the queue, which schedules the handler itself
+            consumer.callback(consumer, envelope, properties, body)
+
+    def settle(self, delivery_tag, multiple, requeue):
+        if multiple:
+            delivery_tags = [tag for tag in self.unacked if tag <= delivery_tag]
+        else:
+            delivery_tags = [delivery_tag]
+
+        for tag in delivery_tags:
+            unacked = self.unacked.pop(tag, None)
+
+            if unacked is None:
+                log.warning("Unknown delivery tag %d of the loopback queue %r", tag, self.name)
+            elif requeue:
+                self.messages.append(unacked[1] + (True,))
+
+        if requeue:
+            self.loop.call_soon(self.dispatch)
+
+    def requeue_unacked(self, consumers):
+        for tag, (consumer, entry) in sorted(self.unacked.items()):
+            if consumer in consumers:
+                del self.unacked[tag]
+                self.messages.append(entry + (True,))
+
+        self.loop.call_soon(self.dispatch)
+
+
+class Loopback:
+    """ In-process fast path between the publishers and the consumers of one connection.
+
+    A message published to one of the configured exchanges is delivered directly to
+    the in-process consumers (started by :func:`aio_pika.queue.Queue.consume`)
+    when every queue bound with the matching key is consumed in this process.
+    Otherwise the message goes through the broker as usual.
+
+        >>> connection = yield from connect(url, loopback=['events'])
+
+    Only exchanges which are not consumed by other processes should be configured,
+    because the short-circuited messages never reach the broker. The bindings are
+    tracked when they are made by :func:`aio_pika.queue.Queue.bind`, so the queues
+    should be bound by this process. Use ``''`` to short-circuit the default exchange.
+
+    The short-circuited messages are acknowledged, rejected and requeued like the
+    broker would do it, but the prefetch count, TTL and dead-lettering are not applied.
+    The unacknowledged messages of the cancelled consumer are requeued to the other local
+    consumers of the queue (or kept for the next one), settling them afterwards has no effect.
+    ``headers`` exchanges are never short-circuited.
+    """
+
+    __slots__ = 'exchanges', 'loop', 'bindings', 'queues'
+
+    def __init__(self, exchanges: Iterable[str], *, loop: asyncio.AbstractEventLoop = None):
+        """ Creates a new instance of :class:`Loopback`
+
+        :param exchanges: names of the exchanges which may be short-circuited
+        :param loop: Event loop (:func:`asyncio.get_event_loop()` when :class:`None`)
+        """
+
+        self.exchanges = frozenset(exchanges)
+        self.loop = loop or asyncio.get_event_loop()
+        self.bindings = {}
+        self.queues = {}
+
+    def bind(self, queue_name: str, exchange_name: str, routing_key: str):
+        if exchange_name in self.exchanges:
+            self.bindings.setdefault(exchange_name, set()).add((routing_key, queue_name))
+
+    def unbind(self, queue_name: str, exchange_name: str, routing_key: str):
+        self.bindings.get(exchange_name, set()).discard((routing_key, queue_name))
+
+    def add_consumer(self, queue_name: str, owner, consumer_tag: str, callback: Callable, no_ack: bool):
+        """ Register the in-process consumer
+
+        :param queue_name: name of the consumed queue
+        :param owner: pika channel of the consumer, see :func:`Loopback.remove_owner`
+        :param consumer_tag: consumer tag
+        :param callback: pika consumer callback, it's called with ``(channel, envelope, properties, body)`` \
+        like for the messages of the broker
+        :param no_ack: whether the consumer acknowledges messages
+        """
+
+        queue = self.queues.get(queue_name)
+
+        if queue is None:
+            queue = self.queues[queue_name] = _LocalQueue(queue_name, self.loop)
+
+        queue.consumers.append(_Consumer(queue, owner, consumer_tag, callback, no_ack))
+        queue.dispatch()
+
+    def _remove_consumers(self, queue: _LocalQueue, predicate):
+        consumers = [consumer for consumer in queue.consumers if predicate(consumer)]
+
+        for consumer in consumers:
+            queue.consumers.remove(consumer)
+
+        if consumers:
+            # Like the broker does for the closed channel. Nothing would deliver
+            # the messages of the cancelled consumer again, so they are requeued too.
+            queue.requeue_unacked(consumers)
+
+        if not queue.consumers and not queue.messages and not queue.unacked:
+            del self.queues[queue.name]
+
+    def remove_consumer(self, queue_name: str, consumer_tag: str):
+        """ Remove the cancelled consumer and requeue its unacknowledged messages """
+
+        queue = self.queues.get(queue_name)
+
+        if queue is not None:
+            self._remove_consumers(queue, lambda consumer: consumer.tag == consumer_tag)
+
+    def remove_owner(self, owner):
+        """ Remove all consumers of the closed channel and requeue their unacknowledged messages """
+
+        for queue in list(self.queues.values()):
+            self._remove_consumers(queue, lambda consumer: consumer.owner is owner)
+
+    def delete_queue(self, queue_name: str):
+        self.queues.pop(queue_name, None)
+
+        for bindings in self.bindings.values():
+            for binding in [binding for binding in bindings if binding[1] == queue_name]:
+                bindings.discard(binding)
+
+    def route(self, exchange_name: str, exchange_type: str, routing_key: str) -> list:
+        """ Returns the local queues for the message or :class:`None` when it should be sent to the broker """
+
+        if exchange_name not in self.exchanges:
+            return None
+
+        if exchange_name == '':
+            names = {routing_key}
+        elif exchange_type == 'direct':
+            names = {name for key, name in self.bindings.get(exchange_name, ()) if key == routing_key}
+        elif exchange_type == 'fanout':
+            names = {name for _, name in self.bindings.get(exchange_name, ())}
+        elif exchange_type == 'topic':
+            names = {name for key, name in self.bindings.get(exchange_name, ()) if topic_match(key, routing_key)}
+        else:
+            return None
+
+        queues = [self.queues.get(name) for name in names]
+
+        if not queues or not all(queue is not None and queue.consumers for queue in queues):
+            return None
+
+        return queues
+
+    def publish(self, exchange_name: str, exchange_type: str, routing_key: str,
+                body: bytes, properties: BasicProperties) -> bool:
+        """ Deliver the message to the local consumers
+
+        :return: :class:`False` when the message should be sent to the broker
+        """
+
+        queues = self.route(exchange_name, exchange_type, routing_key)
+
+        if queues is None:
+            return False
+
+        for queue in queues:
+            queue.enqueue(exchange_name, routing_key, body, properties)
+
+        return True
+
+
+__all__ = 'Loopback',
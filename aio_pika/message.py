@@ -1,13 +1,20 @@
 import json
+import struct
 from datetime import datetime, timedelta
 from enum import IntEnum, unique
 from logging import getLogger
+from time import perf_counter
+from types import MappingProxyType
 from typing import Union
 
 from pika import BasicProperties
 from pika.channel import Channel
+from pika.data import encode_short_string
 from contextlib import contextmanager
+from .compression import decompress
 from .exceptions import MessageProcessError
+from .instrumentation import Stage
+from .serialization import dumps, loads
 
 
 log = getLogger(__name__)
@@ -21,6 +28,16 @@ class DeliveryMode(IntEnum):
 
 DateType = Union[int, datetime, float, timedelta, None]
 
+_NOT_DECODED = object()
+
+# DeliveryMode members are equal to their values
+_DELIVERY_MODES = {mode: mode.value for mode in DeliveryMode}
+
+
+def _delivery_mode(value) -> int:
+    mode = _DELIVERY_MODES.get(value)
+    return mode if mode is not None else DeliveryMode(int(value)).value
+
 
 class Message:
     """ AMQP message abstraction """
@@ -59,21 +76,79 @@ class Message:
         :param app_id: app id
         """
 
-        self.__lock = False
-        self.body = body if isinstance(body, bytes) else bytes(body)
-        self.headers = headers
-        self.content_type = content_type
-        self.content_encoding = content_encoding
-        self.delivery_mode = DeliveryMode(int(delivery_mode)).value
-        self.priority = priority
-        self.correlation_id = self._as_bytes(correlation_id)
-        self.reply_to = reply_to
-        self.expiration = self._convert_timestamp(expiration) * 1000 if expiration else None
-        self.message_id = message_id
-        self.timestamp = int(self._convert_timestamp(timestamp)) if timestamp else None
-        self.type = type
-        self.user_id = str(user_id) if user_id else None
-        self.app_id = str(app_id) if app_id else None
+        self._init(
+            body=body if isinstance(body, bytes) else bytes(body),
+            headers=headers,
+            content_type=content_type,
+            content_encoding=content_encoding,
+            delivery_mode=_delivery_mode(delivery_mode),
+            priority=priority,
+            correlation_id=self._as_bytes(correlation_id),
+            reply_to=reply_to,
+            expiration=self._convert_timestamp(expiration) * 1000 if expiration else None,
+            message_id=message_id,
+            timestamp=int(self._convert_timestamp(timestamp)) if timestamp else None,
+            type=type,
+            user_id=str(user_id) if user_id else None,
+            app_id=str(app_id) if app_id else None,
+        )
+
+    def _init(self, body, headers, content_type, content_encoding, delivery_mode, priority, correlation_id,
+              reply_to, expiration, message_id, timestamp, type, user_id, app_id):
+
+        # The new message isn't locked, so the check of __setattr__ is skipped
+        set_ = object.__setattr__
+        set_(self, '_Message__lock', False)
+        set_(self, 'body', body)
+        set_(self, 'headers', headers)
+        set_(self, 'content_type', content_type)
+        set_(self, 'content_encoding', content_encoding)
+        set_(self, 'delivery_mode', delivery_mode)
+        set_(self, 'priority', priority)
+        set_(self, 'correlation_id', correlation_id)
+        set_(self, 'reply_to', reply_to)
+        set_(self, 'expiration', expiration)
+        set_(self, 'message_id', message_id)
+        set_(self, 'timestamp', timestamp)
+        set_(self, 'type', type)
+        set_(self, 'user_id', user_id)
+        set_(self, 'app_id', app_id)
+
+    @classmethod
+    def trusted(cls, body: bytes, *, headers: dict = None, content_type: str = None, content_encoding: str = None,
+                delivery_mode: int = DeliveryMode.NOT_PERSISTENT.value, priority: int = None,
+                correlation_id: bytes = None, reply_to: str = None, expiration: float = None,
+                message_id: str = None, timestamp: int = None, type: str = None, user_id: str = None,
+                app_id: str = None) -> 'Message':
+        """ Creates the message without the validation and the conversion of the arguments.
+        The values must already have the types of the :class:`Message` attributes:
+        :class:`bytes` body and ``correlation_id``, :class:`int` ``delivery_mode`` and ``timestamp``
+        (seconds since the epoch) and ``expiration`` in milliseconds.
+
+            >>> Message.trusted(b'data', content_type='text/plain', message_id='1')
+
+        """
+
+        message = cls.__new__(cls)
+        message._init(
+            body, headers, content_type, content_encoding, delivery_mode, priority, correlation_id,
+            reply_to, expiration, message_id, timestamp, type, user_id, app_id,
+        )
+        return message
+
+    @classmethod
+    def from_object(cls, obj, content_type: str = 'application/json', **kwargs) -> 'Message':
+        """ Creates the message with the object serialized by the registered
+        :class:`aio_pika.serialization.Serializer` of the content type
+
+            >>> Message.from_object({'event': 'click'})
+
+        :param obj: object to serialize
+        :param content_type: content type
+        :param kwargs: other arguments of :class:`Message`
+        """
+
+        return cls(dumps(obj, content_type), content_type=content_type, **kwargs)
 
     @staticmethod
     def _as_bytes(value):
@@ -149,7 +224,7 @@ class Message:
         )
 
     def __setattr__(self, key, value):
-        if not key.startswith("_") and self.locked:
+        if self.__lock and not key.startswith("_"):
             raise ValueError("Message is locked")
 
         return super().__setattr__(key, value)
@@ -202,51 +277,71 @@ class IncomingMessage(Message):
     __slots__ = (
         '_loop', '__channel', 'cluster_id', 'consumer_tag',
         'delivery_tag', 'exchange', 'routing_key', 'synchronous',
-        'redelivered', '__no_ack', '__processed'
+        'redelivered', '__no_ack', '__processed', '_observer', '_metrics', '_decoded'
     )
 
-    def __init__(self, channel: Channel, envelope, properties, body, no_ack: bool = False):
+    def __init__(self, channel: Channel, envelope, properties, body, no_ack: bool = False,
+                 observer=None, metrics=None):
         """ Create an instance of :class:`IncomingMessage`
 
         :param channel: :class:`aio_pika.channel.Channel`
         :param envelope: pika envelope
         :param properties: properties
-        :param body: message body
+        :param body: message body, decompressed when its ``content_encoding`` has the registered \
+        :class:`aio_pika.compression.Codec`
         :param no_ack: no ack needed
+        :param observer: receives :attr:`aio_pika.instrumentation.Stage.ACK_SENT`, \
+        see :func:`aio_pika.connection.connect`
+        :param metrics: :class:`aio_pika.metrics.QueueMetrics` counting acknowledgements
 
         """
-        self.__channel = channel
-        self.__no_ack = no_ack
-        self.__processed = False
-
-        expiration = None
-        if properties.expiration:
-            expiration = self._convert_timestamp(float(properties.expiration) / 1000.)
+        body, content_encoding = decompress(body, properties)
 
-        super().__init__(
+        # The properties decoded by pika are trusted, so only their types are converted
+        self._init(
             body=body,
             content_type=properties.content_type,
-            content_encoding=properties.content_encoding,
+            content_encoding=content_encoding,
             headers=properties.headers,
-            delivery_mode=properties.delivery_mode,
+            delivery_mode=_delivery_mode(properties.delivery_mode),
             priority=properties.priority,
-            correlation_id=properties.correlation_id,
+            correlation_id=self._as_bytes(properties.correlation_id),
             reply_to=properties.reply_to,
-            expiration=expiration,
+            expiration=float(properties.expiration) if properties.expiration else None,
             message_id=properties.message_id,
-            timestamp=self._convert_timestamp(float(properties.timestamp)) if properties.timestamp else None,
+            timestamp=int(properties.timestamp) if properties.timestamp else None,
             type=properties.type,
-            user_id=properties.user_id,
-            app_id=properties.app_id,
+            user_id=str(properties.user_id) if properties.user_id else None,
+            app_id=str(properties.app_id) if properties.app_id else None,
         )
 
-        self.cluster_id = properties.cluster_id
-        self.consumer_tag = getattr(envelope, 'consumer_tag', None)
-        self.delivery_tag = envelope.delivery_tag
-        self.exchange = envelope.exchange
-        self.routing_key = envelope.routing_key
-        self.redelivered = envelope.redelivered
-        self.synchronous = envelope.synchronous
+        set_ = object.__setattr__
+        set_(self, '_IncomingMessage__channel', channel)
+        set_(self, '_observer', observer)
+        set_(self, '_metrics', metrics)
+        set_(self, '_IncomingMessage__no_ack', no_ack)
+        set_(self, '_IncomingMessage__processed', False)
+        set_(self, '_decoded', _NOT_DECODED)
+        set_(self, 'cluster_id', properties.cluster_id)
+        set_(self, 'consumer_tag', getattr(envelope, 'consumer_tag', None))
+        set_(self, 'delivery_tag', envelope.delivery_tag)
+        set_(self, 'exchange', envelope.exchange)
+        set_(self, 'routing_key', envelope.routing_key)
+        set_(self, 'redelivered', envelope.redelivered)
+        set_(self, 'synchronous', envelope.synchronous)
+
+    @property
+    def decoded(self):
+        """ The body decoded by the :class:`aio_pika.serialization.Serializer` of the message
+        ``content_type``, the body itself without ``content_type``. It's decoded on the first access only.
+
+        :raises ValueError: when no serializer is registered for the content type
+        """
+
+        if self._decoded is _NOT_DECODED:
+            self._decoded = loads(self.body, self.content_type)
+
+        return self._decoded
 
     @contextmanager
     def process(self, requeue=False, reject_on_redelivered=False):
@@ -273,6 +368,14 @@ class IncomingMessage(Message):
                 self.reject(requeue=requeue)
             raise
 
+    @property
+    def processed(self):
+        """ Was the message acknowledged or rejected
+
+        :return: :class:`bool`
+        """
+        return self.__processed
+
     def ack(self):
         """ Send basic.ack is used for positive acknowledgements
 
@@ -288,6 +391,12 @@ class IncomingMessage(Message):
         self.__channel.basic_ack(delivery_tag=self.delivery_tag)
         self.__processed = True
 
+        if self._metrics is not None:
+            self._metrics.acks += 1
+
+        if self._observer is not None:
+            self._observer(Stage.ACK_SENT, self.__channel.channel_number, self.delivery_tag, perf_counter())
+
         if not self.locked:
             self.lock()
 
@@ -304,6 +413,13 @@ class IncomingMessage(Message):
 
         self.__channel.basic_reject(delivery_tag=self.delivery_tag, requeue=requeue)
         self.__processed = True
+
+        if self._metrics is not None:
+            self._metrics.rejects += 1
+
+        if self._observer is not None:
+            self._observer(Stage.ACK_SENT, self.__channel.channel_number, self.delivery_tag, perf_counter())
+
         if not self.locked:
             self.lock()
 
@@ -321,4 +437,268 @@ class IncomingMessage(Message):
         return info
 
 
-__all__ = 'Message', 'IncomingMessage',
+def _lazy(slot, source: str, name: str, convert=None) -> property:
+    """ Property which fills the slot from the field of the pika envelope or properties on the first access """
+
+    def getter(self):
+        try:
+            return slot.__get__(self)
+        except AttributeError:
+            pass
+
+        value = getattr(getattr(self, source), name)
+
+        if convert is not None:
+            value = convert(value)
+
+        slot.__set__(self, value)
+        return value
+
+    def setter(self, value):
+        slot.__set__(self, value)
+
+    return property(getter, setter)
+
+
+def _lazy_body(slot) -> property:
+    """ The body and the content encoding are decompressed together on the first access """
+
+    def getter(self):
+        try:
+            return slot.__get__(self)
+        except AttributeError:
+            pass
+
+        body, content_encoding = decompress(self._raw_body, self._properties)
+
+        # The other one may be assigned already
+        for field, value in ((Message.body, body), (Message.content_encoding, content_encoding)):
+            try:
+                field.__get__(self)
+            except AttributeError:
+                field.__set__(self, value)
+
+        return slot.__get__(self)
+
+    def setter(self, value):
+        slot.__set__(self, value)
+
+    return property(getter, setter)
+
+
+class LazyIncomingMessage(IncomingMessage):
+    """ :class:`IncomingMessage` which keeps the pika envelope and properties and converts their fields
+    on the first access. The handlers reading only a few fields (e.g. ``body`` and ``routing_key``)
+    skip the conversion of the others. See ``lazy`` of :func:`aio_pika.queue.Queue.consume`. """
+
+    __slots__ = '_envelope', '_properties', '_raw_body',
+
+    def __init__(self, channel: Channel, envelope, properties, body, no_ack: bool = False,
+                 observer=None, metrics=None):
+
+        set_ = object.__setattr__
+        set_(self, '_Message__lock', False)
+        set_(self, '_IncomingMessage__channel', channel)
+        set_(self, '_observer', observer)
+        set_(self, '_metrics', metrics)
+        set_(self, '_IncomingMessage__no_ack', no_ack)
+        set_(self, '_IncomingMessage__processed', False)
+        set_(self, '_decoded', _NOT_DECODED)
+        set_(self, '_envelope', envelope)
+        set_(self, '_properties', properties)
+        set_(self, '_raw_body', body)
+
+    body = _lazy_body(Message.body)
+    content_encoding = _lazy_body(Message.content_encoding)
+
+    headers = _lazy(Message.headers, '_properties', 'headers')
+    content_type = _lazy(Message.content_type, '_properties', 'content_type')
+    delivery_mode = _lazy(Message.delivery_mode, '_properties', 'delivery_mode', _delivery_mode)
+    priority = _lazy(Message.priority, '_properties', 'priority')
+    correlation_id = _lazy(Message.correlation_id, '_properties', 'correlation_id', Message._as_bytes)
+    reply_to = _lazy(Message.reply_to, '_properties', 'reply_to')
+    expiration = _lazy(Message.expiration, '_properties', 'expiration', lambda x: float(x) if x else None)
+    message_id = _lazy(Message.message_id, '_properties', 'message_id')
+    timestamp = _lazy(Message.timestamp, '_properties', 'timestamp', lambda x: int(x) if x else None)
+    type = _lazy(Message.type, '_properties', 'type')
+    user_id = _lazy(Message.user_id, '_properties', 'user_id', lambda x: str(x) if x else None)
+    app_id = _lazy(Message.app_id, '_properties', 'app_id', lambda x: str(x) if x else None)
+    cluster_id = _lazy(IncomingMessage.cluster_id, '_properties', 'cluster_id')
+
+    consumer_tag = _lazy(IncomingMessage.consumer_tag, '_envelope', 'consumer_tag')
+    delivery_tag = _lazy(IncomingMessage.delivery_tag, '_envelope', 'delivery_tag')
+    exchange = _lazy(IncomingMessage.exchange, '_envelope', 'exchange')
+    routing_key = _lazy(IncomingMessage.routing_key, '_envelope', 'routing_key')
+    redelivered = _lazy(IncomingMessage.redelivered, '_envelope', 'redelivered')
+    synchronous = _lazy(IncomingMessage.synchronous, '_envelope', 'synchronous')
+
+
+class _TemplateProperties(BasicProperties):
+    """ :class:`pika.spec.BasicProperties` encoded from the segments precomputed by :class:`MessageTemplate`.
+    Any change of the properties (e.g. by :class:`aio_pika.compression.Compression`) falls back
+    to the regular encoding. """
+
+    def __setattr__(self, key, value):
+        self.__dict__['_template'] = None
+        super().__setattr__(key, value)
+
+    def encode(self):
+        template = self.__dict__['_template']
+
+        if template is None:
+            return super().encode()
+
+        flags = template.flags
+        pieces = [None, template.head]
+
+        if self.correlation_id is not None:
+            flags |= BasicProperties.FLAG_CORRELATION_ID
+            encode_short_string(pieces, self.correlation_id)
+
+        pieces.append(template.middle)
+
+        if self.message_id is not None:
+            flags |= BasicProperties.FLAG_MESSAGE_ID
+            encode_short_string(pieces, self.message_id)
+
+        if self.timestamp is not None:
+            flags |= BasicProperties.FLAG_TIMESTAMP
+            pieces.append(struct.pack('>Q', self.timestamp))
+
+        pieces.append(template.tail)
+
+        # All the property flags fit into the first 16 bits
+        pieces[0] = struct.pack('>H', flags)
+        return pieces
+
+
+def _encode_properties(**fields):
+    """ Property flags and the encoded fields without the flags """
+
+    pieces = BasicProperties(**fields).encode()
+    return struct.unpack('>H', pieces[0])[0], b''.join(pieces[1:])
+
+
+class MessageTemplate:
+    """ Prototype of the messages which differ only in the body, ``message_id``, ``correlation_id``
+    and ``timestamp``. The content header of its messages is encoded from the segments computed once
+    instead of encoding every property of every message.
+
+        >>> template = MessageTemplate(content_type='application/json', delivery_mode=DeliveryMode.PERSISTENT)
+        >>> yield from exchange.publish(template.message(b'{}', message_id='1'), 'key')
+
+    The ``headers`` are shared by the messages of the template, so they are read-only
+    (:class:`types.MappingProxyType`). Assign a new dict to change the headers of one message.
+    """
+
+    __slots__ = 'prototype', 'flags', 'head', 'middle', 'tail', '_fields', '_values',
+
+    def __init__(self, **kwargs):
+        """ Creates a new instance of :class:`MessageTemplate`
+
+        :param kwargs: arguments of :class:`Message`, except the body. ``message_id``, \
+        ``correlation_id`` and ``timestamp`` are the defaults of the messages.
+        """
+
+        self.prototype = Message(b'', **kwargs)
+
+        if self.prototype.headers is not None:
+            self.prototype.headers = MappingProxyType(dict(self.prototype.headers))
+
+        self._fields = dict(vars(self.prototype.properties))
+
+        # Slot values copied to every message
+        self._values = tuple(
+            (name, getattr(self.prototype, name))
+            for name in ('_Message__lock' if name == '__lock' else name for name in Message.__slots__)
+            if name != 'body'
+        )
+
+        fields = self._fields
+        head_flags, self.head = _encode_properties(
+            content_type=fields['content_type'],
+            content_encoding=fields['content_encoding'],
+            headers=fields['headers'],
+            delivery_mode=fields['delivery_mode'],
+            priority=fields['priority'],
+        )
+        middle_flags, self.middle = _encode_properties(
+            reply_to=fields['reply_to'],
+            expiration=fields['expiration'],
+        )
+        tail_flags, self.tail = _encode_properties(
+            type=fields['type'],
+            user_id=fields['user_id'],
+            app_id=fields['app_id'],
+            cluster_id=fields['cluster_id'],
+        )
+
+        self.flags = head_flags | middle_flags | tail_flags
+
+    def __repr__(self):
+        return "<MessageTemplate: %r>" % self.prototype
+
+    def message(self, body: bytes, *, message_id: str = None, correlation_id=None,
+                timestamp: DateType = None) -> 'TemplateMessage':
+        """ New message of the template
+
+        :param body: message body
+        :param message_id: message id, the one of the template when :class:`None`
+        :param correlation_id: correlation id, the one of the template when :class:`None`
+        :param timestamp: timestamp, the one of the template when :class:`None`
+        """
+
+        message = TemplateMessage.__new__(TemplateMessage)
+        init = object.__setattr__
+
+        for name, value in self._values:
+            init(message, name, value)
+
+        init(message, 'body', body if isinstance(body, bytes) else bytes(body))
+        init(message, '_template', self)
+
+        if message_id is not None:
+            init(message, 'message_id', message_id)
+
+        if correlation_id is not None:
+            init(message, 'correlation_id', Message._as_bytes(correlation_id))
+
+        if timestamp is not None:
+            init(message, 'timestamp', int(Message._convert_timestamp(timestamp)))
+
+        return message
+
+    def properties(self, message: Message) -> BasicProperties:
+        properties = _TemplateProperties.__new__(_TemplateProperties)
+        fields = properties.__dict__
+
+        fields.update(self._fields)
+        fields['correlation_id'] = message.correlation_id
+        fields['message_id'] = message.message_id
+        fields['timestamp'] = message.timestamp
+        fields['_template'] = self
+
+        return properties
+
+
+class TemplateMessage(Message):
+    """ Message created by :func:`MessageTemplate.message`. When any property is changed
+    its content header is encoded regularly. """
+
+    __slots__ = '_template',
+
+    @property
+    def properties(self):
+        if self._template is None:
+            return super().properties
+
+        return self._template.properties(self)
+
+    def __setattr__(self, key, value):
+        super().__setattr__(key, value)
+
+        if not key.startswith('_'):
+            object.__setattr__(self, '_template', None)
+
+
+__all__ = 'Message', 'IncomingMessage', 'LazyIncomingMessage', 'MessageTemplate', 'TemplateMessage',
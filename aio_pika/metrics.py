@@ -0,0 +1,227 @@
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Iterable
+
+
+#: metric name: (type, help)
+FAMILIES = OrderedDict((
+    ('aio_pika_connections_total', ('counter', 'Established AMQP connections')),
+    ('aio_pika_reconnects_total', ('counter', 'Connections established again after the first one')),
+    ('aio_pika_bytes_sent_total', ('counter', 'Bytes written to the broker')),
+    ('aio_pika_bytes_received_total', ('counter', 'Bytes read from the broker')),
+    ('aio_pika_channels', ('gauge', 'Open channels')),
+    ('aio_pika_published_total', ('counter', 'Published messages')),
+    ('aio_pika_confirmed_total', ('counter', 'Published messages confirmed by the broker')),
+    ('aio_pika_nacked_total', ('counter', 'Published messages rejected by the broker')),
+    ('aio_pika_returned_total', ('counter', 'Unroutable messages returned by the broker')),
+    ('aio_pika_confirms_in_flight', ('gauge', 'Published messages waiting for the broker confirmation')),
+    ('aio_pika_deliveries_total', ('counter', 'Messages received by the consumers and basic.get')),
+    ('aio_pika_delivered_bytes_total', ('counter', 'Body bytes of the received messages')),
+    ('aio_pika_acks_total', ('counter', 'Acknowledged messages')),
+    ('aio_pika_rejects_total', ('counter', 'Rejected messages')),
+    ('aio_pika_handler_seconds', ('histogram', 'Duration of the consumer callbacks')),
+))
+
+
+class Buckets:
+    """ Cumulative counts of the observations under the fixed bounds (Prometheus histogram) """
+
+    __slots__ = 'bounds', 'counts', 'sum', 'count'
+
+    DEFAULT_BOUNDS = (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+
+    def __init__(self, bounds: Iterable[float] = DEFAULT_BOUNDS):
+        self.bounds = tuple(sorted(bounds))
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name: str, labels: tuple):
+        cumulative = 0
+
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            yield name + '_bucket', labels + (('le', '%g' % bound),), cumulative
+
+        yield name + '_bucket', labels + (('le', '+Inf'),), self.count
+        yield name + '_sum', labels, self.sum
+        yield name + '_count', labels, self.count
+
+
+class QueueMetrics:
+    """ Counters of the messages received from the queue on one channel.
+    The ``handler_seconds`` are observed only for the connections with ``handler_timing``,
+    once per callback call (which handles the whole batch of the batched consumers). """
+
+    __slots__ = 'name', 'deliveries', 'delivered_bytes', 'acks', 'rejects', 'handler_seconds'
+
+    def __init__(self, name: str):
+        self.name = name
+        self.deliveries = 0
+        self.delivered_bytes = 0
+        self.acks = 0
+        self.rejects = 0
+        self.handler_seconds = Buckets()
+
+    def samples(self, labels: tuple = ()):
+        labels += (('queue', self.name),)
+
+        yield 'aio_pika_deliveries_total', labels, self.deliveries
+        yield 'aio_pika_delivered_bytes_total', labels, self.delivered_bytes
+        yield 'aio_pika_acks_total', labels, self.acks
+        yield 'aio_pika_rejects_total', labels, self.rejects
+
+        if self.handler_seconds.count:
+            yield from self.handler_seconds.samples('aio_pika_handler_seconds', labels)
+
+
+class ChannelMetrics:
+    """ Counters of the published messages and :class:`QueueMetrics` of one channel """
+
+    __slots__ = 'channel_number', 'published', 'confirmed', 'nacked', 'returned', 'confirmations', 'queues'
+
+    def __init__(self, confirmations: dict):
+        """ Creates a new instance of :class:`ChannelMetrics`
+
+        :param confirmations: the futures of the unconfirmed messages by the delivery tag
+        """
+
+        self.channel_number = None
+        self.published = 0
+        self.confirmed = 0
+        self.nacked = 0
+        self.returned = 0
+        self.confirmations = confirmations
+        self.queues = OrderedDict()
+
+    def queue(self, name: str) -> QueueMetrics:
+        """ :class:`QueueMetrics` of the queue, shared by all :class:`aio_pika.queue.Queue` of the channel """
+
+        metrics = self.queues.get(name)
+
+        if metrics is None:
+            metrics = self.queues[name] = QueueMetrics(name)
+
+        return metrics
+
+    def samples(self, labels: tuple = ()):
+        labels += (('channel', str(self.channel_number)),)
+
+        yield 'aio_pika_published_total', labels, self.published
+        yield 'aio_pika_confirmed_total', labels, self.confirmed
+        yield 'aio_pika_nacked_total', labels, self.nacked
+        yield 'aio_pika_returned_total', labels, self.returned
+        yield 'aio_pika_confirms_in_flight', labels, len(self.confirmations)
+
+        for queue in self.queues.values():
+            yield from queue.samples(labels)
+
+
+class ConnectionMetrics:
+    """ Counters of the connection and :class:`ChannelMetrics` of its open channels """
+
+    __slots__ = 'name', 'connections', 'channels', 'transport', '_bytes_sent', '_bytes_received'
+
+    def __init__(self, name: str):
+        """ Creates a new instance of :class:`ConnectionMetrics`
+
+        :param name: value of the ``connection`` label
+        """
+
+        self.name = name
+        self.connections = 0
+        self.channels = OrderedDict()
+        self.transport = None
+        self._bytes_sent = 0
+        self._bytes_received = 0
+
+    def connected(self, transport):
+        """ Count the new connection
+
+        :param transport: :class:`aio_pika.adapter.AsyncioConnection` which counts the bytes
+        """
+
+        if self.transport is not None:
+            self._bytes_sent += self.transport.bytes_sent
+            self._bytes_received += self.transport.bytes_received
+
+        self.connections += 1
+        self.transport = transport
+
+    @property
+    def bytes_sent(self) -> int:
+        return self._bytes_sent + (self.transport.bytes_sent if self.transport is not None else 0)
+
+    @property
+    def bytes_received(self) -> int:
+        return self._bytes_received + (self.transport.bytes_received if self.transport is not None else 0)
+
+    def samples(self, labels: tuple = ()):
+        labels += (('connection', self.name),)
+
+        yield 'aio_pika_connections_total', labels, self.connections
+        yield 'aio_pika_reconnects_total', labels, max(0, self.connections - 1)
+        yield 'aio_pika_bytes_sent_total', labels, self.bytes_sent
+        yield 'aio_pika_bytes_received_total', labels, self.bytes_received
+        yield 'aio_pika_channels', labels, len(self.channels)
+
+        for channel in list(self.channels):
+            yield from channel.samples(labels)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float):
+        return repr(value)
+
+    return str(value)
+
+
+def render(*metrics) -> str:
+    """ Prometheus text exposition format of the metrics
+
+        >>> render(connection.metrics)
+
+    :param metrics: :class:`ConnectionMetrics`, :class:`ChannelMetrics` or :class:`QueueMetrics`
+    :return: :class:`str`
+    """
+
+    families = OrderedDict((name, []) for name in FAMILIES)
+
+    for source in metrics:
+        for name, labels, value in source.samples():
+            family = name
+
+            if family not in families:
+                family = name.rsplit('_', 1)[0]
+
+            families[family].append((name, labels, value))
+
+    lines = []
+
+    for family, samples in families.items():
+        if not samples:
+            continue
+
+        type_, help_ = FAMILIES[family]
+        lines.append('# HELP %s %s' % (family, help_))
+        lines.append('# TYPE %s %s' % (family, type_))
+
+        for name, labels, value in samples:
+            if labels:
+                name += '{%s}' % ','.join('%s="%s"' % (key, _escape(label)) for key, label in labels)
+
+            lines.append('%s %s' % (name, _format_value(value)))
+
+    return '\n'.join(lines) + '\n'
+
+
+__all__ = 'Buckets', 'ChannelMetrics', 'ConnectionMetrics', 'QueueMetrics', 'render',
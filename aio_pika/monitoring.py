@@ -0,0 +1,157 @@
+import asyncio
+from collections import namedtuple
+from functools import partial
+from logging import getLogger
+from typing import Callable, Iterable
+
+from .channel import Channel
+from .tools import create_task, iscoroutinepartial
+
+
+log = getLogger(__name__)
+
+
+QueueState = namedtuple('QueueState', ('name', 'message_count', 'consumer_count'))
+
+
+class QueueMonitor:
+    """ Periodically polls the depth and the consumer count of the queues using
+    passive ``queue.declare`` and passes results into the callback.
+
+    The declarations are sent on a dedicated channel, which serializes the synchronous
+    methods (pika waits for each ``queue.declare-ok`` before sending the next declaration),
+    so one poll takes one sequential round trip per queue.
+
+        >>> def on_metrics(states):
+        ...     for state in states.values():
+        ...         print(state.name, state.message_count, state.consumer_count)
+        >>> monitor = QueueMonitor(connection, ['tasks', 'events'], on_metrics, interval=10)
+        >>> monitor.start()
+
+    """
+
+    __slots__ = 'connection', 'queues', 'callback', 'interval', 'timeout', 'loop', '_channel', '_task'
+
+    def __init__(self, connection, queues: Iterable[str], callback: Callable[[dict], None], *,
+                 interval: float = 5, timeout: int = None, loop: asyncio.AbstractEventLoop = None):
+
+        """ Creates a new instance of :class:`QueueMonitor`
+
+        :param connection: :class:`aio_pika.connection.Connection` instance
+        :param queues: names of the queues
+        :param callback: function or coroutine which will be called with :class:`dict` of \
+        the :class:`QueueState` by queue name after every poll. Missing queues are not included.
+        :param interval: seconds between polls
+        :param timeout: timeout for each declaration
+        :param loop: Event loop (:func:`asyncio.get_event_loop()` when :class:`None`)
+        """
+
+        self.connection = connection
+        self.queues = tuple(queues)
+        self.callback = callback
+        self.interval = interval
+        self.timeout = timeout
+        self.loop = loop or asyncio.get_event_loop()
+
+        self._channel = None    # type: Channel
+        self._task = None
+
+    def _on_channel_close(self, channel, closing: asyncio.Future):
+        if not closing.cancelled():
+            # Passive declaration of the missing queue closes the channel, it's expected here
+            closing.exception()
+
+        if self._channel is channel:
+            self._channel = None
+
+    @asyncio.coroutine
+    def _get_channel(self) -> Channel:
+        if self._channel is None:
+            channel = yield from self.connection.channel()
+            channel.add_close_callback(partial(self._on_channel_close, channel))
+            self._channel = channel
+
+        return self._channel
+
+    @asyncio.coroutine
+    def poll(self) -> dict:
+        """ Passive declare all queues once
+
+        :return: :class:`dict` of :class:`QueueState` by queue name
+        """
+
+        result = {}
+        pending = self.queues
+
+        while pending:
+            channel = yield from self._get_channel()
+
+            # Tasks are started in creation order, so declarations are sent one by one in the order of queues
+            tasks = [
+                create_task(loop=self.loop)(channel.declare_queue(name, passive=True, timeout=self.timeout))
+                for name in pending
+            ]
+
+            declared = yield from asyncio.gather(*tasks, loop=self.loop, return_exceptions=True)
+
+            retry = []
+            failed = False
+
+            for name, queue in zip(pending, declared):
+                if not isinstance(queue, Exception):
+                    result[name] = QueueState(name, queue.message_count, queue.consumer_count)
+                elif failed:
+                    # The broker closes the channel after the first failure,
+                    # so the rest of declarations should be sent again.
+                    retry.append(name)
+                else:
+                    failed = True
+                    log.warning("Failed to declare queue %r passively: %r", name, queue)
+
+            pending = retry
+
+        return result
+
+    @asyncio.coroutine
+    def _run(self):
+        while True:
+            try:
+                states = yield from self.poll()
+
+                if iscoroutinepartial(self.callback):
+                    yield from self.callback(states)
+                else:
+                    self.callback(states)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("Failed to poll queues %r", self.queues)
+
+            yield from asyncio.sleep(self.interval, loop=self.loop)
+
+    def start(self) -> asyncio.Task:
+        """ Start polling in background
+
+        :return: :class:`asyncio.Task` instance
+        """
+
+        if self._task is None or self._task.done():
+            self._task = create_task(loop=self.loop)(self._run())
+
+        return self._task
+
+    @asyncio.coroutine
+    def close(self):
+        """ Stop polling and close the dedicated channel """
+
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        channel, self._channel = self._channel, None
+
+        if channel is not None:
+            yield from channel.close()
+
+
+__all__ = 'QueueMonitor', 'QueueState',
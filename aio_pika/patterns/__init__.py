@@ -0,0 +1,10 @@
+from .packing import PackingPublisher, unpacking
+from .retry import DelayedRetry, exponential_delays
+from .rpc import RPCClient, RPCServer, correlation_ids
+from .streaming import StreamPublisher, StreamReassembler
+
+
+__all__ = (
+    'DelayedRetry', 'PackingPublisher', 'RPCClient', 'RPCServer', 'StreamPublisher', 'StreamReassembler',
+    'correlation_ids', 'exponential_delays', 'unpacking',
+)
@@ -0,0 +1,233 @@
+import asyncio
+import struct
+from functools import partial
+from inspect import Parameter, signature
+from logging import getLogger
+from typing import Callable, Iterable
+
+from ..exchange import Exchange
+from ..message import IncomingMessage, Message
+from ..tools import create_future, create_task, iscoroutinepartial
+
+
+log = getLogger(__name__)
+
+#: Length prefix of every record
+RECORD = struct.Struct('>I')
+
+#: Header with the count of the records in the envelope
+HEADER = 'x-packed-count'
+
+# Keyword arguments of Message besides the body
+_PROPERTIES = frozenset(
+    name for name, parameter in signature(Message).parameters.items() if parameter.kind is Parameter.KEYWORD_ONLY
+)
+
+
+def pack(records: Iterable[bytes]) -> bytes:
+    """ Envelope body of the length-prefixed records """
+
+    parts = []
+
+    for record in records:
+        parts.append(RECORD.pack(len(record)))
+        parts.append(record)
+
+    return b''.join(parts)
+
+
+def unpack(body: bytes) -> list:
+    """ Records of the envelope body
+
+    :raises ValueError: when the body is truncated
+    """
+
+    records = []
+    offset, size = 0, len(body)
+
+    while offset < size:
+        if offset + RECORD.size > size:
+            raise ValueError("Truncated record length at %d" % offset)
+
+        length, = RECORD.unpack_from(body, offset)
+        offset += RECORD.size
+
+        if offset + length > size:
+            raise ValueError("Truncated record of %d bytes at %d" % (length, offset))
+
+        records.append(body[offset:offset + length])
+        offset += length
+
+    return records
+
+
+def _resolve(future: asyncio.Future, task: asyncio.Future):
+    if future.done():
+        return
+
+    if task.cancelled():
+        future.cancel()
+    elif task.exception() is not None:
+        future.set_exception(task.exception())
+    else:
+        future.set_result(task.result())
+
+
+def _log_failure(routing_key: str, count: int, future: asyncio.Future):
+    if not future.cancelled() and future.exception() is not None:
+        log.error("Failed to publish envelope of %d records to %r: %r", count, routing_key, future.exception())
+
+
+class _Envelope:
+    __slots__ = 'records', 'size', 'future', 'handle'
+
+    def __init__(self, future: asyncio.Future, handle: asyncio.Handle):
+        self.records = []
+        self.size = 0
+        self.future = future
+        self.handle = handle
+
+
+class PackingPublisher:
+    """ Publishes many small records in one message (envelope), so the protocol
+    overhead (three frames, the confirmation, the delivery and the acknowledgement)
+    is paid once per envelope instead of once per record.
+
+    The records of one routing key are collected until the envelope reaches ``max_size``
+    bytes or ``max_delay`` seconds pass since its first record. Every record is
+    prefixed with its length (see :func:`pack`) and the envelope has the ``x-packed-count`` header.
+
+        >>> publisher = PackingPublisher(channel.default_exchange, max_size=64 * 1024, max_delay=0.05)
+        >>> publisher.publish(b'{"cpu":0.93}', 'telemetry')
+        >>> yield from publisher.flush()
+
+    Consume the envelopes with :func:`unpacking` to get the records back.
+    """
+
+    __slots__ = 'exchange', 'max_size', 'max_delay', 'properties', 'loop', '_envelopes', '_published'
+
+    def __init__(self, exchange: Exchange, *, max_size: int = 64 * 1024, max_delay: float = 0.05,
+                 loop: asyncio.AbstractEventLoop = None, **properties):
+
+        """ Creates a new instance of :class:`PackingPublisher`
+
+        :param exchange: :class:`aio_pika.exchange.Exchange` of the envelopes
+        :param max_size: envelope body size in bytes which makes it published right away. \
+        Bigger records are published in their own envelopes.
+        :param max_delay: seconds the first record of the envelope waits for the others
+        :param loop: Event loop (:func:`asyncio.get_event_loop()` when :class:`None`)
+        :param properties: properties of the envelopes, see :class:`aio_pika.message.Message`
+        :raises TypeError: when the name isn't the property of :class:`aio_pika.message.Message`
+        """
+
+        unknown = set(properties) - _PROPERTIES
+
+        if unknown:
+            raise TypeError("Unknown envelope properties: %s" % ', '.join(sorted(unknown)))
+
+        self.exchange = exchange
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.properties = properties
+        self.loop = loop or asyncio.get_event_loop()
+        self._envelopes = {}
+        self._published = set()
+
+    def publish(self, record: bytes, routing_key: str) -> asyncio.Future:
+        """ Add the record to the envelope of the routing key
+
+        :return: :class:`asyncio.Future` of the envelope publishing, shared by all its records. \
+        The failed envelopes are logged.
+        """
+
+        envelope = self._envelopes.get(routing_key)
+        size = RECORD.size + len(record)
+
+        if envelope is not None and envelope.size + size > self.max_size:
+            self._publish(routing_key)
+            envelope = None
+
+        if envelope is None:
+            envelope = self._envelopes[routing_key] = _Envelope(
+                create_future(loop=self.loop), self.loop.call_later(self.max_delay, self._publish, routing_key),
+            )
+
+        envelope.records.append(record)
+        envelope.size += size
+
+        if envelope.size >= self.max_size:
+            self._publish(routing_key)
+
+        return envelope.future
+
+    def _publish(self, routing_key: str):
+        envelope = self._envelopes.pop(routing_key, None)
+
+        if envelope is None:
+            return
+
+        envelope.handle.cancel()
+
+        headers = dict(self.properties.get('headers') or {})
+        headers[HEADER] = len(envelope.records)
+
+        message = Message(pack(envelope.records), **dict(self.properties, headers=headers))
+        task = create_task(loop=self.loop)(self.exchange.publish(message, routing_key))
+        task.add_done_callback(partial(_resolve, envelope.future))
+
+        self._published.add(envelope.future)
+        envelope.future.add_done_callback(self._published.discard)
+        envelope.future.add_done_callback(partial(_log_failure, routing_key, len(envelope.records)))
+
+    @asyncio.coroutine
+    def flush(self):
+        """ Publish all collected records and wait for the confirmations of all envelopes """
+
+        for routing_key in list(self._envelopes):
+            self._publish(routing_key)
+
+        if self._published:
+            yield from asyncio.gather(*self._published, loop=self.loop)
+
+
+def unpacking(callback: Callable, *, requeue: bool = False) -> Callable:
+    """ Returns coroutine consumer callback which calls the ``callback`` with ``(record, message)``
+    for every record of the envelope published by :class:`PackingPublisher`.
+    The messages without the ``x-packed-count`` header are passed as one record.
+
+    The envelope is acknowledged when the ``callback`` returns for all records and
+    rejected on the first exception. The records before the failed one are processed
+    again when the rejected envelope is requeued.
+
+        >>> queue.consume(unpacking(on_record))
+
+    :param callback: function or coroutine, the envelope ``message`` must not be acknowledged by it
+    :param requeue: requeue the rejected envelope
+    """
+
+    is_coroutine = iscoroutinepartial(callback)
+
+    @asyncio.coroutine
+    def consumer(message: IncomingMessage):
+        try:
+            if HEADER in (message.headers or {}):
+                records = unpack(message.body)
+            else:
+                records = message.body,
+
+            for record in records:
+                if is_coroutine:
+                    yield from callback(record, message)
+                else:
+                    callback(record, message)
+        except Exception:
+            log.exception("Failed to process record of the envelope %r", message.delivery_tag)
+            message.reject(requeue=requeue)
+            return
+
+        message.ack()
+
+    return consumer
+
+
+__all__ = 'HEADER', 'PackingPublisher', 'RECORD', 'pack', 'unpack', 'unpacking',
@@ -0,0 +1,171 @@
+import asyncio
+from logging import getLogger
+from typing import Callable, Sequence
+
+from ..message import IncomingMessage, Message
+from ..tools import iscoroutinepartial
+
+
+log = getLogger(__name__)
+
+
+def exponential_delays(base: float = 1, factor: float = 2, tiers: int = 5) -> tuple:
+    """ Delays of the retry tiers growing exponentially
+
+        >>> exponential_delays(1, 2, 5)
+        (1, 2, 4, 8, 16)
+
+    :param base: delay of the first tier in seconds
+    :param factor: multiplier of every next tier
+    :param tiers: count of the tiers
+    :return: :class:`tuple`
+    """
+
+    return tuple(base * factor ** tier for tier in range(tiers))
+
+
+class DelayedRetry:
+    """ Retries failed messages with exponential backoff instead of requeueing them.
+
+    Every delay tier is a queue with ``x-message-ttl`` and the default exchange as
+    ``x-dead-letter-exchange``, so an expired message goes back to the source queue.
+    A failed message is republished into the tier matching its attempt number (kept in
+    the ``x-retry-count`` header) and acknowledged. After ``max_retries`` attempts
+    the message is parked in the parking queue.
+
+        >>> retry = DelayedRetry(channel, 'tasks', delays=exponential_delays(1, 2, 5))
+        >>> yield from retry.declare()
+        >>> queue.consume(retry.wrap(handler))
+
+    """
+
+    HEADER = 'x-retry-count'
+
+    __slots__ = 'channel', 'queue_name', 'delays', 'max_retries', 'parking_queue', 'durable', 'exceptions'
+
+    def __init__(self, channel, queue_name: str, *, delays: Sequence[float] = None,
+                 max_retries: int = None, parking_queue: str = None, durable: bool = True,
+                 exceptions: tuple = (Exception,)):
+
+        """ Creates a new instance of :class:`DelayedRetry`
+
+        :param channel: :class:`aio_pika.channel.Channel` instance
+        :param queue_name: name of the source queue
+        :param delays: delays of the tiers in seconds (:func:`exponential_delays` by default)
+        :param max_retries: attempts before parking (count of the tiers by default). \
+        Messages of the attempts over the count of the tiers use the last tier.
+        :param parking_queue: name of the parking queue (``<queue_name>.parking`` by default)
+        :param durable: durability of the declared queues
+        :param exceptions: exceptions which should be retried by the :func:`DelayedRetry.wrap`
+        """
+
+        self.channel = channel
+        self.queue_name = queue_name
+        self.delays = tuple(delays or exponential_delays())
+        self.max_retries = len(self.delays) if max_retries is None else max_retries
+        self.parking_queue = parking_queue or '%s.parking' % queue_name
+        self.durable = durable
+        self.exceptions = exceptions
+
+        if not self.delays:
+            raise ValueError("At least one delay tier required")
+
+    def tier_name(self, tier: int) -> str:
+        return '%s.retry.%d' % (self.queue_name, self.delays[tier] * 1000)
+
+    @asyncio.coroutine
+    def declare(self, timeout: int = None):
+        """ Declare the delay tiers and the parking queue """
+
+        for tier, delay in enumerate(self.delays):
+            yield from self.channel.declare_queue(
+                self.tier_name(tier), durable=self.durable, timeout=timeout,
+                arguments={
+                    'x-message-ttl': int(delay * 1000),
+                    'x-dead-letter-exchange': '',
+                    'x-dead-letter-routing-key': self.queue_name,
+                }
+            )
+
+        yield from self.channel.declare_queue(self.parking_queue, durable=self.durable, timeout=timeout)
+
+    @classmethod
+    def attempts(cls, message: Message) -> int:
+        """ How many times the message was retried """
+
+        return (message.headers or {}).get(cls.HEADER, 0)
+
+    @asyncio.coroutine
+    def reject(self, message: IncomingMessage):
+        """ Republish the message into the next delay tier (or the parking queue)
+        and acknowledge the original one.
+
+        :return: name of the queue the message was republished to
+        """
+
+        attempt = self.attempts(message) + 1
+
+        if attempt > self.max_retries:
+            routing_key = self.parking_queue
+            log.warning("Message %r exceeded %d retries and will be parked", message.message_id, self.max_retries)
+        else:
+            routing_key = self.tier_name(min(attempt, len(self.delays)) - 1)
+
+        headers = dict(message.headers or {})
+        headers[self.HEADER] = attempt
+
+        yield from self.channel.default_exchange.publish(
+            Message(
+                body=message.body,
+                headers=headers,
+                content_type=message.content_type,
+                content_encoding=message.content_encoding,
+                delivery_mode=message.delivery_mode,
+                priority=message.priority,
+                correlation_id=message.correlation_id,
+                reply_to=message.reply_to,
+                message_id=message.message_id,
+                timestamp=message.timestamp,
+                type=message.type,
+                # user_id is omitted because the broker checks it against the publisher login
+                app_id=message.app_id,
+            ),
+            routing_key
+        )
+
+        message.ack()
+        return routing_key
+
+    def wrap(self, callback: Callable) -> Callable:
+        """ Returns coroutine consumer callback which acknowledges the message when
+        the ``callback`` returns and retries it when the ``callback`` raises one of the
+        :attr:`exceptions`. The message is rejected without requeueing (dead-lettered
+        when the source queue has ``x-dead-letter-exchange``) on the other exceptions.
+        """
+
+        @asyncio.coroutine
+        def wrapper(message: IncomingMessage):
+            try:
+                if iscoroutinepartial(callback):
+                    yield from callback(message)
+                else:
+                    callback(message)
+            except self.exceptions:
+                if message.processed:
+                    raise
+
+                log.exception("Failed to process message %r, attempt %d", message.message_id, self.attempts(message))
+                yield from self.reject(message)
+            except Exception:
+                # Not retried, but it must not stay unacknowledged
+                if not message.processed:
+                    message.reject(requeue=False)
+                raise
+            else:
+                if not message.processed:
+                    message.ack()
+
+        return wrapper
+
+
+__all__ = 'DelayedRetry', 'exponential_delays',
@@ -0,0 +1,351 @@
+import asyncio
+from functools import partial
+from itertools import count
+from logging import getLogger
+
+from typing import Callable
+
+from ..exceptions import RPCError
+from ..message import IncomingMessage, Message
+from ..tools import create_future, create_task, iscoroutinepartial
+
+
+log = getLogger(__name__)
+
+
+REPLY_TO = 'amq.rabbitmq.reply-to'
+ERROR_HEADER = 'x-rpc-error'
+
+
+def correlation_ids(prefix: bytes = b''):
+    """ Infinite generator of compact correlation ids: ``prefix`` followed by hex counter.
+
+        >>> ids = correlation_ids(b'a.')
+        >>> next(ids), next(ids), next(ids)
+        (b'a.0', b'a.1', b'a.2')
+
+    Replies of the direct reply-to are delivered to the requesting channel only,
+    so the counter is unique enough without any random part.
+    """
+
+    for number in count():
+        yield prefix + ('%x' % number).encode()
+
+
+class RPCClient:
+    """ RPC client over RabbitMQ direct reply-to.
+
+    Replies are consumed from ``amq.rabbitmq.reply-to`` pseudo-queue without
+    acknowledgement, so there is no reply queue declared per client and
+    no round trips except the request publishing.
+
+        >>> rpc = RPCClient(channel)
+        >>> yield from rpc.start()
+        >>> reply = yield from rpc.call(Message(b'ping'), 'rpc.ping', timeout=5)
+        >>> reply.body
+        b'pong'
+
+    The pending calls are failed when the deadline is reached, the client is
+    closed or the channel is closed.
+    """
+
+    __slots__ = 'channel', 'loop', 'futures', '_ids', '_queue', '_consumer_tag', '_watching'
+
+    def __init__(self, channel, *, loop: asyncio.AbstractEventLoop = None):
+        """ Creates a new instance of :class:`RPCClient`
+
+        :param channel: :class:`aio_pika.channel.Channel` instance. \
+        The channel should not be shared with another RPC client.
+        :param loop: Event loop (:func:`asyncio.get_event_loop()` when :class:`None`)
+        """
+
+        self.channel = channel
+        self.loop = loop or asyncio.get_event_loop()
+        self.futures = {}
+
+        self._ids = correlation_ids()
+        self._queue = None
+        self._consumer_tag = None
+        self._watching = False
+
+    @asyncio.coroutine
+    def start(self, timeout: int = None):
+        """ Start consuming replies. Must be called before the first call.
+
+        :param timeout: execution timeout
+        """
+
+        if self._consumer_tag is not None:
+            return
+
+        self._queue = self.channel.get_queue(REPLY_TO)
+        self._consumer_tag = self._queue.consume(self._on_reply, no_ack=True)
+
+        # The client may be restarted after close(), the channel is the same
+        if not self._watching:
+            self.channel.add_close_callback(self._on_channel_close)
+            self._watching = True
+
+        # RabbitMQ requires consuming amq.rabbitmq.reply-to before publishing with it.
+        # pika doesn't report ``basic.consume-ok``, but synchronous methods of the channel
+        # are sent one by one, so the passive declaration returns after the consumer is started.
+        yield from self.channel.declare_queue(REPLY_TO, passive=True, timeout=timeout)
+
+    def _on_reply(self, message: IncomingMessage):
+        future = self.futures.pop(message.correlation_id, None)
+
+        if future is None:
+            log.warning("Unknown correlation id %r of the reply, the call may be timed out", message.correlation_id)
+            return
+
+        if future.done():
+            return
+
+        if ERROR_HEADER in (message.headers or {}):
+            future.set_exception(RPCError(message.headers[ERROR_HEADER], message.body.decode(errors='replace')))
+        else:
+            future.set_result(message)
+
+    def _on_channel_close(self, closing: asyncio.Future):
+        if closing.cancelled() or closing.exception() is None:
+            exc = RuntimeError("Channel %r closed" % self.channel)
+        else:
+            exc = closing.exception()
+
+        # Consumer is gone together with the channel
+        self._consumer_tag = None
+        self._reject_all(exc)
+
+    def _reject_all(self, exc: Exception):
+        futures, self.futures = self.futures, {}
+
+        for future in futures.values():
+            if not future.done():
+                future.set_exception(exc)
+
+    def _on_call_done(self, correlation_id, handle: asyncio.Handle, future: asyncio.Future):
+        if handle is not None:
+            handle.cancel()
+
+        self.futures.pop(correlation_id, None)
+
+    @staticmethod
+    def _on_published(future: asyncio.Future, publishing: asyncio.Future):
+        if publishing.cancelled():
+            return
+
+        exc = publishing.exception()
+
+        if exc is not None and not future.done():
+            future.set_exception(exc)
+
+    @staticmethod
+    def _on_deadline(future: asyncio.Future):
+        if not future.done():
+            future.set_exception(asyncio.TimeoutError)
+
+    @asyncio.coroutine
+    def call(self, message: Message, routing_key: str, *, exchange=None, timeout: float = None) -> IncomingMessage:
+        """ Publish the request and wait for the reply.
+
+        :param message: :class:`aio_pika.message.Message` instance. \
+        The ``correlation_id`` and ``reply_to`` properties will be replaced.
+        :param routing_key: routing key of the request
+        :param exchange: :class:`aio_pika.exchange.Exchange` instance (default exchange when :class:`None`)
+        :param timeout: deadline of the call in seconds (including publishing), \
+        :class:`asyncio.TimeoutError` is raised when it's exceeded
+        :raises RPCError: when the handler of :class:`RPCServer` failed
+        :return: :class:`aio_pika.message.IncomingMessage` reply
+        """
+
+        if self._consumer_tag is None:
+            raise RuntimeError("RPC client is not started")
+
+        correlation_id = next(self._ids)
+        future = create_future(loop=self.loop)
+
+        handle = None
+        if timeout is not None:
+            handle = self.loop.call_later(timeout, self._on_deadline, future)
+
+        future.add_done_callback(partial(self._on_call_done, correlation_id, handle))
+        self.futures[correlation_id] = future
+
+        message.correlation_id = correlation_id
+        message.reply_to = REPLY_TO
+
+        exchange = exchange or self.channel.default_exchange
+
+        # The deadline covers the publisher confirmation too, so the call
+        # waits for the reply or the failed publishing, whichever comes first.
+        publishing = create_task(loop=self.loop)(exchange.publish(message, routing_key))
+        publishing.add_done_callback(partial(self._on_published, future))
+
+        return (yield from future)
+
+    @asyncio.coroutine
+    def close(self):
+        """ Stop consuming replies and fail the pending calls """
+
+        consumer_tag, self._consumer_tag = self._consumer_tag, None
+
+        self._reject_all(asyncio.CancelledError())
+
+        if consumer_tag is not None:
+            yield from self._queue.cancel(consumer_tag)
+
+
+class RPCServer:
+    """ Concurrent RPC server on top of :func:`aio_pika.queue.Queue.consume`.
+
+    Up to ``concurrency`` requests are handled at once. The request arrived when all
+    slots are busy is rejected (and requeued by default), so another server could take it.
+    The requeued request is rejected after ``backoff`` seconds, otherwise the only
+    saturated server would receive it again right away.
+    Set the prefetch count of the channel above ``concurrency`` to let the load be shed.
+
+    The reply is published to the ``reply_to`` of the request with its ``correlation_id``.
+    The slot is released as soon as the reply is sent, and the request is acknowledged
+    when the reply is confirmed by the broker, so the confirmation round trip is
+    pipelined with the next requests.
+
+        >>> def handler(message: IncomingMessage):
+        ...     return message.body.upper()
+        >>> server = RPCServer(channel, handler, concurrency=32)
+        >>> server.start(queue)
+
+    The handler is a function or coroutine which returns the reply body (:class:`bytes`)
+    or :class:`aio_pika.message.Message`. An exception of the handler is replied with
+    ``x-rpc-error`` header and raised as :class:`aio_pika.exceptions.RPCError`
+    by :class:`RPCClient`.
+    """
+
+    __slots__ = (
+        'channel', 'handler', 'concurrency', 'requeue', 'backoff', 'loop', 'in_flight',
+        'rejected', '_queue', '_consumer_tag', '_tasks',
+    )
+
+    def __init__(self, channel, handler: Callable, *, concurrency: int = 16, requeue: bool = True,
+                 backoff: float = 0.1, loop: asyncio.AbstractEventLoop = None):
+
+        """ Creates a new instance of :class:`RPCServer`
+
+        :param channel: :class:`aio_pika.channel.Channel` instance
+        :param handler: function or coroutine which will be called with the request \
+        :class:`aio_pika.message.IncomingMessage`
+        :param concurrency: maximum count of requests handled at once
+        :param requeue: requeue the requests rejected because of saturation
+        :param backoff: seconds the request waits before it's requeued
+        :param loop: Event loop (:func:`asyncio.get_event_loop()` when :class:`None`)
+        """
+
+        if concurrency < 1:
+            raise ValueError("Concurrency should be positive: %r" % concurrency)
+
+        self.channel = channel
+        self.handler = handler
+        self.concurrency = concurrency
+        self.requeue = requeue
+        self.backoff = backoff
+        self.loop = loop or asyncio.get_event_loop()
+        self.in_flight = 0
+        self.rejected = 0
+
+        self._queue = None
+        self._consumer_tag = None
+        self._tasks = set()
+
+    def start(self, queue) -> str:
+        """ Start consuming the requests
+
+        :param queue: :class:`aio_pika.queue.Queue` instance
+        :return: consumer tag
+        """
+
+        if self._consumer_tag is not None:
+            raise RuntimeError("RPC server is already started")
+
+        self._queue = queue
+        self._consumer_tag = queue.consume(self._on_request)
+        return self._consumer_tag
+
+    def _on_request(self, message: IncomingMessage):
+        if self.in_flight >= self.concurrency:
+            self.rejected += 1
+
+            if self.requeue and self.backoff > 0:
+                self.loop.call_later(self.backoff, self._reject, message)
+            else:
+                self._reject(message)
+
+            return
+
+        self.in_flight += 1
+        self._track(create_task(loop=self.loop)(self._handle(message)))
+
+    def _reject(self, message: IncomingMessage):
+        try:
+            message.reject(requeue=self.requeue)
+        except Exception:
+            log.exception("Failed to reject RPC request %r", message.correlation_id)
+
+    def _track(self, task: asyncio.Future):
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @asyncio.coroutine
+    def _handle(self, message: IncomingMessage):
+        try:
+            if iscoroutinepartial(self.handler):
+                result = yield from self.handler(message)
+            else:
+                result = self.handler(message)
+
+            if isinstance(result, Message):
+                reply = result
+            else:
+                reply = Message(b'' if result is None else result)
+        except Exception as e:
+            log.exception("Failed to handle RPC request %r", message.correlation_id)
+            reply = Message(repr(e).encode(), headers={ERROR_HEADER: type(e).__name__})
+        finally:
+            self.in_flight -= 1
+
+        if not message.reply_to:
+            message.ack()
+            return
+
+        reply.correlation_id = message.correlation_id
+
+        publishing = create_task(loop=self.loop)(self.channel.default_exchange.publish(reply, message.reply_to))
+        publishing.add_done_callback(partial(self._on_replied, message))
+        self._track(publishing)
+
+    @staticmethod
+    def _on_replied(message: IncomingMessage, publishing: asyncio.Future):
+        if publishing.cancelled():
+            return
+
+        try:
+            if publishing.exception() is None:
+                message.ack()
+            else:
+                log.error("Failed to reply RPC request %r: %r", message.correlation_id, publishing.exception())
+                message.reject(requeue=True)
+        except Exception:
+            log.exception("Failed to settle RPC request %r", message.correlation_id)
+
+    @asyncio.coroutine
+    def close(self):
+        """ Stop consuming and wait for the requests in progress """
+
+        consumer_tag, self._consumer_tag = self._consumer_tag, None
+
+        if consumer_tag is not None:
+            yield from self._queue.cancel(consumer_tag)
+
+        while self._tasks:
+            yield from asyncio.wait(list(self._tasks), loop=self.loop)
+
+
+__all__ = 'ERROR_HEADER', 'REPLY_TO', 'RPCClient', 'RPCServer', 'correlation_ids',
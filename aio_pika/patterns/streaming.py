@@ -0,0 +1,360 @@
+import asyncio
+import builtins
+import io
+import os
+import re
+import uuid
+from collections import deque
+from logging import getLogger
+from tempfile import SpooledTemporaryFile
+from typing import Callable
+
+from pika.spec import BasicProperties
+
+from ..compression import decompress
+from ..exceptions import DecompressionLimitError
+from ..exchange import Exchange
+from ..message import Message
+from ..tools import create_task, iscoroutinepartial
+
+
+log = getLogger(__name__)
+
+# Python 3.4 has no asynchronous iterators
+StopAsyncIteration = getattr(builtins, 'StopAsyncIteration', StopIteration)
+
+
+class _ChunkReader:
+    """ Reads the chunks of exactly ``size`` bytes (the last one may be shorter) from the file-like object,
+    the iterable of :class:`bytes` or the asynchronous iterator of :class:`bytes` """
+
+    __slots__ = 'source', 'size', 'buffer', '_next'
+
+    def __init__(self, source, size: int):
+        self.source = source
+        self.size = size
+        self.buffer = bytearray()
+
+        if hasattr(source, 'read'):
+            self._next = self._next_read
+        elif hasattr(source, '__aiter__'):
+            self.source = source.__aiter__()
+            self._next = self._next_async
+        else:
+            self.source = iter(source)
+            self._next = self._next_sync
+
+    @asyncio.coroutine
+    def _next_read(self) -> bytes:
+        data = self.source.read(self.size - len(self.buffer))
+
+        # asyncio.StreamReader and alike
+        if asyncio.iscoroutine(data) or isinstance(data, asyncio.Future):
+            data = yield from data
+
+        return data
+
+    @asyncio.coroutine
+    def _next_async(self) -> bytes:
+        try:
+            return (yield from self.source.__anext__())
+        except StopAsyncIteration:
+            return b''
+
+    @asyncio.coroutine
+    def _next_sync(self) -> bytes:
+        return next(self.source, b'')
+
+    @asyncio.coroutine
+    def read(self) -> bytes:
+        """ Next chunk, empty at the end of the source """
+
+        while len(self.buffer) < self.size:
+            data = yield from self._next()
+
+            if not data:
+                break
+
+            self.buffer += data
+
+        chunk = bytes(self.buffer[:self.size])
+        del self.buffer[:self.size]
+        return chunk
+
+    @asyncio.coroutine
+    def skip(self, count: int):
+        """ Skip ``count`` chunks, the seekable files are not read """
+
+        seekable = getattr(self.source, 'seekable', None)
+
+        if seekable is not None and seekable():
+            self.source.seek(count * self.size, io.SEEK_CUR)
+            return
+
+        for _ in range(count):
+            yield from self.read()
+
+
+class StreamPublisher:
+    """ Publishes the payloads which don't fit into the memory as the sequence of the chunk messages.
+
+    Every chunk has the ``x-stream-id``, ``x-stream-seq`` (from zero), ``x-stream-offset``
+    (in bytes) and ``x-stream-last`` headers. Only ``window`` chunks wait for the broker
+    confirmation at once, so at most ``chunk_size * window`` bytes are held in the memory.
+
+        >>> publisher = StreamPublisher(channel.default_exchange, chunk_size=1024 * 1024)
+        >>> with open('dump.tar', 'rb') as source:
+        ...     stream_id = yield from publisher.publish(source, 'files', content_type='application/x-tar')
+
+    Use the :class:`StreamReassembler` to receive the stream.
+    """
+
+    HEADER_ID = 'x-stream-id'
+    HEADER_SEQ = 'x-stream-seq'
+    HEADER_OFFSET = 'x-stream-offset'
+    HEADER_LAST = 'x-stream-last'
+
+    __slots__ = 'exchange', 'chunk_size', 'window', 'loop'
+
+    def __init__(self, exchange: Exchange, *, chunk_size: int = 1024 * 1024, window: int = 8,
+                 loop: asyncio.AbstractEventLoop = None):
+
+        """ Creates a new instance of :class:`StreamPublisher`
+
+        :param exchange: :class:`aio_pika.exchange.Exchange` of the chunks
+        :param chunk_size: body size of the chunks in bytes
+        :param window: chunks waiting for the confirmation at once
+        :param loop: Event loop (:func:`asyncio.get_event_loop()` when :class:`None`)
+        """
+
+        if chunk_size < 1 or window < 1:
+            raise ValueError("chunk_size and window must be positive")
+
+        self.exchange = exchange
+        self.chunk_size = chunk_size
+        self.window = window
+        self.loop = loop or asyncio.get_event_loop()
+
+    @asyncio.coroutine
+    def publish(self, source, routing_key: str, *, stream_id: str = None, start: int = 0, **kwargs) -> str:
+        """ Publish the stream and wait for the confirmation of all chunks
+
+        :param source: file-like object opened in the binary mode (``read()`` may be a coroutine, \
+        like :func:`asyncio.StreamReader.read`), iterable or asynchronous iterator of :class:`bytes`
+        :param routing_key: routing key of the chunks
+        :param stream_id: identifier of the stream (random when :class:`None`)
+        :param start: resume the interrupted publishing from this chunk. The ``source`` is positioned \
+        (seeked or read) ``start * chunk_size`` bytes forward, pass the same ``stream_id`` and ``chunk_size``.
+        :param kwargs: properties of the chunk messages, see :class:`aio_pika.message.Message`
+        :return: ``stream_id``
+        """
+
+        stream_id = stream_id or uuid.uuid4().hex
+        headers = kwargs.pop('headers', None) or {}
+
+        reader = _ChunkReader(source, self.chunk_size)
+        yield from reader.skip(start)
+
+        seq, offset = start, start * self.chunk_size
+        pending = deque()
+
+        try:
+            chunk = yield from reader.read()
+
+            while True:
+                following = (yield from reader.read()) if chunk else b''
+
+                chunk_headers = dict(headers)
+                chunk_headers[self.HEADER_ID] = stream_id
+                chunk_headers[self.HEADER_SEQ] = seq
+                chunk_headers[self.HEADER_OFFSET] = offset
+                chunk_headers[self.HEADER_LAST] = not following
+
+                message = Message(chunk, headers=chunk_headers, message_id='%s.%d' % (stream_id, seq), **kwargs)
+                pending.append(create_task(loop=self.loop)(self.exchange.publish(message, routing_key)))
+
+                if len(pending) >= self.window:
+                    yield from pending.popleft()
+
+                if not following:
+                    break
+
+                seq += 1
+                offset += len(chunk)
+                chunk = following
+
+            while pending:
+                yield from pending.popleft()
+        except:
+            for future in pending:
+                future.cancel()
+            raise
+
+        log.debug("Stream %r of %d chunks published to %r", stream_id, seq + 1, self.exchange)
+        return stream_id
+
+
+class _Stream:
+    __slots__ = 'id', 'file', 'path', 'delivery_tags', 'last', 'properties'
+
+    def __init__(self, stream_id: str, file, path: str = None):
+        self.id = stream_id
+        self.file = file
+        self.path = path
+        self.delivery_tags = {}
+        self.last = None
+        self.properties = None
+
+    @property
+    def complete(self) -> bool:
+        return self.last is not None and len(self.delivery_tags) == self.last + 1
+
+    def write(self, offset: int, body: bytes):
+        # The chunks written before the interruption may leave holes,
+        # the size of the file doesn't tell which of them are present
+        self.file.seek(offset)
+        self.file.write(body)
+
+
+def _is_position(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+class StreamReassembler:
+    """ Raw consumer callback which writes the chunks published by the :class:`StreamPublisher`
+    into a file and passes it to the ``callback`` when all chunks are received.
+
+        >>> def on_stream(stream_id: str, file, properties):
+        ...     shutil.copyfileobj(file, destination)
+        >>> queue.consume(StreamReassembler(channel, on_stream), raw=True)
+
+    The chunks are written by their offsets, so they may come in any order and the streams may interleave.
+    The chunks are acknowledged only after the ``callback`` returns, and rejected when it raises.
+    The broker keeps all chunks of the incomplete streams unacknowledged, so the prefetch count
+    (:func:`aio_pika.channel.Channel.set_qos`) must be zero or greater than the chunks of the concurrent streams.
+
+    Without the ``directory`` the stream is kept in the :class:`tempfile.SpooledTemporaryFile`.
+    With the ``directory`` it's written to the ``<stream_id>.part`` file, which is kept when the
+    consumer is interrupted or the rejected chunks are requeued. The redelivered chunks are written
+    again at their offsets. The file is removed after the ``callback``, move it away in the ``callback`` to keep it.
+
+    The chunk received twice (published again by the resumed :class:`StreamPublisher`) replaces the
+    previous one, which is acknowledged right away.
+    """
+
+    __slots__ = 'channel', 'callback', 'directory', 'max_size', 'requeue', 'loop', 'streams'
+
+    def __init__(self, channel, callback: Callable, *, directory: str = None, max_size: int = 16 * 1024 * 1024,
+                 requeue: bool = False, loop: asyncio.AbstractEventLoop = None):
+
+        """ Creates a new instance of :class:`StreamReassembler`
+
+        :param channel: :class:`aio_pika.channel.Channel` of the consumer
+        :param callback: function or coroutine called with ``(stream_id, file, properties)`` \
+        of the complete stream, the file is positioned at the start. ``properties`` are the \
+        :class:`pika.spec.BasicProperties` of the last chunk.
+        :param directory: directory of the partially received streams
+        :param max_size: bytes of the stream kept in the memory without the ``directory``
+        :param requeue: requeue the chunks when the ``callback`` raises
+        :param loop: Event loop (:func:`asyncio.get_event_loop()` when :class:`None`)
+        """
+
+        self.channel = channel
+        self.callback = callback
+        self.directory = directory
+        self.max_size = max_size
+        self.requeue = requeue
+        self.loop = loop or asyncio.get_event_loop()
+        self.streams = {}
+
+    def _open(self, stream_id: str) -> _Stream:
+        if self.directory is None:
+            return _Stream(stream_id, SpooledTemporaryFile(self.max_size))
+
+        path = os.path.join(self.directory, '%s.part' % re.sub(r'[^\w.-]', '_', stream_id))
+        return _Stream(stream_id, open(path, 'r+b' if os.path.exists(path) else 'w+b'), path)
+
+    def __call__(self, body: bytes, delivery_tag: int, routing_key: str, properties: BasicProperties):
+        headers = properties.headers or {}
+        stream_id = headers.get(StreamPublisher.HEADER_ID)
+
+        if stream_id is None:
+            log.warning("Message %r of %r is not a stream chunk and will be rejected", delivery_tag, routing_key)
+            self.channel.reject(delivery_tag, requeue=False)
+            return
+
+        seq = headers.get(StreamPublisher.HEADER_SEQ)
+        offset = headers.get(StreamPublisher.HEADER_OFFSET)
+
+        if not _is_position(seq) or not _is_position(offset):
+            log.warning(
+                "Chunk %r of stream %r has malformed sequence number %r or offset %r and will be rejected",
+                delivery_tag, stream_id, seq, offset,
+            )
+            self.channel.reject(delivery_tag, requeue=False)
+            return
+
+        # Raw deliveries are not decompressed by the consumer
+        try:
+            body, _ = decompress(body, properties)
+        except DecompressionLimitError:
+            log.exception("Chunk %r of stream %r is rejected", delivery_tag, stream_id)
+            self.channel.reject(delivery_tag, requeue=False)
+            return
+
+        stream = self.streams.get(stream_id)
+
+        if stream is None:
+            stream = self.streams[stream_id] = self._open(stream_id)
+
+        stream.write(offset, body)
+
+        # The duplicate's data is written over the previous one, which would be left unacknowledged
+        previous = stream.delivery_tags.get(seq)
+
+        if previous is not None:
+            self.channel.ack(previous)
+
+        stream.delivery_tags[seq] = delivery_tag
+
+        if headers.get(StreamPublisher.HEADER_LAST):
+            stream.last = seq
+            stream.properties = properties
+
+        if stream.complete:
+            del self.streams[stream_id]
+            create_task(loop=self.loop)(self._complete(stream))
+
+    @asyncio.coroutine
+    def _complete(self, stream: _Stream):
+        stream.file.flush()
+        stream.file.seek(0)
+
+        try:
+            if iscoroutinepartial(self.callback):
+                yield from self.callback(stream.id, stream.file, stream.properties)
+            else:
+                self.callback(stream.id, stream.file, stream.properties)
+        except Exception:
+            log.exception("Failed to process stream %r", stream.id)
+
+            for seq in sorted(stream.delivery_tags):
+                self.channel.reject(stream.delivery_tags[seq], requeue=self.requeue)
+
+            self._close(stream, keep=self.requeue)
+            return
+
+        for seq in sorted(stream.delivery_tags):
+            self.channel.ack(stream.delivery_tags[seq])
+
+        self._close(stream)
+
+    @staticmethod
+    def _close(stream: _Stream, keep: bool = False):
+        stream.file.close()
+
+        if stream.path is not None and not keep and os.path.exists(stream.path):
+            os.remove(stream.path)
+
+
+__all__ = 'StreamPublisher', 'StreamReassembler',
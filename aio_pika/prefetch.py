@@ -0,0 +1,265 @@
+import asyncio
+import math
+from collections import deque, namedtuple
+from functools import wraps
+from logging import getLogger
+from typing import Callable
+
+from .tools import create_task, iscoroutinepartial
+
+
+log = getLogger(__name__)
+
+
+PrefetchDecision = namedtuple('PrefetchDecision', (
+    'timestamp', 'previous', 'prefetch_count', 'throughput',
+    'handler_time', 'round_trip_time', 'in_flight',
+))
+
+
+class _ConsumerStats:
+    __slots__ = 'name', 'completed', 'busy_time', 'handler_time', 'in_flight'
+
+    def __init__(self, name):
+        self.name = name
+        self.completed = 0
+        self.busy_time = 0.
+        self.handler_time = None
+        self.in_flight = 0
+
+    def reset(self):
+        completed, busy_time = self.completed, self.busy_time
+        self.completed = 0
+        self.busy_time = 0.
+        return completed, busy_time
+
+
+def estimate_prefetch(consumers, round_trip_time: float, headroom: float = 1.5,
+                      min_prefetch: int = 1, max_prefetch: int = 1000) -> int:
+    """ Estimate prefetch count by the Little's law: the count of messages which should be
+    buffered by the client equals throughput multiplied by the time which every message
+    spends on the client (handler time) plus the time to get the next one from the broker.
+
+    :param consumers: iterable of ``(throughput, handler_time)`` pairs (messages per second and seconds)
+    :param round_trip_time: broker round trip time in seconds
+    :param headroom: multiplier for the estimation (should be greater than 1 to let throughput grow)
+    :param min_prefetch: lower bound
+    :param max_prefetch: upper bound
+    :return: :class:`int`
+    """
+
+    buffered = sum(throughput * (handler_time + round_trip_time) for throughput, handler_time in consumers)
+    return max(min_prefetch, min(max_prefetch, int(math.ceil(round(buffered * headroom, 6)))))
+
+
+class PrefetchController:
+    """ Opt-in controller which measures handler latency and broker round trip time and
+    periodically adjusts ``basic.qos`` of the channel to keep the local buffer just deep enough.
+
+    Wrap the consumer callbacks with :func:`PrefetchController.wrap` and call
+    :func:`PrefetchController.start`:
+
+        >>> controller = PrefetchController(channel, min_prefetch=1, max_prefetch=500)
+        >>> queue.consume(controller.wrap(on_message))
+        >>> controller.start()
+
+    The limit is set with ``global`` flag (:func:`aio_pika.channel.Channel.set_qos` with
+    ``all_channels=True``) because RabbitMQ applies changes of per-consumer limit to
+    the new consumers only. So it's better to have one controlled channel per queue.
+
+    Every decision is appended to :attr:`decisions` and passed to ``on_decision`` callback.
+    """
+
+    __slots__ = (
+        'channel', 'loop', 'min_prefetch', 'max_prefetch', 'interval', 'headroom', 'smoothing',
+        'on_decision', 'decisions', 'prefetch_count', 'round_trip_time', '_consumers', '_last_adjust', '_task',
+    )
+
+    def __init__(self, channel, *, min_prefetch: int = 1, max_prefetch: int = 1000, initial_prefetch: int = None,
+                 interval: float = 5, headroom: float = 1.5, smoothing: float = 0.3,
+                 on_decision: Callable[[PrefetchDecision], None] = None, history: int = 100,
+                 loop: asyncio.AbstractEventLoop = None):
+
+        """ Creates a new instance of :class:`PrefetchController`
+
+        :param channel: :class:`aio_pika.channel.Channel` instance
+        :param min_prefetch: lower bound of prefetch count
+        :param max_prefetch: upper bound of prefetch count
+        :param initial_prefetch: prefetch count before the first measurement (``min_prefetch`` by default)
+        :param interval: seconds between adjustments
+        :param headroom: multiplier for the estimation
+        :param smoothing: weight of the new measurement for the exponential moving averages
+        :param on_decision: function which will be called with every :class:`PrefetchDecision`
+        :param history: how many decisions will be kept in :attr:`decisions`
+        :param loop: Event loop (:func:`asyncio.get_event_loop()` when :class:`None`)
+        """
+
+        if not 0 < min_prefetch <= max_prefetch:
+            raise ValueError("Invalid prefetch bounds: %r, %r" % (min_prefetch, max_prefetch))
+
+        self.channel = channel
+        self.loop = loop or asyncio.get_event_loop()
+        self.min_prefetch = min_prefetch
+        self.max_prefetch = max_prefetch
+        self.interval = interval
+        self.headroom = headroom
+        self.smoothing = smoothing
+        self.on_decision = on_decision
+        self.decisions = deque(maxlen=history)
+        self.prefetch_count = initial_prefetch or min_prefetch
+        self.round_trip_time = None
+
+        self._consumers = []
+        self._last_adjust = None
+        self._task = None
+
+    def _smooth(self, average, value):
+        if average is None:
+            return value
+
+        return average + self.smoothing * (value - average)
+
+    def wrap(self, callback: Callable) -> Callable:
+        """ Returns consumer callback which measures latency of the ``callback``.
+        Coroutine functions are wrapped with coroutine. """
+
+        stats = _ConsumerStats(repr(callback))
+        self._consumers.append(stats)
+        time = self.loop.time
+
+        def record(started):
+            stats.in_flight -= 1
+            stats.completed += 1
+            stats.busy_time += time() - started
+
+        if iscoroutinepartial(callback):
+            @wraps(callback)
+            @asyncio.coroutine
+            def wrapper(message):
+                stats.in_flight += 1
+                started = time()
+
+                try:
+                    return (yield from callback(message))
+                finally:
+                    record(started)
+        else:
+            @wraps(callback)
+            def wrapper(message):
+                stats.in_flight += 1
+                started = time()
+
+                try:
+                    return callback(message)
+                finally:
+                    record(started)
+
+        return wrapper
+
+    @asyncio.coroutine
+    def _set_qos(self, prefetch_count):
+        started = self.loop.time()
+        yield from self.channel.set_qos(prefetch_count=prefetch_count, all_channels=True)
+        self.round_trip_time = self._smooth(self.round_trip_time, self.loop.time() - started)
+        self.prefetch_count = prefetch_count
+
+    def _decide(self, now, previous, measurements, throughput) -> PrefetchDecision:
+        handler_times = [handler_time for _, handler_time in measurements]
+
+        decision = PrefetchDecision(
+            timestamp=now,
+            previous=previous,
+            prefetch_count=self.prefetch_count,
+            throughput=throughput,
+            handler_time=sum(handler_times) / len(handler_times) if handler_times else None,
+            round_trip_time=self.round_trip_time,
+            in_flight=sum(stats.in_flight for stats in self._consumers),
+        )
+
+        self.decisions.append(decision)
+
+        if self.on_decision is not None:
+            self.on_decision(decision)
+
+        return decision
+
+    @asyncio.coroutine
+    def adjust(self) -> PrefetchDecision:
+        """ Make one adjustment immediately. The first call only sets the initial
+        prefetch count and measures the round trip time.
+
+        :return: :class:`PrefetchDecision`
+        """
+
+        now = self.loop.time()
+        previous = self.prefetch_count
+
+        if self._last_adjust is None:
+            # The failed round trip is retried by the next call
+            yield from self._set_qos(previous)
+            self._last_adjust = now
+            return self._decide(now, previous, (), 0.)
+
+        elapsed = max(now - self._last_adjust, 1e-9)
+        self._last_adjust = now
+
+        measurements = []
+        throughput = 0.
+
+        for stats in self._consumers:
+            completed, busy_time = stats.reset()
+
+            if completed:
+                stats.handler_time = self._smooth(stats.handler_time, busy_time / completed)
+
+            if stats.handler_time is not None:
+                measurements.append((completed / elapsed, stats.handler_time))
+                throughput += completed / elapsed
+
+        if throughput and self.round_trip_time is not None:
+            prefetch_count = estimate_prefetch(
+                measurements, self.round_trip_time, headroom=self.headroom,
+                min_prefetch=self.min_prefetch, max_prefetch=self.max_prefetch,
+            )
+        else:
+            # Nothing was processed or the round trip isn't measured yet, keep the buffer as it is
+            prefetch_count = previous
+
+        if prefetch_count != previous:
+            log.debug("Changing prefetch count of %r: %d -> %d", self.channel, previous, prefetch_count)
+            yield from self._set_qos(prefetch_count)
+
+        return self._decide(now, previous, measurements, throughput)
+
+    @asyncio.coroutine
+    def _run(self):
+        while True:
+            try:
+                yield from self.adjust()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("Failed to adjust prefetch count of %r", self.channel)
+
+            yield from asyncio.sleep(self.interval, loop=self.loop)
+
+    def start(self) -> asyncio.Task:
+        """ Set the initial prefetch count and start adjusting it in background
+
+        :return: :class:`asyncio.Task` instance
+        """
+
+        if self._task is None or self._task.done():
+            self._task = create_task(loop=self.loop)(self._run())
+
+        return self._task
+
+    def stop(self):
+        """ Stop adjusting. The last prefetch count stays in effect. """
+
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+__all__ = 'PrefetchController', 'PrefetchDecision', 'estimate_prefetch',
@@ -1,24 +1,113 @@
 import asyncio
+from functools import partial
 from logging import getLogger
+from time import perf_counter
+from concurrent.futures import Executor
 from types import FunctionType
 from pika.channel import Channel
 from .exchange import Exchange
-from .message import IncomingMessage
+from .message import IncomingMessage, LazyIncomingMessage
 from .common import BaseChannel, FutureStore
+from .exceptions import DecompressionLimitError
+from .instrumentation import Stage
+from .metrics import ChannelMetrics, QueueMetrics
 from .tools import create_task, iscoroutinepartial
 
 log = getLogger(__name__)
 
 
+def _observe(observer, stage: Stage, channel_number: int, item, timestamp: float):
+    if isinstance(item, list):
+        for message in item:
+            observer(stage, channel_number, message.delivery_tag, timestamp)
+    else:
+        observer(stage, channel_number, item.delivery_tag, timestamp)
+
+
+def _handle(callback: FunctionType, message: IncomingMessage, channel_number: int, observer, metrics: QueueMetrics):
+    """ Calls the callback with the instrumentation and the duration metric (when ``metrics`` is passed) """
+
+    started = perf_counter()
+
+    if observer is not None:
+        _observe(observer, Stage.HANDLER_START, channel_number, message, started)
+
+    try:
+        return callback(message)
+    finally:
+        finished = perf_counter()
+
+        if metrics is not None:
+            metrics.handler_seconds.observe(finished - started)
+
+        if observer is not None:
+            _observe(observer, Stage.HANDLER_END, channel_number, message, finished)
+
+
+@asyncio.coroutine
+def _handle_coroutine(callback: FunctionType, message: IncomingMessage, channel_number: int,
+                      observer, metrics: QueueMetrics):
+    started = perf_counter()
+
+    if observer is not None:
+        _observe(observer, Stage.HANDLER_START, channel_number, message, started)
+
+    try:
+        return (yield from callback(message))
+    finally:
+        finished = perf_counter()
+
+        if metrics is not None:
+            metrics.handler_seconds.observe(finished - started)
+
+        if observer is not None:
+            _observe(observer, Stage.HANDLER_END, channel_number, message, finished)
+
+
+def _reject_oversized(channel: Channel, delivery_tag: int, no_ack: bool, metrics: QueueMetrics):
+    log.exception("Message %r is rejected because its body can't be decompressed", delivery_tag)
+
+    if not no_ack:
+        channel.basic_reject(delivery_tag=delivery_tag, requeue=False)
+        metrics.rejects += 1
+
+
+@asyncio.coroutine
+def _run_in_executor(loop: asyncio.AbstractEventLoop, executor: Executor, callback: FunctionType,
+                     no_ack: bool, message: IncomingMessage):
+    """ Calls the callback in the executor and settles the messages in the event loop,
+    because the pika channel must not be used from the other threads """
+
+    messages = message if isinstance(message, list) else (message,)
+
+    try:
+        result = yield from loop.run_in_executor(executor, callback, message)
+    except Exception:
+        if not no_ack:
+            for item in messages:
+                if not item.processed:
+                    item.reject(requeue=False)
+        raise
+
+    if not no_ack:
+        for item in messages:
+            if not item.processed:
+                item.ack()
+
+    return result
+
+
 class Queue(BaseChannel):
     """ AMQP queue abstraction """
 
     __slots__ = ('name', 'durable', 'exclusive',
                  'auto_delete', 'arguments',
-                 '_channel', '__closing')
+                 'message_count', 'consumer_count',
+                 '_channel', '_loopback', '_observer', '_timing', '_channel_metrics', '__closing')
 
     def __init__(self, loop: asyncio.AbstractEventLoop, future_store: FutureStore,
-                 channel: Channel, name, durable, exclusive, auto_delete, arguments):
+                 channel: Channel, name, durable, exclusive, auto_delete, arguments, *,
+                 loopback=None, observer=None, timing: bool = False, metrics: ChannelMetrics = None):
 
         super().__init__(loop, future_store)
 
@@ -28,6 +117,12 @@ class Queue(BaseChannel):
         self.exclusive = exclusive
         self.auto_delete = auto_delete
         self.arguments = arguments
+        self.message_count = None
+        self.consumer_count = None
+        self._loopback = loopback
+        self._observer = observer
+        self._timing = timing
+        self._channel_metrics = metrics if metrics is not None else ChannelMetrics({})
 
     def __str__(self):
         return "%s" % self.name
@@ -38,11 +133,19 @@ class Queue(BaseChannel):
             self.exclusive, self.arguments,
         )
 
+    @property
+    def metrics(self) -> QueueMetrics:
+        """ :class:`aio_pika.metrics.QueueMetrics` of the queue on this channel """
+        return self._channel_metrics.queue(self.name)
+
     @BaseChannel._ensure_channel_is_open
-    def declare(self, timeout: int = None) -> asyncio.Future:
-        """ Declare queue.
+    def declare(self, timeout: int = None, passive: bool = False) -> asyncio.Future:
+        """ Declare queue. The :attr:`message_count` and :attr:`consumer_count` attributes
+        will be updated from the broker reply.
 
         :param timeout: execution timeout
+        :param passive: Only check the queue exists and fetch its counters. \
+        The channel will be closed by the broker when the queue does not exist.
         :return: :class:`None`
         """
 
@@ -52,13 +155,19 @@ class Queue(BaseChannel):
 
         self._channel.queue_declare(
             f.set_result,
-            self.name, durable=self.durable,
+            self.name, passive=passive, durable=self.durable,
             auto_delete=self.auto_delete, arguments=self.arguments,
             exclusive=self.exclusive
         )
 
         def on_queue_declared(result):
-            self.name = result.result().method.queue
+            if result.cancelled() or result.exception():
+                return
+
+            method = result.result().method
+            self.name = method.queue
+            self.message_count = method.message_count
+            self.consumer_count = method.consumer_count
 
         f.add_done_callback(on_queue_declared)
 
@@ -88,6 +197,9 @@ class Queue(BaseChannel):
 
         f = self._create_future(timeout)
 
+        if self._loopback is not None:
+            self._loopback.bind(self.name, exchange.name, self.name if routing_key is None else routing_key)
+
         self._channel.queue_bind(
             f.set_result,
             self.name,
@@ -118,6 +230,9 @@ class Queue(BaseChannel):
 
         f = self._create_future(timeout)
 
+        if self._loopback is not None:
+            self._loopback.unbind(self.name, exchange.name, routing_key)
+
         self._channel.queue_unbind(
             f.set_result,
             self.name,
@@ -130,35 +245,74 @@ class Queue(BaseChannel):
 
     @BaseChannel._ensure_channel_is_open
     def consume(self, callback: FunctionType,
-                no_ack: bool = False, exclusive: bool = False, arguments: dict = None):
+                no_ack: bool = False, exclusive: bool = False, arguments: dict = None, lazy: bool = False,
+                raw: bool = False, executor: Executor = None, batch: int = None):
 
         """ Start to consuming the :class:`Queue`.
 
+        The messages which body exceeds ``max_size`` of its compression codec are rejected
+        without calling the callback, see :class:`aio_pika.compression.Codec`.
+
         :param callback: Consuming callback
         :param no_ack: if :class:`True` you don't need to call :func:`aio_pika.message.IncomingMessage.ack`
         :param exclusive: Makes this queue exclusive. Exclusive queues may only be accessed by the current connection,
         and are deleted when that connection closes. Passive declaration of an exclusive queue by other connections
         are not allowed.
-        :return: :class:`None`
+        :param lazy: pass :class:`aio_pika.message.LazyIncomingMessage` to the callback, which converts \
+        the message fields on the first access (the oversized body raises \
+        :class:`aio_pika.exceptions.DecompressionLimitError` there)
+        :param raw: call the callback with ``(body, delivery_tag, routing_key, properties)`` \
+        without creating the :class:`aio_pika.message.IncomingMessage`, see :func:`Queue._raw_consumer`
+        :param executor: call the plain function callback in the :class:`concurrent.futures.Executor`. \
+        The message is acknowledged when the callback returns and rejected when it raises, \
+        it must not be settled in the executor thread.
+        :param batch: call the callback with the :class:`list` of up to ``batch`` messages \
+        delivered during one event loop iteration. The handler duration metric and the \
+        instrumentation stages measure the whole batch, so ``handler_seconds`` has one \
+        observation per batch while ``deliveries`` counts the messages.
+        :return: consumer tag :class:`str`
         """
 
         log.debug("Start to consuming queue: %r", self)
 
-        def consumer(channel: Channel, envelope, properties, body: bytes):
-            message = IncomingMessage(
-                channel=channel,
-                body=body,
-                envelope=envelope,
-                properties=properties,
-                no_ack=no_ack
+        if raw:
+            return self._channel.basic_consume(
+                consumer_callback=self._raw_consumer(callback),
+                queue=self.name,
+                no_ack=no_ack,
+                exclusive=exclusive,
+                arguments=arguments
             )
 
-            if iscoroutinepartial(callback):
-                create_task(loop=self.loop)(callback(message))
-            else:
-                self.loop.call_soon(callback, message)
+        observer = self._observer
+        metrics = self.metrics
+        message_class = LazyIncomingMessage if lazy else IncomingMessage
+        dispatch = self._dispatcher(callback, no_ack, executor, batch)
 
-        self._channel.basic_consume(
+        def consumer(channel: Channel, envelope, properties, body: bytes):
+            if observer is not None:
+                observer(Stage.DELIVERY_RECEIVED, channel.channel_number, envelope.delivery_tag, perf_counter())
+
+            metrics.deliveries += 1
+            metrics.delivered_bytes += len(body)
+
+            try:
+                message = message_class(
+                    channel=channel,
+                    body=body,
+                    envelope=envelope,
+                    properties=properties,
+                    no_ack=no_ack,
+                    observer=observer,
+                    metrics=metrics,
+                )
+            except DecompressionLimitError:
+                _reject_oversized(channel, envelope.delivery_tag, no_ack, metrics)
+                return
+
+            dispatch(message)
+
+        consumer_tag = self._channel.basic_consume(
             consumer_callback=consumer,
             queue=self.name,
             no_ack=no_ack,
@@ -166,6 +320,126 @@ class Queue(BaseChannel):
             arguments=arguments
         )
 
+        if self._loopback is not None:
+            # The short-circuited messages take the same path as the messages of the broker
+            self._loopback.add_consumer(self.name, self._channel, consumer_tag, consumer, no_ack)
+
+        return consumer_tag
+
+    def _dispatcher(self, callback: FunctionType, no_ack: bool, executor: Executor = None,
+                    batch: int = None) -> FunctionType:
+        """ Function which passes the message to the callback. The kind of the callback is
+        checked once here instead of on every delivery. The callback is wrapped by the
+        instrumentation only when the observer or the handler timing is enabled. """
+
+        observer = self._observer
+        metrics = self.metrics if self._timing else None
+        observed = observer is not None or metrics is not None
+        channel_number = self._channel.channel_number
+        call_soon = self.loop.call_soon
+
+        if executor is not None:
+            if iscoroutinepartial(callback):
+                raise TypeError("Coroutine %r can't be called in the executor" % callback)
+
+            callback = partial(_run_in_executor, self.loop, executor, callback, no_ack)
+
+        if executor is not None or iscoroutinepartial(callback):
+            task = create_task(loop=self.loop)
+
+            if observed:
+                def dispatch(message):
+                    task(_handle_coroutine(callback, message, channel_number, observer, metrics))
+            else:
+                def dispatch(message):
+                    task(callback(message))
+        elif observed:
+            def dispatch(message):
+                call_soon(_handle, callback, message, channel_number, observer, metrics)
+        else:
+            def dispatch(message):
+                call_soon(callback, message)
+
+        if not batch:
+            return dispatch
+
+        pending = []
+        scheduled = None
+
+        def flush():
+            nonlocal scheduled
+
+            # The full batch is flushed before the scheduled call, which must not
+            # dispatch the messages delivered after it as the premature partial batch
+            if scheduled is not None:
+                scheduled.cancel()
+                scheduled = None
+
+            if pending:
+                messages = pending[:]
+                del pending[:]
+                dispatch(messages)
+
+        def dispatch_batch(message: IncomingMessage):
+            nonlocal scheduled
+            pending.append(message)
+
+            if len(pending) >= batch:
+                flush()
+            elif scheduled is None:
+                scheduled = call_soon(flush)
+
+        return dispatch_batch
+
+    def _raw_consumer(self, callback: FunctionType) -> FunctionType:
+        """ The pika consumer callback of the raw mode. The messages are acknowledged by the delivery tag
+        with :func:`aio_pika.channel.Channel.ack` or :func:`aio_pika.channel.Channel.ack_multiple`.
+
+        Only the delivery counters are updated: the body is passed as is (not decompressed), the instrumentation
+        and the handler duration are skipped, and the queue is never short-circuited by the loopback.
+        Plain functions are called right in the delivery, coroutines are started as the tasks.
+        """
+
+        metrics = self.metrics
+
+        if iscoroutinepartial(callback):
+            task = create_task(loop=self.loop)
+
+            def consumer(channel: Channel, envelope, properties, body: bytes):
+                metrics.deliveries += 1
+                metrics.delivered_bytes += len(body)
+                task(callback(body, envelope.delivery_tag, envelope.routing_key, properties))
+        else:
+            def consumer(channel: Channel, envelope, properties, body: bytes):
+                metrics.deliveries += 1
+                metrics.delivered_bytes += len(body)
+
+                try:
+                    callback(body, envelope.delivery_tag, envelope.routing_key, properties)
+                except Exception:
+                    log.exception("Unhandled exception in the raw consumer of the queue %r", self)
+
+        return consumer
+
+    @BaseChannel._ensure_channel_is_open
+    def cancel(self, consumer_tag: str, timeout: int = None) -> asyncio.Future:
+        """ Stop consuming. Messages which were delivered before will not be affected,
+        except the unacknowledged messages short-circuited by the loopback, which are requeued.
+
+        :param consumer_tag: consumer tag returned by :func:`Queue.consume`
+        :param timeout: execution timeout
+        :return: :class:`None`
+        """
+
+        log.debug("Cancelling consumer %r of queue: %r", consumer_tag, self)
+
+        if self._loopback is not None:
+            self._loopback.remove_consumer(self.name, consumer_tag)
+
+        f = self._create_future(timeout)
+        self._channel.basic_cancel(f.set_result, consumer_tag=consumer_tag)
+        return f
+
     @BaseChannel._ensure_channel_is_open
     @asyncio.coroutine
     def get(self, *, no_ack=False, timeout=None) -> IncomingMessage:
@@ -174,6 +448,8 @@ class Queue(BaseChannel):
 
         :param no_ack: if :class:`True` you don't need to call :func:`aio_pika.message.IncomingMessage.ack`
         :param timeout: execution timeout
+        :raises aio_pika.exceptions.DecompressionLimitError: when the body exceeds ``max_size`` \
+        of its compression codec, the message is rejected
         :return: :class:`aio_pika.message.IncomingMessage`
         """
 
@@ -189,13 +465,23 @@ class Queue(BaseChannel):
 
         channel, envelope, props, body = yield from f
 
-        return IncomingMessage(
-            channel,
-            envelope,
-            props,
-            body,
-            no_ack=no_ack,
-        )
+        metrics = self.metrics
+        metrics.deliveries += 1
+        metrics.delivered_bytes += len(body)
+
+        try:
+            return IncomingMessage(
+                channel,
+                envelope,
+                props,
+                body,
+                no_ack=no_ack,
+                observer=self._observer,
+                metrics=metrics,
+            )
+        except DecompressionLimitError:
+            _reject_oversized(channel, envelope.delivery_tag, no_ack, metrics)
+            raise
 
     @BaseChannel._ensure_channel_is_open
     def purge(self, timeout=None) -> asyncio.Future:
@@ -225,6 +511,9 @@ class Queue(BaseChannel):
 
         self._futures.reject_all(RuntimeError("Queue was deleted"))
 
+        if self._loopback is not None:
+            self._loopback.delete_queue(self.name)
+
         future = self._create_future(timeout)
 
         self._channel.queue_delete(
@@ -0,0 +1,192 @@
+import codecs
+import json
+import struct
+from typing import Callable
+
+
+class Serializer:
+    """ Conversion of the Python objects to the message bodies of one ``content_type``.
+    Subclass it and pass the instance to :func:`register` to support another format. """
+
+    __slots__ = 'content_type',
+
+    def __init__(self, content_type: str):
+        self.content_type = content_type
+
+    def __repr__(self):
+        return "<%s: %s>" % (self.__class__.__name__, self.content_type)
+
+    def dumps(self, obj) -> bytes:
+        raise NotImplementedError
+
+    def loads(self, body: bytes):
+        raise NotImplementedError
+
+    def for_content_type(self, content_type: str) -> 'Serializer':
+        """ Serializer of the content type with the parameters (``; charset=latin-1``),
+        which is registered without them. The parameters are ignored by default.
+        """
+
+        return self
+
+
+def _parameters(content_type: str) -> dict:
+    parameters = {}
+
+    for parameter in content_type.split(';')[1:]:
+        name, _, value = parameter.partition('=')
+        parameters[name.strip().lower()] = value.strip().strip('"')
+
+    return parameters
+
+
+class BytesSerializer(Serializer):
+    """ The body as is """
+
+    __slots__ = ()
+
+    def dumps(self, obj) -> bytes:
+        return obj if isinstance(obj, bytes) else bytes(obj)
+
+    def loads(self, body: bytes) -> bytes:
+        return body
+
+
+class TextSerializer(Serializer):
+    """ :class:`str` encoded with the ``charset`` of the content type, UTF-8 when it's omitted """
+
+    __slots__ = 'encoding',
+
+    def __init__(self, content_type: str, encoding: str = 'utf-8'):
+        super().__init__(content_type)
+        self.encoding = encoding
+
+    def dumps(self, obj: str) -> bytes:
+        return obj.encode(self.encoding)
+
+    def loads(self, body: bytes) -> str:
+        return body.decode(self.encoding)
+
+    def for_content_type(self, content_type: str) -> 'TextSerializer':
+        charset = _parameters(content_type).get('charset')
+
+        if not charset:
+            return self
+
+        try:
+            encoding = codecs.lookup(charset).name
+        except LookupError:
+            raise ValueError("Unknown charset of content type %r" % content_type)
+
+        if encoding == codecs.lookup(self.encoding).name:
+            return self
+
+        return TextSerializer(content_type, encoding)
+
+
+class JSONSerializer(Serializer):
+    """ Compact UTF-8 encoded JSON """
+
+    __slots__ = 'encoder', 'decoder',
+
+    def __init__(self, content_type: str, encoder: json.JSONEncoder = None, decoder: json.JSONDecoder = None):
+        super().__init__(content_type)
+
+        # json.dumps() with any options creates the new encoder on every call
+        self.encoder = encoder or json.JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+        self.decoder = decoder or json.JSONDecoder()
+
+    def dumps(self, obj) -> bytes:
+        return self.encoder.encode(obj).encode()
+
+    def loads(self, body: bytes):
+        return self.decoder.decode(body.decode())
+
+
+class StructSerializer(Serializer):
+    """ Fixed size records packed with :mod:`struct`
+
+        >>> Point = namedtuple('Point', 'x y')
+        >>> register(StructSerializer('application/x-point', '<dd', Point._make))
+
+    """
+
+    __slots__ = 'struct', 'factory',
+
+    def __init__(self, content_type: str, format: str, factory: Callable = None):
+        """ Creates a new instance of :class:`StructSerializer`
+
+        :param content_type: content type of the records
+        :param format: :mod:`struct` format of the record
+        :param factory: called with the :class:`tuple` of the unpacked fields, e.g. ``namedtuple._make``
+        """
+
+        super().__init__(content_type)
+        self.struct = struct.Struct(format)
+        self.factory = factory
+
+    def dumps(self, obj) -> bytes:
+        return self.struct.pack(*obj)
+
+    def loads(self, body: bytes):
+        values = self.struct.unpack(body)
+
+        if self.factory is not None:
+            return self.factory(values)
+
+        return values
+
+
+#: content_type: :class:`Serializer`
+SERIALIZERS = {}
+
+
+def register(serializer: Serializer):
+    """ Use the serializer for the messages of its ``content_type`` """
+
+    SERIALIZERS[serializer.content_type] = serializer
+
+
+register(BytesSerializer('application/octet-stream'))
+register(TextSerializer('text/plain'))
+register(JSONSerializer('application/json'))
+
+
+def get_serializer(content_type: str) -> Serializer:
+    """ Serializer of the content type. When there is no serializer for the full value, the serializer
+    of the value without the parameters (``; charset=utf-8``) is used, see :func:`Serializer.for_content_type`.
+
+    :raises ValueError: when no serializer is registered
+    """
+
+    serializer = SERIALIZERS.get(content_type)
+
+    if serializer is None and content_type:
+        serializer = SERIALIZERS.get(content_type.split(';', 1)[0].strip())
+
+        if serializer is not None:
+            serializer = serializer.for_content_type(content_type)
+
+    if serializer is None:
+        raise ValueError("No serializer for content type %r" % content_type)
+
+    return serializer
+
+
+def dumps(obj, content_type: str) -> bytes:
+    return get_serializer(content_type).dumps(obj)
+
+
+def loads(body: bytes, content_type: str):
+    """ Decode the message body, the bodies without ``content_type`` are returned as is """
+
+    if content_type is None:
+        return body
+
+    return get_serializer(content_type).loads(body)
+
+
+__all__ = (
+    'SERIALIZERS', 'BytesSerializer', 'JSONSerializer', 'Serializer', 'StructSerializer', 'TextSerializer',
+    'dumps', 'get_serializer', 'loads', 'register',
+)
@@ -0,0 +1,1278 @@
+""" In-process AMQP 0-9-1 broker stand-in.
+
+:class:`LocalBroker` speaks the real wire protocol over a local TCP socket, so
+:func:`aio_pika.connect` (and any other AMQP client) can talk to it exactly as
+it would talk to RabbitMQ. It is meant for tests and reproducible benchmarks
+and keeps everything in memory:
+
+* exchanges (``direct``, ``fanout``, ``topic`` and ``headers``), queues and bindings
+* publisher confirms, mandatory returns
+* ``basic.qos`` (per consumer and per channel), ``basic.consume``, ``basic.get``,
+  ``basic.ack``, ``basic.nack`` and ``basic.reject``
+* ``x-message-ttl``, per-message expiration and dead-lettering
+* ``x-max-length`` with ``drop-head`` and ``reject-publish`` (nack) overflow
+* RabbitMQ direct reply-to (``amq.rabbitmq.reply-to``)
+
+    >>> broker = LocalBroker(loop=loop)
+    >>> yield from broker.start()
+    >>> connection = yield from connect(broker.url, loop=loop)
+
+It is not a durable or clustered broker, and it never sends heartbeats.
+
+"""
+import asyncio
+import struct
+import threading
+import uuid
+from collections import deque, OrderedDict
+from itertools import count
+from logging import getLogger
+
+from pika import frame, spec
+
+from .tools import topic_match
+
+
+log = getLogger(__name__)
+
+
+REPLY_TO_QUEUE = 'amq.rabbitmq.reply-to'
+
+_FRAME_HEADER = struct.Struct('>BHL')
+_FRAME_END = b'\xce'
+_PROTOCOL_HEADER = b'AMQP\x00\x00\x09\x01'
+_CLOSING_TIMEOUT = 5
+
+
+class _ChannelError(Exception):
+    def __init__(self, code, text):
+        super().__init__(code, text)
+        self.code = code
+        self.text = text
+
+
+class _ConnectionError(_ChannelError):
+    pass
+
+
+def _not_found(kind, name, vhost):
+    return _ChannelError(spec.NOT_FOUND, "NOT_FOUND - no %s '%s' in vhost '%s'" % (kind, name, vhost))
+
+
+def _precondition_failed(text):
+    return _ChannelError(spec.PRECONDITION_FAILED, "PRECONDITION_FAILED - %s" % text)
+
+
+class _Message:
+    __slots__ = 'exchange', 'routing_key', 'properties', 'body', 'redelivered', 'expire_handle', '_header'
+
+    def __init__(self, exchange, routing_key, properties, body, header=None):
+        self.exchange = exchange
+        self.routing_key = routing_key
+        self.properties = properties
+        self.body = body
+        self.redelivered = False
+        self.expire_handle = None
+        self._header = header
+
+    def header_payload(self):
+        """ Encoded content header frame payload (without the frame envelope) """
+
+        if self._header is None:
+            self._header = frame.Header(0, len(self.body), self.properties).marshal()[7:-1]
+
+        return self._header
+
+    def replace_properties(self, properties):
+        self.properties = properties
+        self._header = None
+
+
+class _Consumer:
+    __slots__ = 'tag', 'channel', 'queue', 'no_ack', 'exclusive', 'prefetch_count', 'unacked'
+
+    def __init__(self, tag, channel, queue, no_ack, exclusive, prefetch_count):
+        self.tag = tag
+        self.channel = channel
+        self.queue = queue
+        self.no_ack = no_ack
+        self.exclusive = exclusive
+        self.prefetch_count = prefetch_count
+        self.unacked = 0
+
+    def can_accept(self):
+        if self.no_ack:
+            return True
+
+        if self.prefetch_count and self.unacked >= self.prefetch_count:
+            return False
+
+        return self.channel.can_accept()
+
+
+class _Queue:
+    __slots__ = (
+        'broker', 'name', 'durable', 'exclusive', 'auto_delete', 'arguments', 'owner',
+        'messages', 'consumers', 'had_consumers', '_next_consumer',
+    )
+
+    def __init__(self, broker, name, durable, exclusive, auto_delete, arguments, owner):
+        self.broker = broker
+        self.name = name
+        self.durable = durable
+        self.exclusive = exclusive
+        self.auto_delete = auto_delete
+        self.arguments = arguments or {}
+        self.owner = owner if exclusive else None
+        self.messages = deque()
+        self.consumers = []
+        self.had_consumers = False
+        self._next_consumer = 0
+
+    @property
+    def message_ttl(self):
+        return self.arguments.get('x-message-ttl')
+
+    def enqueue(self, message: _Message, front=False) -> bool:
+        """ Returns :class:`False` when the message is rejected by ``x-overflow: reject-publish`` """
+
+        max_length = self.arguments.get('x-max-length')
+
+        if not front and max_length is not None and len(self.messages) >= max_length:
+            if self.arguments.get('x-overflow') == 'reject-publish':
+                return False
+
+            if not self.messages:
+                self.dead_letter(message, 'maxlen')
+                return True
+
+            self.dead_letter(self.messages.popleft(), 'maxlen')
+
+        if front:
+            self.messages.appendleft(message)
+        else:
+            self.messages.append(message)
+
+        ttl = self.message_ttl
+        expiration = message.properties.expiration
+
+        if expiration is not None:
+            expiration = int(expiration)
+            ttl = expiration if ttl is None else min(ttl, expiration)
+
+        if ttl is not None and message.expire_handle is None:
+            message.expire_handle = self.broker.loop.call_later(ttl / 1000., self._expire, message)
+
+        self.dispatch()
+        return True
+
+    def _expire(self, message: _Message):
+        message.expire_handle = None
+
+        try:
+            self.messages.remove(message)
+        except ValueError:
+            # Already delivered
+            return
+
+        self.dead_letter(message, 'expired')
+
+    def dead_letter(self, message: _Message, reason):
+        if message.expire_handle is not None:
+            message.expire_handle.cancel()
+            message.expire_handle = None
+
+        exchange = self.arguments.get('x-dead-letter-exchange')
+
+        if exchange is None:
+            return
+
+        routing_key = self.arguments.get('x-dead-letter-routing-key', message.routing_key)
+
+        properties = message.properties
+        headers = dict(properties.headers or {})
+        headers['x-death'] = [{
+            'count': 1,
+            'reason': reason,
+            'queue': self.name,
+            'exchange': message.exchange,
+            'routing-keys': [message.routing_key],
+        }] + list(headers.get('x-death', []))
+
+        properties = spec.BasicProperties(**properties.__dict__)
+        properties.headers = headers
+
+        if reason == 'expired':
+            properties.expiration = None
+
+        dead = _Message(exchange, routing_key, properties, message.body)
+        self.broker.route(dead)
+
+    def dispatch(self):
+        while self.messages and self.consumers:
+            consumers = self.consumers
+            total = len(consumers)
+
+            for offset in range(total):
+                index = (self._next_consumer + offset) % total
+                consumer = consumers[index]
+
+                if consumer.can_accept():
+                    break
+            else:
+                return
+
+            self._next_consumer = (index + 1) % total
+
+            message = self.messages.popleft()
+
+            if message.expire_handle is not None:
+                message.expire_handle.cancel()
+                message.expire_handle = None
+
+            consumer.channel.deliver(consumer, message)
+
+    def add_consumer(self, consumer: _Consumer):
+        self.consumers.append(consumer)
+        self.had_consumers = True
+        self.dispatch()
+
+    def remove_consumer(self, consumer: _Consumer):
+        if consumer in self.consumers:
+            self.consumers.remove(consumer)
+
+        if self.auto_delete and self.had_consumers and not self.consumers:
+            self.broker.delete_queue(self)
+
+    def purge(self):
+        messages = len(self.messages)
+
+        for message in self.messages:
+            if message.expire_handle is not None:
+                message.expire_handle.cancel()
+
+        self.messages.clear()
+        return messages
+
+
+class _Exchange:
+    __slots__ = 'name', 'type', 'durable', 'auto_delete', 'internal', 'arguments', 'bindings'
+
+    def __init__(self, name, type, durable=False, auto_delete=False, internal=False, arguments=None):
+        self.name = name
+        self.type = type
+        self.durable = durable
+        self.auto_delete = auto_delete
+        self.internal = internal
+        self.arguments = arguments or {}
+        self.bindings = OrderedDict()
+
+    def bind(self, queue: _Queue, routing_key, arguments):
+        self.bindings[(queue.name, routing_key)] = (queue, routing_key, arguments or {})
+
+    def unbind(self, queue: _Queue, routing_key):
+        self.bindings.pop((queue.name, routing_key), None)
+
+    @staticmethod
+    def _headers_match(arguments, headers):
+        match = arguments.get('x-match', 'all')
+        pairs = [(k, v) for k, v in arguments.items() if not k.startswith('x-')]
+
+        if match == 'any':
+            return any(headers.get(k) == v for k, v in pairs)
+
+        return all(k in headers and headers[k] == v for k, v in pairs)
+
+    def route(self, message: _Message):
+        result = []
+
+        for queue, routing_key, arguments in self.bindings.values():
+            if self.type == 'fanout':
+                matched = True
+            elif self.type == 'direct':
+                matched = routing_key == message.routing_key
+            elif self.type == 'topic':
+                matched = topic_match(routing_key, message.routing_key)
+            else:
+                matched = self._headers_match(arguments, message.properties.headers or {})
+
+            if matched and queue not in result:
+                result.append(queue)
+
+        return result
+
+
+class _Channel:
+    __slots__ = (
+        'connection', 'number', 'confirm', 'publish_seq', 'delivery_tags', 'unacked',
+        'prefetch_count', 'global_prefetch_count', 'consumers', 'reply_to', 'closing',
+        '_method', '_header', '_body', '_body_size',
+    )
+
+    def __init__(self, connection: '_Connection', number):
+        self.connection = connection
+        self.number = number
+        self.confirm = False
+        self.publish_seq = 0
+        self.delivery_tags = count(1)
+        self.unacked = OrderedDict()
+        self.prefetch_count = 0
+        self.global_prefetch_count = 0
+        self.consumers = {}
+        self.reply_to = None
+        self.closing = False
+
+        self._method = None
+        self._header = None
+        self._body = None
+        self._body_size = 0
+
+    @property
+    def broker(self) -> 'LocalBroker':
+        return self.connection.broker
+
+    def can_accept(self):
+        return not self.global_prefetch_count or len(self.unacked) < self.global_prefetch_count
+
+    def send_method(self, method):
+        self.connection.send_method(self.number, method)
+
+    def _send_content(self, method, message: _Message):
+        self.connection.send_content(self.number, method, message)
+
+    def deliver(self, consumer: _Consumer, message: _Message):
+        tag = next(self.delivery_tags)
+
+        if not consumer.no_ack:
+            consumer.unacked += 1
+            self.unacked[tag] = (consumer, consumer.queue, message)
+
+        self._send_content(
+            spec.Basic.Deliver(
+                consumer_tag=consumer.tag, delivery_tag=tag,
+                redelivered=message.redelivered, exchange=message.exchange,
+                routing_key=message.routing_key,
+            ),
+            message
+        )
+
+    # Content assembling
+
+    def on_method(self, method):
+        if self.closing:
+            if isinstance(method, spec.Channel.CloseOk):
+                self.connection.release_channel(self)
+            return
+
+        if self._method is not None:
+            raise _ConnectionError(spec.UNEXPECTED_FRAME, "UNEXPECTED_FRAME - expected content header")
+
+        if isinstance(method, spec.Basic.Publish):
+            self._method = method
+            return
+
+        handler = self.connection.broker.handlers.get(method.INDEX)
+
+        if handler is None:
+            raise _ConnectionError(spec.NOT_IMPLEMENTED, "NOT_IMPLEMENTED - %s" % method.NAME)
+
+        handler(self, method)
+
+    def on_header(self, payload):
+        if self.closing:
+            return
+
+        if self._method is None:
+            raise _ConnectionError(spec.UNEXPECTED_FRAME, "UNEXPECTED_FRAME - unexpected content header")
+
+        self._body_size = struct.unpack_from('>Q', payload, 4)[0]
+        self._header = payload
+        self._body = []
+
+        if not self._body_size:
+            self._publish_complete()
+
+    def on_body(self, payload):
+        if self.closing:
+            return
+
+        if self._header is None:
+            raise _ConnectionError(spec.UNEXPECTED_FRAME, "UNEXPECTED_FRAME - unexpected content body")
+
+        self._body.append(payload)
+        self._body_size -= len(payload)
+
+        if self._body_size <= 0:
+            self._publish_complete()
+
+    def _publish_complete(self):
+        method, header, body = self._method, self._header, self._body
+        self._method = self._header = self._body = None
+
+        properties = spec.BasicProperties()
+        properties.decode(header, 12)
+
+        body = body[0] if len(body) == 1 else b''.join(body)
+        self.broker.on_publish(self, method, _Message(method.exchange, method.routing_key, properties, body, header))
+
+    # Acknowledgements
+
+    def _pop_unacked(self, delivery_tag, multiple):
+        if multiple:
+            tags = [tag for tag in self.unacked if not delivery_tag or tag <= delivery_tag]
+        elif delivery_tag in self.unacked:
+            tags = [delivery_tag]
+        else:
+            raise _precondition_failed("unknown delivery tag %d" % delivery_tag)
+
+        result = []
+        for tag in tags:
+            consumer, queue, message = self.unacked.pop(tag)
+            if consumer is not None:
+                consumer.unacked -= 1
+            result.append((queue, message))
+
+        return result
+
+    def settle(self, delivery_tag, multiple, requeue=None):
+        queues = []
+        for queue, message in self._pop_unacked(delivery_tag, multiple):
+            if queue not in queues:
+                queues.append(queue)
+
+            if requeue is None:
+                continue
+
+            if requeue and self.broker.queues.get(queue.name) is queue:
+                message.redelivered = True
+                queue.enqueue(message, front=True)
+            else:
+                queue.dead_letter(message, 'rejected')
+
+        self.redispatch(queues)
+
+    def redispatch(self, queues=()):
+        queues = list(queues)
+        for consumer in self.consumers.values():
+            # Direct reply-to consumers have no queue
+            if consumer.queue is not None and consumer.queue not in queues:
+                queues.append(consumer.queue)
+
+        for queue in queues:
+            queue.dispatch()
+
+    def cancel_consumer(self, consumer: _Consumer):
+        self.consumers.pop(consumer.tag, None)
+
+        if consumer.queue is None:
+            self.broker.reply_consumers.pop(self.reply_to, None)
+            self.reply_to = None
+        else:
+            consumer.queue.remove_consumer(consumer)
+
+    def cleanup(self):
+        for consumer in list(self.consumers.values()):
+            self.cancel_consumer(consumer)
+
+        queues = []
+        for consumer, queue, message in reversed(list(self.unacked.values())):
+            if self.broker.queues.get(queue.name) is not queue:
+                continue
+
+            message.redelivered = True
+            queue.messages.appendleft(message)
+
+            if queue not in queues:
+                queues.append(queue)
+
+        self.unacked.clear()
+
+        for queue in queues:
+            queue.dispatch()
+
+
+class _Connection(asyncio.Protocol):
+    def __init__(self, broker: 'LocalBroker'):
+        self.broker = broker
+        self.transport = None
+        self.channels = {}
+        self.frame_max = broker.frame_max
+        self.opened = False
+
+        self._buffer = bytearray()
+        self._handshake = True
+        self._closing = False
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.broker.connections.add(self)
+
+    def connection_lost(self, exc):
+        self.broker.connections.discard(self)
+
+        for channel in list(self.channels.values()):
+            self.release_channel(channel)
+
+        for queue in list(self.broker.queues.values()):
+            if queue.owner is self:
+                self.broker.delete_queue(queue)
+
+        self.transport = None
+
+    def abort(self):
+        if self.transport is not None:
+            self.transport.close()
+
+    def write(self, data):
+        if self.transport is not None and not self.transport.is_closing():
+            self.transport.write(data)
+
+    def send_method(self, channel_number, method):
+        self.write(frame.Method(channel_number, method).marshal())
+
+    def send_content(self, channel_number, method, message: _Message):
+        header = message.header_payload()
+        body = message.body
+
+        pieces = [
+            frame.Method(channel_number, method).marshal(),
+            _FRAME_HEADER.pack(spec.FRAME_HEADER, channel_number, len(header)), header, _FRAME_END
+        ]
+
+        limit = self.frame_max - spec.FRAME_HEADER_SIZE - spec.FRAME_END_SIZE
+
+        for offset in range(0, len(body), limit):
+            chunk = body[offset:offset + limit]
+            pieces.append(_FRAME_HEADER.pack(spec.FRAME_BODY, channel_number, len(chunk)))
+            pieces.append(chunk)
+            pieces.append(_FRAME_END)
+
+        self.write(b''.join(pieces))
+
+    def data_received(self, data):
+        buffer = self._buffer
+        buffer.extend(data)
+
+        if self._handshake:
+            if len(buffer) < len(_PROTOCOL_HEADER):
+                return
+
+            if bytes(buffer[:len(_PROTOCOL_HEADER)]) != _PROTOCOL_HEADER:
+                self.write(_PROTOCOL_HEADER)
+                self.transport.close()
+                return
+
+            del buffer[:len(_PROTOCOL_HEADER)]
+            self._handshake = False
+            self.send_method(0, self.broker.connection_start())
+
+        offset = 0
+        size = len(buffer)
+
+        try:
+            while size - offset >= spec.FRAME_HEADER_SIZE:
+                frame_type, channel_number, frame_size = _FRAME_HEADER.unpack_from(buffer, offset)
+                end = offset + spec.FRAME_HEADER_SIZE + frame_size + spec.FRAME_END_SIZE
+
+                if end > size:
+                    break
+
+                if buffer[end - 1] != spec.FRAME_END:
+                    raise _ConnectionError(spec.FRAME_ERROR, "FRAME_ERROR - invalid frame end marker")
+
+                payload = bytes(buffer[offset + spec.FRAME_HEADER_SIZE:end - 1])
+                offset = end
+
+                # Only the reply to the connection.close of the broker is handled while closing
+                if self._closing and not self._is_close_ok(frame_type, channel_number, payload):
+                    continue
+
+                self._on_frame(frame_type, channel_number, payload)
+
+                if self.transport is None:
+                    return
+        except _ConnectionError as e:
+            self.close(e.code, e.text)
+        finally:
+            del buffer[:offset]
+
+    @staticmethod
+    def _is_close_ok(frame_type, channel_number, payload) -> bool:
+        return (
+            frame_type == spec.FRAME_METHOD and channel_number == 0 and
+            struct.unpack_from('>I', payload)[0] == spec.Connection.CloseOk.INDEX
+        )
+
+    def _on_frame(self, frame_type, channel_number, payload):
+        if frame_type == spec.FRAME_HEARTBEAT:
+            return
+
+        if channel_number == 0:
+            if frame_type != spec.FRAME_METHOD:
+                raise _ConnectionError(spec.COMMAND_INVALID, "COMMAND_INVALID - content on channel 0")
+
+            method = spec.methods[struct.unpack_from('>I', payload)[0]]()
+            method.decode(payload, 4)
+            return self._on_connection_method(method)
+
+        channel = self.channels.get(channel_number)
+
+        if frame_type == spec.FRAME_METHOD:
+            method = spec.methods[struct.unpack_from('>I', payload)[0]]()
+            method.decode(payload, 4)
+
+            if isinstance(method, spec.Channel.Open):
+                if channel is not None:
+                    raise _ConnectionError(spec.CHANNEL_ERROR, "CHANNEL_ERROR - second 'channel.open' seen")
+
+                self.channels[channel_number] = _Channel(self, channel_number)
+                return self.send_method(channel_number, spec.Channel.OpenOk())
+
+            if channel is None:
+                raise _ConnectionError(spec.CHANNEL_ERROR, "CHANNEL_ERROR - expected 'channel.open'")
+
+            try:
+                channel.on_method(method)
+            except _ConnectionError:
+                raise
+            except _ChannelError as e:
+                self.close_channel(channel, e.code, e.text, method)
+            return
+
+        if channel is None:
+            raise _ConnectionError(spec.CHANNEL_ERROR, "CHANNEL_ERROR - channel is not open")
+
+        try:
+            if frame_type == spec.FRAME_HEADER:
+                channel.on_header(payload)
+            elif frame_type == spec.FRAME_BODY:
+                channel.on_body(payload)
+            else:
+                raise _ConnectionError(spec.FRAME_ERROR, "FRAME_ERROR - unknown frame type %d" % frame_type)
+        except _ConnectionError:
+            raise
+        except _ChannelError as e:
+            self.close_channel(channel, e.code, e.text, channel._method)
+
+    def _on_connection_method(self, method):
+        broker = self.broker
+
+        if isinstance(method, spec.Connection.StartOk):
+            if not broker.authenticate(method.mechanism, method.response):
+                log.info("Login refused for connection %r", self)
+                self.transport.close()
+                return
+
+            self.send_method(0, spec.Connection.Tune(
+                channel_max=broker.channel_max, frame_max=broker.frame_max, heartbeat=0
+            ))
+        elif isinstance(method, spec.Connection.TuneOk):
+            if method.frame_max:
+                self.frame_max = min(method.frame_max, broker.frame_max)
+        elif isinstance(method, spec.Connection.Open):
+            if method.virtual_host != broker.virtual_host:
+                raise _ConnectionError(
+                    spec.NOT_ALLOWED,
+                    "NOT_ALLOWED - access to vhost '%s' refused" % method.virtual_host
+                )
+
+            self.opened = True
+            self.send_method(0, spec.Connection.OpenOk())
+        elif isinstance(method, spec.Connection.Close):
+            # Like RabbitMQ, wait for the client to close the socket. pika sends
+            # connection.close again when a few channels were closing at once.
+            self._closing = True
+            self.send_method(0, spec.Connection.CloseOk())
+            self.broker.loop.call_later(_CLOSING_TIMEOUT, self.abort)
+        elif isinstance(method, spec.Connection.CloseOk):
+            self.transport.close()
+        else:
+            raise _ConnectionError(spec.NOT_IMPLEMENTED, "NOT_IMPLEMENTED - %s" % method.NAME)
+
+    def close(self, code, text):
+        log.info("Closing connection %r: %d %s", self, code, text)
+        self._closing = True
+        self.send_method(0, spec.Connection.Close(code, text, 0, 0))
+
+    def close_channel(self, channel: _Channel, code, text, method=None):
+        log.info("Closing channel %d: %d %s", channel.number, code, text)
+
+        class_id, method_id = (method.INDEX >> 16, method.INDEX & 0xffff) if method else (0, 0)
+        channel.cleanup()
+        channel.closing = True
+        self.send_method(channel.number, spec.Channel.Close(code, text, class_id, method_id))
+
+    def release_channel(self, channel: _Channel):
+        channel.cleanup()
+        self.channels.pop(channel.number, None)
+
+
+class LocalBroker:
+    """ In-process AMQP 0-9-1 broker listening on a local TCP socket """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, *, login: str = 'guest', password: str = 'guest',
+                 virtual_host: str = '/', frame_max: int = spec.FRAME_MAX_SIZE, channel_max: int = 2047,
+                 loop: asyncio.AbstractEventLoop = None):
+
+        """ Creates a new instance of :class:`LocalBroker`
+
+        :param host: address to listen on
+        :param port: port to listen on (``0`` picks a free port)
+        :param login: accepted username
+        :param password: accepted password
+        :param virtual_host: the only virtual host of the broker
+        :param frame_max: maximum frame size proposed to clients
+        :param channel_max: maximum number of channels proposed to clients
+        :param loop: Event loop (:func:`asyncio.get_event_loop()` when :class:`None`)
+        """
+
+        self.loop = loop or asyncio.get_event_loop()
+        self.host = host
+        self.port = port
+        self.login = login
+        self.password = password
+        self.virtual_host = virtual_host
+        self.frame_max = frame_max
+        self.channel_max = channel_max
+
+        self.connections = set()
+        self.queues = {}
+        self.exchanges = {}
+        self.reply_consumers = {}
+        self.server = None
+
+        self.handlers = {
+            spec.Channel.Close.INDEX: self._on_channel_close,
+            spec.Channel.Flow.INDEX: self._on_channel_flow,
+            spec.Exchange.Declare.INDEX: self._on_exchange_declare,
+            spec.Exchange.Delete.INDEX: self._on_exchange_delete,
+            spec.Queue.Declare.INDEX: self._on_queue_declare,
+            spec.Queue.Bind.INDEX: self._on_queue_bind,
+            spec.Queue.Unbind.INDEX: self._on_queue_unbind,
+            spec.Queue.Purge.INDEX: self._on_queue_purge,
+            spec.Queue.Delete.INDEX: self._on_queue_delete,
+            spec.Basic.Qos.INDEX: self._on_basic_qos,
+            spec.Basic.Consume.INDEX: self._on_basic_consume,
+            spec.Basic.Cancel.INDEX: self._on_basic_cancel,
+            spec.Basic.Get.INDEX: self._on_basic_get,
+            spec.Basic.Ack.INDEX: self._on_basic_ack,
+            spec.Basic.Reject.INDEX: self._on_basic_reject,
+            spec.Basic.Nack.INDEX: self._on_basic_nack,
+            spec.Basic.Recover.INDEX: self._on_basic_recover,
+            spec.Confirm.Select.INDEX: self._on_confirm_select,
+        }
+
+        self._declare_default_exchanges()
+
+    def __repr__(self):
+        return "<{}: {}>".format(self.__class__.__name__, self.url)
+
+    @property
+    def url(self) -> str:
+        """ Broker address suitable for :func:`aio_pika.connect` """
+
+        return "amqp://{}:{}@{}:{}/{}".format(
+            self.login, self.password, self.host, self.port,
+            '' if self.virtual_host == '/' else self.virtual_host
+        )
+
+    def _declare_default_exchanges(self):
+        self.exchanges[''] = _Exchange('', 'direct', durable=True)
+
+        for exchange_type in ('direct', 'fanout', 'topic', 'headers'):
+            name = 'amq.%s' % exchange_type
+            self.exchanges[name] = _Exchange(name, exchange_type, durable=True)
+
+        self.exchanges['amq.match'] = _Exchange('amq.match', 'headers', durable=True)
+
+    @asyncio.coroutine
+    def start(self):
+        """ Start listening. Updates :attr:`port` when it was ``0``. """
+
+        self.server = yield from self.loop.create_server(lambda: _Connection(self), self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        log.debug("Local broker started: %r", self)
+
+    @asyncio.coroutine
+    def close(self):
+        """ Stop listening and drop all client connections """
+
+        if self.server is None:
+            return
+
+        self.server.close()
+
+        for connection in list(self.connections):
+            if connection.transport is not None:
+                connection.transport.close()
+
+        yield from self.server.wait_closed()
+        self.server = None
+
+    def connection_start(self):
+        return spec.Connection.Start(
+            version_major=0, version_minor=9,
+            server_properties={
+                'product': 'aio-pika local broker',
+                'capabilities': {
+                    'publisher_confirms': True,
+                    'exchange_exchange_bindings': False,
+                    'basic.nack': True,
+                    'consumer_cancel_notify': True,
+                    'connection.blocked': False,
+                    'per_consumer_qos': True,
+                    'direct_reply_to': True,
+                },
+            },
+            mechanisms='PLAIN', locales='en_US'
+        )
+
+    def authenticate(self, mechanism, response):
+        if mechanism != 'PLAIN':
+            return False
+
+        if isinstance(response, str):
+            response = response.encode()
+
+        return response.split(b'\x00')[1:] == [self.login.encode(), self.password.encode()]
+
+    # Routing
+
+    def route(self, message: _Message, rejected: list = None):
+        """ Route message and return the list of queues which received it. The queues
+        which refused the message because of ``x-overflow`` are appended to ``rejected``. """
+
+        if message.exchange == '' and message.routing_key.startswith(REPLY_TO_QUEUE + '.'):
+            consumer = self.reply_consumers.get(message.routing_key)
+
+            if consumer is None:
+                return []
+
+            consumer.channel.deliver(consumer, message)
+            return [consumer]
+
+        exchange = self.exchanges.get(message.exchange)
+
+        if exchange is None:
+            return []
+
+        if exchange.name == '':
+            queue = self.queues.get(message.routing_key)
+            queues = [queue] if queue is not None else []
+        else:
+            queues = exchange.route(message)
+
+        for queue in queues:
+            if not queue.enqueue(message if len(queues) == 1 else self._copy(message)) and rejected is not None:
+                rejected.append(queue)
+
+        return queues
+
+    @staticmethod
+    def _copy(message: _Message):
+        return _Message(message.exchange, message.routing_key, message.properties, message.body, message._header)
+
+    def on_publish(self, channel: _Channel, method, message: _Message):
+        if channel.confirm:
+            channel.publish_seq += 1
+
+        if method.exchange not in self.exchanges:
+            raise _not_found('exchange', method.exchange, self.virtual_host)
+
+        properties = message.properties
+
+        if properties.delivery_mode not in (None, 1, 2):
+            raise _precondition_failed("invalid delivery mode %r" % properties.delivery_mode)
+
+        if properties.reply_to == REPLY_TO_QUEUE:
+            if channel.reply_to is None:
+                raise _precondition_failed("fast reply consumer does not exist")
+
+            properties = spec.BasicProperties(**properties.__dict__)
+            properties.reply_to = channel.reply_to
+            message.replace_properties(properties)
+
+        rejected = []
+        routed = self.route(message, rejected)
+
+        if not routed and method.mandatory:
+            channel._send_content(
+                spec.Basic.Return(
+                    reply_code=spec.NO_ROUTE, reply_text='NO_ROUTE',
+                    exchange=method.exchange, routing_key=method.routing_key
+                ),
+                message
+            )
+
+        if channel.confirm and rejected:
+            channel.send_method(spec.Basic.Nack(delivery_tag=channel.publish_seq, multiple=False, requeue=False))
+        elif channel.confirm:
+            channel.send_method(spec.Basic.Ack(delivery_tag=channel.publish_seq, multiple=False))
+
+    def delete_queue(self, queue: _Queue):
+        if self.queues.get(queue.name) is not queue:
+            return 0
+
+        del self.queues[queue.name]
+
+        for consumer in list(queue.consumers):
+            consumer.channel.consumers.pop(consumer.tag, None)
+            consumer.channel.send_method(spec.Basic.Cancel(consumer_tag=consumer.tag, nowait=True))
+
+        queue.consumers = []
+
+        for exchange in list(self.exchanges.values()):
+            keys = [key for key in exchange.bindings if key[0] == queue.name]
+
+            for key in keys:
+                exchange.bindings.pop(key)
+
+            # Only the exchanges unbound from this queue are auto-deleted
+            if keys and exchange.auto_delete and not exchange.bindings:
+                self.exchanges.pop(exchange.name, None)
+
+        return queue.purge()
+
+    def _get_queue(self, channel: _Channel, name):
+        queue = self.queues.get(name)
+
+        if queue is None:
+            raise _not_found('queue', name, self.virtual_host)
+
+        if queue.owner is not None and queue.owner is not channel.connection:
+            raise _ChannelError(
+                spec.RESOURCE_LOCKED,
+                "RESOURCE_LOCKED - cannot obtain exclusive access to locked queue '%s'" % name
+            )
+
+        return queue
+
+    def _get_exchange(self, name):
+        exchange = self.exchanges.get(name)
+
+        if exchange is None:
+            raise _not_found('exchange', name, self.virtual_host)
+
+        return exchange
+
+    # Method handlers
+
+    def _on_channel_close(self, channel: _Channel, method):
+        channel.send_method(spec.Channel.CloseOk())
+        channel.connection.release_channel(channel)
+
+    def _on_channel_flow(self, channel: _Channel, method):
+        channel.send_method(spec.Channel.FlowOk(active=method.active))
+
+    def _on_exchange_declare(self, channel: _Channel, method):
+        exchange = self.exchanges.get(method.exchange)
+
+        if method.passive:
+            if exchange is None:
+                raise _not_found('exchange', method.exchange, self.virtual_host)
+        elif exchange is None:
+            if method.type not in ('direct', 'fanout', 'topic', 'headers'):
+                raise _ConnectionError(
+                    spec.COMMAND_INVALID, "COMMAND_INVALID - unknown exchange type '%s'" % method.type
+                )
+
+            if method.exchange.startswith('amq.'):
+                raise _ChannelError(
+                    spec.ACCESS_REFUSED,
+                    "ACCESS_REFUSED - exchange name '%s' contains reserved prefix 'amq.*'" % method.exchange
+                )
+
+            self.exchanges[method.exchange] = _Exchange(
+                method.exchange, method.type, durable=method.durable,
+                auto_delete=method.auto_delete, internal=method.internal, arguments=method.arguments
+            )
+        elif exchange.type != method.type or exchange.durable != method.durable:
+            raise _precondition_failed(
+                "inequivalent arg 'type' or 'durable' for exchange '%s' in vhost '%s'" % (
+                    method.exchange, self.virtual_host
+                )
+            )
+
+        if not method.nowait:
+            channel.send_method(spec.Exchange.DeclareOk())
+
+    def _on_exchange_delete(self, channel: _Channel, method):
+        exchange = self.exchanges.get(method.exchange)
+
+        if exchange is not None:
+            if method.if_unused and exchange.bindings:
+                raise _precondition_failed("exchange '%s' in use" % method.exchange)
+
+            if method.exchange == '' or method.exchange.startswith('amq.'):
+                raise _ChannelError(spec.ACCESS_REFUSED, "ACCESS_REFUSED - operation not permitted")
+
+            del self.exchanges[method.exchange]
+
+        if not method.nowait:
+            channel.send_method(spec.Exchange.DeleteOk())
+
+    def _on_queue_declare(self, channel: _Channel, method):
+        name = method.queue
+        queue = self.queues.get(name) if name else None
+
+        if method.passive:
+            if name == REPLY_TO_QUEUE:
+                result = spec.Queue.DeclareOk(queue=name, message_count=0, consumer_count=0)
+                if not method.nowait:
+                    channel.send_method(result)
+                return
+
+            queue = self._get_queue(channel, name)
+        elif queue is None:
+            if name.startswith('amq.'):
+                raise _ChannelError(
+                    spec.ACCESS_REFUSED,
+                    "ACCESS_REFUSED - queue name '%s' contains reserved prefix 'amq.*'" % name
+                )
+
+            name = name or 'amq.gen-%s' % uuid.uuid4().hex
+            queue = _Queue(
+                self, name, method.durable, method.exclusive,
+                method.auto_delete, method.arguments, channel.connection
+            )
+            self.queues[name] = queue
+        else:
+            queue = self._get_queue(channel, name)
+
+            if queue.durable != method.durable:
+                raise _precondition_failed(
+                    "inequivalent arg 'durable' for queue '%s' in vhost '%s'" % (name, self.virtual_host)
+                )
+
+        if not method.nowait:
+            channel.send_method(spec.Queue.DeclareOk(
+                queue=queue.name, message_count=len(queue.messages), consumer_count=len(queue.consumers)
+            ))
+
+    def _on_queue_bind(self, channel: _Channel, method):
+        queue = self._get_queue(channel, method.queue)
+        exchange = self._get_exchange(method.exchange)
+        exchange.bind(queue, method.routing_key or '', method.arguments)
+
+        if not method.nowait:
+            channel.send_method(spec.Queue.BindOk())
+
+    def _on_queue_unbind(self, channel: _Channel, method):
+        queue = self._get_queue(channel, method.queue)
+        exchange = self._get_exchange(method.exchange)
+        exchange.unbind(queue, method.routing_key or '')
+
+        if exchange.auto_delete and not exchange.bindings:
+            self.exchanges.pop(exchange.name, None)
+
+        channel.send_method(spec.Queue.UnbindOk())
+
+    def _on_queue_purge(self, channel: _Channel, method):
+        queue = self._get_queue(channel, method.queue)
+        messages = queue.purge()
+
+        if not method.nowait:
+            channel.send_method(spec.Queue.PurgeOk(message_count=messages))
+
+    def _on_queue_delete(self, channel: _Channel, method):
+        queue = self.queues.get(method.queue)
+        messages = 0
+
+        if queue is not None:
+            queue = self._get_queue(channel, method.queue)
+
+            if method.if_unused and queue.consumers:
+                raise _precondition_failed("queue '%s' in vhost '%s' in use" % (queue.name, self.virtual_host))
+
+            if method.if_empty and queue.messages:
+                raise _precondition_failed(
+                    "queue '%s' in vhost '%s' is not empty" % (queue.name, self.virtual_host)
+                )
+
+            messages = self.delete_queue(queue)
+
+        if not method.nowait:
+            channel.send_method(spec.Queue.DeleteOk(message_count=messages))
+
+    def _on_basic_qos(self, channel: _Channel, method):
+        if method.global_:
+            channel.global_prefetch_count = method.prefetch_count
+        else:
+            channel.prefetch_count = method.prefetch_count
+
+        channel.send_method(spec.Basic.QosOk())
+        channel.redispatch()
+
+    def _on_basic_consume(self, channel: _Channel, method):
+        tag = method.consumer_tag or 'amq.ctag-%s' % uuid.uuid4().hex
+
+        if tag in channel.consumers:
+            raise _ConnectionError(spec.NOT_ALLOWED, "NOT_ALLOWED - attempt to reuse consumer tag '%s'" % tag)
+
+        if method.queue == REPLY_TO_QUEUE:
+            if not method.no_ack:
+                raise _precondition_failed("reply consumer cannot acknowledge")
+
+            if channel.reply_to is not None:
+                raise _precondition_failed("reply consumer already set")
+
+            consumer = _Consumer(tag, channel, None, True, True, 0)
+            channel.reply_to = '%s.%s' % (REPLY_TO_QUEUE, uuid.uuid4().hex)
+            channel.consumers[tag] = consumer
+            self.reply_consumers[channel.reply_to] = consumer
+
+            if not method.nowait:
+                channel.send_method(spec.Basic.ConsumeOk(consumer_tag=tag))
+            return
+
+        queue = self._get_queue(channel, method.queue)
+
+        if method.exclusive and queue.consumers:
+            raise _ChannelError(
+                spec.ACCESS_REFUSED,
+                "ACCESS_REFUSED - queue '%s' in vhost '%s' in exclusive use" % (queue.name, self.virtual_host)
+            )
+
+        if any(c.exclusive for c in queue.consumers):
+            raise _ChannelError(
+                spec.ACCESS_REFUSED,
+                "ACCESS_REFUSED - queue '%s' in vhost '%s' in exclusive use" % (queue.name, self.virtual_host)
+            )
+
+        consumer = _Consumer(tag, channel, queue, method.no_ack, method.exclusive, channel.prefetch_count)
+        channel.consumers[tag] = consumer
+
+        if not method.nowait:
+            channel.send_method(spec.Basic.ConsumeOk(consumer_tag=tag))
+
+        queue.add_consumer(consumer)
+
+    def _on_basic_cancel(self, channel: _Channel, method):
+        consumer = channel.consumers.get(method.consumer_tag)
+
+        if consumer is not None:
+            channel.cancel_consumer(consumer)
+
+        if not method.nowait:
+            channel.send_method(spec.Basic.CancelOk(consumer_tag=method.consumer_tag))
+
+    def _on_basic_get(self, channel: _Channel, method):
+        queue = self._get_queue(channel, method.queue)
+
+        if not queue.messages:
+            channel.send_method(spec.Basic.GetEmpty())
+            return
+
+        message = queue.messages.popleft()
+
+        if message.expire_handle is not None:
+            message.expire_handle.cancel()
+            message.expire_handle = None
+
+        tag = next(channel.delivery_tags)
+
+        if not method.no_ack:
+            channel.unacked[tag] = (None, queue, message)
+
+        channel._send_content(
+            spec.Basic.GetOk(
+                delivery_tag=tag, redelivered=message.redelivered,
+                exchange=message.exchange, routing_key=message.routing_key,
+                message_count=len(queue.messages)
+            ),
+            message
+        )
+
+    def _on_basic_ack(self, channel: _Channel, method):
+        channel.settle(method.delivery_tag, method.multiple)
+
+    def _on_basic_reject(self, channel: _Channel, method):
+        channel.settle(method.delivery_tag, False, requeue=method.requeue)
+
+    def _on_basic_nack(self, channel: _Channel, method):
+        channel.settle(method.delivery_tag, method.multiple, requeue=method.requeue)
+
+    def _on_basic_recover(self, channel: _Channel, method):
+        for consumer in list(channel.consumers.values()):
+            consumer.unacked = 0
+
+        for tag, (consumer, queue, message) in reversed(list(channel.unacked.items())):
+            message.redelivered = True
+            queue.messages.appendleft(message)
+
+        channel.unacked.clear()
+        channel.send_method(spec.Basic.RecoverOk())
+        channel.redispatch()
+
+    def _on_confirm_select(self, channel: _Channel, method):
+        channel.confirm = True
+
+        if not method.nowait:
+            channel.send_method(spec.Confirm.SelectOk())
+
+
+def run_in_thread(host: str = '127.0.0.1', port: int = 0, **kwargs) -> LocalBroker:
+    """ Start :class:`LocalBroker` with its own event loop in a daemon thread.
+    Useful when the clients use another event loop (e.g. every test case has its own loop).
+
+        >>> broker = run_in_thread()
+        >>> connection = yield from connect(broker.url, loop=loop)
+
+    :param host: address to listen on
+    :param port: port to listen on (``0`` picks a free port)
+    :param kwargs: other arguments of :class:`LocalBroker`
+    :return: started :class:`LocalBroker` instance
+    """
+
+    loop = asyncio.new_event_loop()
+    broker = LocalBroker(host, port, loop=loop, **kwargs)
+    started = threading.Event()
+    errors = []
+
+    def run():
+        asyncio.set_event_loop(loop)
+
+        try:
+            loop.run_until_complete(broker.start())
+        except Exception as e:
+            errors.append(e)
+            return
+        finally:
+            started.set()
+
+        loop.run_forever()
+
+    threading.Thread(target=run, name='LocalBroker', daemon=True).start()
+    started.wait()
+
+    if errors:
+        raise errors[0]
+
+    return broker
+
+
+@asyncio.coroutine
+def _serve(host, port, loop):
+    broker = LocalBroker(host, port, loop=loop)
+    yield from broker.start()
+    print("Listening on %s" % broker.url)
+
+
+__all__ = 'LocalBroker', 'REPLY_TO_QUEUE', 'run_in_thread',
+
+
+if __name__ == '__main__':
+    import argparse
+    import logging
+
+    parser = argparse.ArgumentParser(description="In-process AMQP 0-9-1 broker stand-in")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5672)
+    parser.add_argument('--log-level', default='warning')
+
+    arguments = parser.parse_args()
+    logging.basicConfig(level=getattr(logging, arguments.log_level.upper()))
+
+    main_loop = asyncio.get_event_loop()
+    main_loop.run_until_complete(_serve(arguments.host, arguments.port, main_loop))
+    main_loop.run_forever()
@@ -0,0 +1,108 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from functools import partial
+
+from .channel import Channel
+from .exchange import Exchange
+from .message import Message
+
+
+class ThreadSafePublisher:
+    """ Publishes the messages submitted from any thread through the channel owned by the event loop thread.
+
+    The messages submitted between two event loop iterations are published by one callback,
+    so a batch costs one loop wakeup instead of one :func:`asyncio.run_coroutine_threadsafe`
+    per message. Messages are published with :func:`aio_pika.exchange.Exchange.publish_nowait`,
+    so no :class:`asyncio.Future` is created either.
+
+        >>> publisher = ThreadSafePublisher(channel, loop=loop)
+        >>> # in another thread
+        >>> future = publisher.publish(Message(b'data'), 'routing_key')
+        >>> future.result(timeout=5)
+
+    """
+
+    __slots__ = 'channel', 'loop', 'max_batch', '_pending', '_lock', '_scheduled'
+
+    def __init__(self, channel: Channel, *, max_batch: int = 1000, loop: asyncio.AbstractEventLoop = None):
+        """ Creates a new instance of :class:`ThreadSafePublisher`
+
+        :param channel: :class:`aio_pika.channel.Channel` instance
+        :param max_batch: messages published by one loop callback, the rest waits for the next iteration
+        :param loop: Event loop of the channel (:func:`asyncio.get_event_loop()` when :class:`None`)
+        """
+
+        self.channel = channel
+        self.loop = loop or asyncio.get_event_loop()
+        self.max_batch = max_batch
+
+        self._pending = []
+        self._lock = threading.Lock()
+        self._scheduled = False
+
+    def publish(self, message: Message, routing_key: str, *,
+                exchange: Exchange = None, mandatory: bool = True) -> Future:
+        """ Submit the message from any thread
+
+        :param message: :class:`aio_pika.message.Message` instance
+        :param routing_key: routing key
+        :param exchange: :class:`aio_pika.exchange.Exchange` of the channel, the default exchange when omitted
+        :param mandatory: return the unroutable message
+        :return: :class:`concurrent.futures.Future` resolved with :class:`True` when the broker confirms \
+        the message (or when the message is written to the socket for the channel without publisher \
+        confirms) and failed with :class:`aio_pika.exceptions.NackError` when the broker rejects it
+        """
+
+        future = Future()
+
+        with self._lock:
+            self._pending.append((exchange, message, routing_key, mandatory, future))
+
+            if self._scheduled:
+                return future
+
+            self._scheduled = True
+
+        self.loop.call_soon_threadsafe(self._flush)
+        return future
+
+    @staticmethod
+    def _on_confirm(future: Future, exc: Exception):
+        if exc is None:
+            future.set_result(True)
+        else:
+            future.set_exception(exc)
+
+    def _flush(self):
+        with self._lock:
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+
+            # Decided under the lock: publish() may set the flag again right after it's released
+            more = bool(self._pending)
+            self._scheduled = more
+
+        if more:
+            # The rest is published on the next iteration without the cross-thread wakeup
+            self.loop.call_soon(self._flush)
+
+        confirms = self.channel.publisher_confirms
+
+        for exchange, message, routing_key, mandatory, future in batch:
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                (exchange or self.channel.default_exchange).publish_nowait(
+                    message, routing_key, mandatory=mandatory,
+                    on_confirm=partial(self._on_confirm, future) if confirms else None,
+                )
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                if not confirms:
+                    future.set_result(True)
+
+
+__all__ = 'ThreadSafePublisher',
@@ -2,7 +2,7 @@ import asyncio
 from functools import partial
 
 
-__all__ = 'wait', 'copy_future', 'create_future', 'create_task', 'iscoroutinepartial'
+__all__ = 'wait', 'copy_future', 'create_future', 'create_task', 'iscoroutinepartial', 'topic_match'
 
 
 def iscoroutinepartial(fn):
@@ -91,3 +91,32 @@ def wait(tasks, loop=None):
     loop = loop or asyncio.get_event_loop()
     done = yield from asyncio.gather(*list(tasks), loop=loop)
     return tuple(map(lambda x: x.result() if isinstance(x, asyncio.Future) else x, done))
+
+
+def topic_match(pattern: str, routing_key: str) -> bool:
+    """ Match the routing key against the binding key of the topic exchange.
+    ``*`` substitutes exactly one word, ``#`` substitutes zero or more words.
+
+        >>> topic_match('logs.*.error', 'logs.db.error')
+        True
+        >>> topic_match('logs.#', 'logs')
+        True
+
+    :param pattern: binding key
+    :param routing_key: routing key of the message
+    :return: bool
+    """
+
+    def match(pattern_words, words):
+        if not pattern_words:
+            return not words
+
+        if pattern_words[0] == '#':
+            return any(match(pattern_words[1:], words[i:]) for i in range(len(words) + 1))
+
+        if not words:
+            return False
+
+        return pattern_words[0] in ('*', words[0]) and match(pattern_words[1:], words[1:])
+
+    return match(pattern.split('.'), routing_key.split('.'))
@@ -0,0 +1,7 @@
+""" Throughput and latency benchmarks of the publish, confirm and consume paths.
+
+Run all of them against the local broker stand-in::
+
+    python -m benchmarks --url local --output results.json
+
+"""
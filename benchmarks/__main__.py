@@ -0,0 +1,115 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import pika
+
+from aio_pika import connect
+
+from . import __doc__, consume, publish, rpc
+from .common import LocalBrokerProcess, SIZES, message_count, summarize
+
+
+BENCHMARKS = {}
+BENCHMARKS.update(publish.BENCHMARKS)
+BENCHMARKS.update(consume.BENCHMARKS)
+BENCHMARKS.update(rpc.BENCHMARKS)
+
+
+def names(value):
+    result = value.split(',')
+
+    for name in result:
+        if name not in BENCHMARKS:
+            raise argparse.ArgumentTypeError('Unknown benchmark %r' % name)
+
+    return result
+
+
+def sizes(value):
+    return [int(size) for size in value.split(',')]
+
+
+parser = argparse.ArgumentParser(
+    prog='python -m benchmarks', description=__doc__.strip().splitlines()[0],
+    formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+)
+parser.add_argument(
+    '--url', default=os.getenv('AMQP_URL', 'local'),
+    help="broker URL, 'local' starts aio_pika.testing.LocalBroker in a subprocess"
+)
+parser.add_argument('--benchmarks', type=names, default=sorted(BENCHMARKS), help='comma separated names')
+parser.add_argument('--sizes', type=sizes, default=list(SIZES), help='comma separated message sizes in bytes')
+parser.add_argument('--budget', type=int, default=64 * 1024 * 1024, help='bytes sent by one benchmark run')
+parser.add_argument('--max-count', type=int, default=5000, help='messages of one benchmark run')
+parser.add_argument('--window', type=int, default=32, help='unconfirmed messages, prefetch count and concurrent calls')
+parser.add_argument('--output', help='JSON file for the results, stdout when omitted')
+
+
+@asyncio.coroutine
+def run(url, arguments, loop):
+    connection = yield from connect(url, loop=loop)
+    results = []
+
+    try:
+        for name in arguments.benchmarks:
+            for size in arguments.sizes:
+                count = message_count(size, arguments.budget, arguments.max_count)
+                print('%s: %d messages of %d bytes' % (name, count, size), file=sys.stderr)
+
+                measurement = yield from BENCHMARKS[name](
+                    connection, size, count, window=arguments.window, loop=loop
+                )
+
+                results.append(summarize(name, size, measurement, window=arguments.window))
+    finally:
+        yield from connection.close()
+
+    return results
+
+
+def revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(__file__), stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    arguments = parser.parse_args()
+    loop = asyncio.get_event_loop()
+
+    if arguments.url == 'local':
+        with LocalBrokerProcess() as broker:
+            results = loop.run_until_complete(run(broker.url, arguments, loop))
+    else:
+        results = loop.run_until_complete(run(arguments.url, arguments, loop))
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'revision': revision(),
+            'pika': pika.__version__,
+            'time': int(time.time()),
+        },
+        'results': results,
+    }
+
+    if arguments.output:
+        with open(arguments.output, 'w') as fp:
+            json.dump(report, fp, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
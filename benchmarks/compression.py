@@ -0,0 +1,105 @@
+""" :mod:`aio_pika.compression` codecs benchmark.
+
+Measures the body and properties bytes on the wire and the CPU time per message of every registered codec
+for JSON event payloads of several sizes. The ``x-zdict`` codec uses the dictionary trained
+on other payloads of the same size::
+
+    python -m benchmarks.compression --sizes 256,1024,65536
+
+"""
+import argparse
+import json
+import random
+import time
+
+from pika import BasicProperties
+
+from aio_pika.compression import CODECS, ZDICT, Compression, train
+from .common import SIZES
+
+
+parser = argparse.ArgumentParser(prog='python -m benchmarks.compression', description=__doc__.strip().splitlines()[0])
+parser.add_argument('--sizes', default=','.join(map(str, SIZES[:5])), help='comma separated body sizes in bytes')
+parser.add_argument('--codecs', default=','.join(sorted(CODECS)), help='comma separated content encodings')
+parser.add_argument('--level', type=int, default=6, help='compression level')
+parser.add_argument('--samples', type=int, default=200, help='payloads the dictionary is trained on')
+parser.add_argument('--budget', type=int, default=64 * 1024 * 1024, help='bytes compressed per codec and size')
+
+
+def payload(size: int, seed: int = 0) -> bytes:
+    """ JSON events of about the size """
+
+    rnd = random.Random(size * 1000003 + seed)
+    events = []
+    length = 2
+
+    while length < size:
+        event = json.dumps({
+            'event': rnd.choice(('click', 'view', 'purchase')),
+            'user_id': rnd.randrange(10 ** 6),
+            'page': '/catalog/%d' % rnd.randrange(1000),
+            'timestamp': 1500000000 + rnd.randrange(10 ** 6),
+        })
+        events.append(event)
+        length += len(event) + 2
+
+    return ('[%s]' % ', '.join(events)).encode()[:max(size, 2)]
+
+
+def properties_size(properties: BasicProperties) -> int:
+    """ Bytes of the content header properties """
+
+    return len(b''.join(properties.encode()))
+
+
+def measure(encoding: str, body: bytes, level: int, count: int) -> dict:
+    compression = Compression(encoding, threshold=0, level=level)
+    codec = compression.codec
+    properties = BasicProperties()
+
+    started = time.perf_counter()
+
+    for _ in range(count):
+        compressed = codec.compress(body, level, properties)
+
+    compress_seconds = (time.perf_counter() - started) / count
+    started = time.perf_counter()
+
+    for _ in range(count):
+        codec.decompress(compressed, properties)
+
+    decompress_seconds = (time.perf_counter() - started) / count
+
+    # The codec headers are sent too
+    properties.content_encoding = encoding
+    wire_bytes = len(compressed) + properties_size(properties)
+    plain_bytes = len(body) + properties_size(BasicProperties())
+
+    return {
+        'benchmark': 'compression',
+        'codec': encoding,
+        'level': level,
+        'size': len(body),
+        'count': count,
+        'body_bytes': len(compressed),
+        'wire_bytes': wire_bytes,
+        'ratio': round(wire_bytes / plain_bytes, 4),
+        'compress_us': round(compress_seconds * 1e6, 2),
+        'decompress_us': round(decompress_seconds * 1e6, 2),
+    }
+
+
+def main():
+    arguments = parser.parse_args()
+
+    for size in map(int, arguments.sizes.split(',')):
+        body = payload(size)
+        ZDICT.add(train(payload(size, seed) for seed in range(1, arguments.samples + 1)))
+        count = max(10, min(100000, arguments.budget // size))
+
+        for encoding in arguments.codecs.split(','):
+            print(json.dumps(measure(encoding, body, arguments.level, count)))
+
+
+if __name__ == '__main__':
+    main()
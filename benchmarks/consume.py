@@ -0,0 +1,159 @@
+import asyncio
+import struct
+import time
+
+from aio_pika import Message
+
+from .common import Measurement, TIMESTAMP_SIZE, publish_window
+
+
+TIMESTAMP = struct.Struct('>d')
+
+
+def timestamped(size: int) -> Message:
+    return Message(TIMESTAMP.pack(time.perf_counter()) + b'x' * max(0, size - TIMESTAMP_SIZE))
+
+
+@asyncio.coroutine
+def prefill(channel, size: int, count: int, *, window: int, loop):
+    """ Declares an exclusive queue with ``count`` messages of the ``size`` """
+
+    queue = yield from channel.declare_queue(exclusive=True)
+    yield from publish_window(
+        channel.default_exchange, (Message(b'x' * size) for _ in range(count)), queue.name, window, loop
+    )
+    return queue
+
+
+@asyncio.coroutine
+def _consume(connection, size: int, count: int, coroutine: bool, *, window: int, loop, raw=False) -> Measurement:
+    channel = yield from connection.channel()
+    yield from channel.set_qos(prefetch_count=window)
+    queue = yield from channel.declare_queue(exclusive=True)
+
+    publisher = yield from connection.channel()
+
+    latencies = []
+    done = asyncio.Future(loop=loop)
+
+    def on_message(message):
+        latencies.append(time.perf_counter() - TIMESTAMP.unpack_from(message.body)[0])
+        message.ack()
+
+        if len(latencies) == count and not done.done():
+            done.set_result(None)
+
+    def on_raw_message(body, delivery_tag, routing_key, properties):
+        latencies.append(time.perf_counter() - TIMESTAMP.unpack_from(body)[0])
+        channel.ack(delivery_tag)
+
+        if len(latencies) == count and not done.done():
+            done.set_result(None)
+
+    callback = on_raw_message if raw else on_message
+
+    if coroutine:
+        callback = asyncio.coroutine(callback)
+
+    queue.consume(callback, raw=raw)
+
+    started = time.perf_counter()
+    yield from publish_window(
+        publisher.default_exchange, (timestamped(size) for _ in range(count)), queue.name, window, loop
+    )
+    yield from done
+    elapsed = time.perf_counter() - started
+
+    yield from publisher.close()
+    yield from channel.queue_delete(queue.name)
+    yield from channel.close()
+    return Measurement(count, elapsed, latencies)
+
+
+@asyncio.coroutine
+def consume_coroutine(connection, size: int, count: int, *, window: int, loop) -> Measurement:
+    """ :func:`aio_pika.queue.Queue.consume` with a coroutine callback. The latency is
+    measured from the publishing to the delivery. """
+
+    return (yield from _consume(connection, size, count, True, window=window, loop=loop))
+
+
+@asyncio.coroutine
+def consume_sync(connection, size: int, count: int, *, window: int, loop) -> Measurement:
+    """ :func:`aio_pika.queue.Queue.consume` with a plain function callback """
+
+    return (yield from _consume(connection, size, count, False, window=window, loop=loop))
+
+
+@asyncio.coroutine
+def consume_raw(connection, size: int, count: int, *, window: int, loop) -> Measurement:
+    """ :func:`aio_pika.queue.Queue.consume` ``(raw=True)`` with a plain function callback """
+
+    return (yield from _consume(connection, size, count, False, window=window, loop=loop, raw=True))
+
+
+@asyncio.coroutine
+def get(connection, size: int, count: int, *, window: int, loop) -> Measurement:
+    """ :func:`aio_pika.queue.Queue.get` of the prefilled queue """
+
+    channel = yield from connection.channel()
+    queue = yield from prefill(channel, size, count, window=window, loop=loop)
+    latencies = []
+
+    started = time.perf_counter()
+
+    for _ in range(count):
+        received = time.perf_counter()
+        yield from queue.get(no_ack=True)
+        latencies.append(time.perf_counter() - received)
+
+    elapsed = time.perf_counter() - started
+
+    yield from channel.queue_delete(queue.name)
+    yield from channel.close()
+    return Measurement(count, elapsed, latencies)
+
+
+@asyncio.coroutine
+def ack(connection, size: int, count: int, *, window: int, loop) -> Measurement:
+    """ :func:`aio_pika.message.IncomingMessage.ack` of the consumed messages """
+
+    channel = yield from connection.channel()
+    queue = yield from prefill(channel, size, count, window=window, loop=loop)
+
+    messages = []
+    received = asyncio.Future(loop=loop)
+
+    def on_message(message):
+        messages.append(message)
+
+        if len(messages) == count:
+            received.set_result(None)
+
+    queue.consume(on_message)
+    yield from received
+
+    latencies = []
+    started = time.perf_counter()
+
+    for message in messages:
+        acked = time.perf_counter()
+        message.ack()
+        latencies.append(time.perf_counter() - acked)
+
+    # Synchronous RPC after the acks means the broker has received all of them
+    yield from channel.declare_queue(queue.name, passive=True)
+    elapsed = time.perf_counter() - started
+
+    yield from channel.queue_delete(queue.name)
+    yield from channel.close()
+    return Measurement(count, elapsed, latencies)
+
+
+BENCHMARKS = {
+    'consume_coroutine': consume_coroutine,
+    'consume_sync': consume_sync,
+    'consume_raw': consume_raw,
+    'get': get,
+    'ack': ack,
+}
@@ -0,0 +1,156 @@
+""" :func:`aio_pika.queue.Queue.consume` dispatch microbenchmark.
+
+Measures deliveries per second from the pika consumer callback to the finished handler
+for every dispatch mode, without the broker and the network::
+
+    python -m benchmarks.dispatch --count 100000
+
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pika.spec import Basic, BasicProperties
+
+from aio_pika.common import FutureStore
+from aio_pika.queue import Queue
+
+
+parser = argparse.ArgumentParser(prog='python -m benchmarks.dispatch', description=__doc__.strip().splitlines()[0])
+parser.add_argument('--count', type=int, default=100000, help='deliveries of one run')
+parser.add_argument('--repeat', type=int, default=5, help='runs, the best one is reported')
+parser.add_argument('--batch', type=int, default=100, help='messages of one batch in the batched modes')
+
+
+BODY = b'{"event":"click"}'
+
+PROPERTIES = BasicProperties(content_type='application/json', delivery_mode=2, message_id='1')
+
+
+class PikaChannel:
+    """ The part of :class:`pika.channel.Channel` used by the consumer """
+
+    channel_number = 1
+
+    def __init__(self):
+        self.consumer = None
+
+    def basic_consume(self, consumer_callback, **kwargs):
+        self.consumer = consumer_callback
+        return 'ctag'
+
+    def basic_ack(self, delivery_tag=0, multiple=False):
+        pass
+
+    def basic_reject(self, delivery_tag=None, requeue=True):
+        pass
+
+
+def on_message(message):
+    message.ack()
+
+
+@asyncio.coroutine
+def on_message_coroutine(message):
+    message.ack()
+
+
+def on_batch(messages):
+    for message in messages:
+        message.ack()
+
+
+def on_raw(body, delivery_tag, routing_key, properties):
+    pass
+
+
+def executor_handler(message):
+    pass
+
+
+MODES = (
+    ('sync', on_message, {}),
+    ('coroutine', on_message_coroutine, {}),
+    ('executor', executor_handler, {'executor': True}),
+    ('batched', on_batch, {'batch': True}),
+    ('batched_executor', executor_handler, {'batch': True, 'executor': True}),
+    ('raw', on_raw, {'raw': True}),
+)
+
+
+def measure(loop, callback, kwargs: dict, count: int) -> float:
+    channel = PikaChannel()
+    queue = Queue(loop, FutureStore(loop=loop), channel, 'queue', False, False, False, None)
+    done = asyncio.Future(loop=loop)
+    lock = threading.Lock()
+    handled = 0
+
+    def counted(handler):
+        if asyncio.iscoroutinefunction(handler):
+            @asyncio.coroutine
+            def wrapper(item):
+                nonlocal handled
+                yield from handler(item)
+                handled += len(item) if isinstance(item, list) else 1
+
+                if handled == count:
+                    done.set_result(None)
+        else:
+            def wrapper(*args):
+                nonlocal handled
+                handler(*args)
+
+                # The executor modes call it from the threads
+                with lock:
+                    handled += len(args[0]) if isinstance(args[0], list) else 1
+
+                    if handled == count:
+                        loop.call_soon_threadsafe(done.set_result, None)
+
+        return wrapper
+
+    queue.consume(counted(callback), **kwargs)
+    consumer = channel.consumer
+
+    started = time.perf_counter()
+
+    for delivery_tag in range(1, count + 1):
+        consumer(channel, Basic.Deliver('ctag', delivery_tag, False, '', 'queue'), PROPERTIES, BODY)
+
+    loop.run_until_complete(done)
+    return time.perf_counter() - started
+
+
+def main():
+    arguments = parser.parse_args()
+    loop = asyncio.new_event_loop()
+    executor = ThreadPoolExecutor(4)
+
+    for name, callback, options in MODES:
+        kwargs = dict(options)
+
+        if kwargs.get('executor'):
+            kwargs['executor'] = executor
+
+        if kwargs.get('batch'):
+            kwargs['batch'] = arguments.batch
+
+        seconds = min(measure(loop, callback, kwargs, arguments.count) for _ in range(arguments.repeat))
+
+        print(json.dumps({
+            'benchmark': 'dispatch',
+            'mode': name,
+            'count': arguments.count,
+            'deliveries_per_second': round(arguments.count / seconds, 1),
+            'us_per_delivery': round(seconds / arguments.count * 1e6, 3),
+        }))
+
+    executor.shutdown()
+    loop.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+""" :class:`aio_pika.common.FutureStore` microbenchmark.
+
+Measures futures per second created and resolved in the store three levels deep
+(connection → channel → queue) and the memory held per pending operation::
+
+    python -m benchmarks.future_store --count 100000
+
+"""
+import argparse
+import asyncio
+import gc
+import json
+import time
+import tracemalloc
+
+from aio_pika.common import FutureStore
+
+
+parser = argparse.ArgumentParser(prog='python -m benchmarks.future_store', description=__doc__.strip().splitlines()[0])
+parser.add_argument('--count', type=int, default=100000, help='futures of one run')
+parser.add_argument('--repeat', type=int, default=5, help='runs, the best one is reported')
+
+
+def chain(loop) -> FutureStore:
+    return FutureStore(loop=loop).get_child().get_child()
+
+
+def resolve(loop, count: int) -> float:
+    store = chain(loop)
+    started = time.perf_counter()
+
+    for _ in range(count):
+        store.create_future().set_result(None)
+
+    # Done callbacks are called by the loop
+    loop.run_until_complete(asyncio.sleep(0, loop=loop))
+    return time.perf_counter() - started
+
+
+def pending_memory(loop, count: int) -> float:
+    store = chain(loop)
+    gc.collect()
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    futures = [store.create_future() for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    for future in futures:
+        future.cancel()
+
+    loop.run_until_complete(asyncio.sleep(0, loop=loop))
+    return (after - before) / count
+
+
+def main():
+    arguments = parser.parse_args()
+    loop = asyncio.new_event_loop()
+
+    seconds = min(resolve(loop, arguments.count) for _ in range(arguments.repeat))
+
+    result = {
+        'benchmark': 'future_store',
+        'count': arguments.count,
+        'futures_per_second': round(arguments.count / seconds, 1),
+        'bytes_per_pending_future': round(pending_memory(loop, arguments.count), 1),
+    }
+
+    loop.close()
+    print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+""" :mod:`aio_pika.message` microbenchmark.
+
+Measures the time per message of creating :class:`aio_pika.message.Message` and
+:class:`aio_pika.message.IncomingMessage` and of building the content header frame the way
+:func:`aio_pika.exchange.Exchange.publish` and pika do it::
+
+    python -m benchmarks.message --count 100000
+
+"""
+import argparse
+import json
+import time
+
+from pika.frame import Header
+from pika.spec import Basic, BasicProperties
+
+from aio_pika.message import DeliveryMode, IncomingMessage, LazyIncomingMessage, Message, MessageTemplate
+
+
+parser = argparse.ArgumentParser(prog='python -m benchmarks.message', description=__doc__.strip().splitlines()[0])
+parser.add_argument('--count', type=int, default=100000, help='messages per case')
+parser.add_argument('--repeat', type=int, default=5, help='runs, the best one is reported')
+
+
+BODY = b'{"event":"click"}'
+
+PROPERTIES = dict(
+    content_type='application/json',
+    delivery_mode=DeliveryMode.PERSISTENT,
+    headers={'source': 'benchmark', 'version': 1},
+    app_id='benchmarks',
+    expiration=60,
+)
+
+TEMPLATE = MessageTemplate(**PROPERTIES)
+
+ENVELOPE = Basic.Deliver(consumer_tag='ctag', delivery_tag=1, exchange='', routing_key='queue')
+
+INCOMING_PROPERTIES = BasicProperties(
+    content_type='application/json',
+    delivery_mode=2,
+    headers={'source': 'benchmark', 'version': 1},
+    app_id='benchmarks',
+    expiration='60000',
+    message_id='1',
+    timestamp=1500000000,
+)
+
+
+def message_body(i: int) -> Message:
+    return Message(BODY)
+
+
+def message_properties(i: int) -> Message:
+    return Message(BODY, message_id=str(i), timestamp=1500000000, **PROPERTIES)
+
+
+def message_trusted(i: int) -> Message:
+    return Message.trusted(
+        BODY, content_type='application/json', delivery_mode=2, headers=PROPERTIES['headers'],
+        app_id='benchmarks', expiration=60000, message_id=str(i), timestamp=1500000000,
+    )
+
+
+def incoming_message(i: int):
+    # A typical handler reads the body and the routing key only
+    message = IncomingMessage(None, ENVELOPE, INCOMING_PROPERTIES, BODY)
+    return message.body, message.routing_key
+
+
+def incoming_lazy(i: int):
+    message = LazyIncomingMessage(None, ENVELOPE, INCOMING_PROPERTIES, BODY)
+    return message.body, message.routing_key
+
+
+def header_message(i: int) -> bytes:
+    message = Message(BODY, message_id=str(i), timestamp=1500000000, **PROPERTIES)
+    return Header(1, len(message.body), message.properties).marshal()
+
+
+def header_template(i: int) -> bytes:
+    message = TEMPLATE.message(BODY, message_id=str(i), timestamp=1500000000)
+    return Header(1, len(message.body), message.properties).marshal()
+
+
+CASES = (
+    message_body,
+    message_properties,
+    message_trusted,
+    incoming_message,
+    incoming_lazy,
+    header_message,
+    header_template,
+)
+
+
+def measure(case, count: int) -> float:
+    started = time.perf_counter()
+
+    for i in range(count):
+        case(i)
+
+    return time.perf_counter() - started
+
+
+def main():
+    arguments = parser.parse_args()
+
+    for case in CASES:
+        seconds = min(measure(case, arguments.count) for _ in range(arguments.repeat))
+
+        print(json.dumps({
+            'benchmark': case.__name__,
+            'count': arguments.count,
+            'us_per_message': round(seconds / arguments.count * 1e6, 3),
+        }))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+import asyncio
+import time
+from collections import deque
+from functools import partial
+
+from aio_pika import Message
+from aio_pika.patterns import PackingPublisher
+
+from .common import Measurement, publish_window
+
+
+@asyncio.coroutine
+def publish_confirm(connection, size: int, count: int, *, window: int, loop) -> Measurement:
+    """ :func:`aio_pika.exchange.Exchange.publish` waiting for the publisher confirms """
+
+    channel = yield from connection.channel()
+    queue = yield from channel.declare_queue(exclusive=True)
+    body = b'x' * size
+
+    started = time.perf_counter()
+    latencies = yield from publish_window(
+        channel.default_exchange, (Message(body) for _ in range(count)), queue.name, window, loop
+    )
+    elapsed = time.perf_counter() - started
+
+    yield from channel.queue_delete(queue.name)
+    yield from channel.close()
+    return Measurement(count, elapsed, latencies)
+
+
+@asyncio.coroutine
+def publish_no_confirm(connection, size: int, count: int, *, window: int, loop) -> Measurement:
+    """ Fire-and-forget :func:`aio_pika.exchange.Exchange.publish` on a channel without confirms """
+
+    channel = yield from connection.channel(publisher_confirms=False)
+    queue = yield from channel.declare_queue(exclusive=True)
+    exchange = channel.default_exchange
+    body = b'x' * size
+    latencies = []
+
+    started = time.perf_counter()
+
+    for _ in range(count):
+        published = time.perf_counter()
+        yield from exchange.publish(Message(body), queue.name)
+        latencies.append(time.perf_counter() - published)
+
+    # Synchronous RPC after the messages means the broker has received all of them
+    yield from channel.declare_queue(queue.name, passive=True)
+    elapsed = time.perf_counter() - started
+
+    yield from channel.queue_delete(queue.name)
+    yield from channel.close()
+    return Measurement(count, elapsed, latencies)
+
+
+@asyncio.coroutine
+def publish_nowait(connection, size: int, count: int, *, window: int, loop) -> Measurement:
+    """ :func:`aio_pika.exchange.Exchange.publish_nowait` with a confirmation callback.
+    The latency is measured from the publishing to the confirmation. """
+
+    channel = yield from connection.channel()
+    queue = yield from channel.declare_queue(exclusive=True)
+    exchange = channel.default_exchange
+    body = b'x' * size
+
+    latencies = []
+    done = asyncio.Future(loop=loop)
+
+    def on_confirm(published, exc):
+        latencies.append(time.perf_counter() - published)
+
+        if len(latencies) == count and not done.done():
+            done.set_result(None)
+
+    started = time.perf_counter()
+
+    for _ in range(count):
+        exchange.publish_nowait(Message(body), queue.name, on_confirm=partial(on_confirm, time.perf_counter()))
+
+        # Let the confirmations in without waiting for them
+        if len(latencies) + window <= channel.metrics.published:
+            yield from asyncio.sleep(0, loop=loop)
+
+    yield from done
+    elapsed = time.perf_counter() - started
+
+    yield from channel.queue_delete(queue.name)
+    yield from channel.close()
+    return Measurement(count, elapsed, latencies)
+
+
+@asyncio.coroutine
+def publish_packed(connection, size: int, count: int, *, window: int, loop) -> Measurement:
+    """ :class:`aio_pika.patterns.PackingPublisher` with ``window`` records in one envelope.
+    The latency is measured from the record publishing to the envelope confirmation. """
+
+    channel = yield from connection.channel()
+    queue = yield from channel.declare_queue(exclusive=True)
+    publisher = PackingPublisher(channel.default_exchange, max_size=window * (size + 4), loop=loop)
+    body = b'x' * size
+    latencies = []
+    envelopes = deque()
+
+    def on_confirm(published, future):
+        latencies.append(time.perf_counter() - published)
+
+    started = time.perf_counter()
+
+    for _ in range(count):
+        future = publisher.publish(body, queue.name)
+        future.add_done_callback(partial(on_confirm, time.perf_counter()))
+
+        # Up to window unconfirmed envelopes
+        if not envelopes or envelopes[-1] is not future:
+            envelopes.append(future)
+
+            if len(envelopes) > window:
+                yield from envelopes.popleft()
+
+    yield from publisher.flush()
+    elapsed = time.perf_counter() - started
+
+    yield from channel.queue_delete(queue.name)
+    yield from channel.close()
+    return Measurement(count, elapsed, latencies)
+
+
+@asyncio.coroutine
+def publish_many(connection, size: int, count: int, *, window: int, loop) -> Measurement:
+    """ :func:`aio_pika.exchange.Exchange.publish_many` of one message to ``window`` routing keys at once.
+    The latency is measured from the publishing to the confirmation of all routing keys. """
+
+    channel = yield from connection.channel()
+    queue = yield from channel.declare_queue(exclusive=True)
+    exchange = channel.default_exchange
+    message = Message(b'x' * size)
+    latencies = []
+
+    started = time.perf_counter()
+
+    for published in range(0, count, window):
+        routing_keys = [queue.name] * min(window, count - published)
+
+        batch_started = time.perf_counter()
+        yield from exchange.publish_many(message, routing_keys)
+        latencies.extend([time.perf_counter() - batch_started] * len(routing_keys))
+
+    elapsed = time.perf_counter() - started
+
+    yield from channel.queue_delete(queue.name)
+    yield from channel.close()
+    return Measurement(count, elapsed, latencies)
+
+
+BENCHMARKS = {
+    'publish_confirm': publish_confirm,
+    'publish_many': publish_many,
+    'publish_no_confirm': publish_no_confirm,
+    'publish_nowait': publish_nowait,
+    'publish_packed': publish_packed,
+}
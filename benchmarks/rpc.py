@@ -0,0 +1,50 @@
+import asyncio
+import os
+import time
+
+from aio_pika import Message
+from aio_pika.patterns import RPCClient, RPCServer
+
+from .common import Measurement
+
+
+@asyncio.coroutine
+def rpc(connection, size: int, count: int, *, window: int, loop) -> Measurement:
+    """ Direct reply-to round trip between :class:`aio_pika.patterns.RPCClient`
+    and an echo :class:`aio_pika.patterns.RPCServer`, ``window`` calls at once """
+
+    server_channel = yield from connection.channel()
+    queue = yield from server_channel.declare_queue('benchmark.rpc.%d' % os.getpid(), auto_delete=True)
+
+    server = RPCServer(server_channel, lambda message: message.body, concurrency=window, loop=loop)
+    server.start(queue)
+
+    client = RPCClient((yield from connection.channel()), loop=loop)
+    yield from client.start()
+
+    body = b'x' * size
+    latencies = []
+    remaining = iter(range(count))
+
+    @asyncio.coroutine
+    def worker():
+        for _ in remaining:
+            called = time.perf_counter()
+            yield from client.call(Message(body), queue.name)
+            latencies.append(time.perf_counter() - called)
+
+    started = time.perf_counter()
+    yield from asyncio.gather(*[worker() for _ in range(window)], loop=loop)
+    elapsed = time.perf_counter() - started
+
+    yield from client.close()
+    yield from server.close()
+    yield from client.channel.close()
+    yield from server_channel.queue_delete(queue.name)
+    yield from server_channel.close()
+    return Measurement(count, elapsed, latencies)
+
+
+BENCHMARKS = {
+    'rpc': rpc,
+}
@@ -0,0 +1,82 @@
+""" :mod:`aio_pika.serialization` codecs benchmark.
+
+Measures the body bytes and the encode/decode time per message of every serializer,
+the ``json_stdlib`` row is the hand-rolled ``json.dumps(obj).encode()`` for comparison::
+
+    python -m benchmarks.serialization --count 100000
+
+"""
+import argparse
+import json
+import time
+from collections import namedtuple
+
+from aio_pika.serialization import StructSerializer, get_serializer
+
+
+parser = argparse.ArgumentParser(
+    prog='python -m benchmarks.serialization', description=__doc__.strip().splitlines()[0]
+)
+parser.add_argument('--count', type=int, default=100000, help='messages per serializer')
+
+
+Event = namedtuple('Event', ('user_id', 'timestamp', 'value'))
+
+EVENT = {'event': 'click', 'user_id': 123456, 'page': '/catalog/42', 'timestamp': 1500000000.25}
+
+
+class StdlibJSON:
+    content_type = 'json_stdlib'
+
+    @staticmethod
+    def dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
+
+    @staticmethod
+    def loads(body: bytes):
+        return json.loads(body.decode())
+
+
+CASES = (
+    (get_serializer('application/json'), EVENT),
+    (StdlibJSON, EVENT),
+    (get_serializer('text/plain'), json.dumps(EVENT)),
+    (get_serializer('application/octet-stream'), json.dumps(EVENT).encode()),
+    (StructSerializer('application/x-event', '<Qdd', Event._make), Event(123456, 1500000000.25, 1.5)),
+)
+
+
+def measure(serializer, obj, count: int) -> dict:
+    dumps, loads = serializer.dumps, serializer.loads
+    started = time.perf_counter()
+
+    for _ in range(count):
+        body = dumps(obj)
+
+    dumps_seconds = (time.perf_counter() - started) / count
+    started = time.perf_counter()
+
+    for _ in range(count):
+        loads(body)
+
+    loads_seconds = (time.perf_counter() - started) / count
+
+    return {
+        'benchmark': 'serialization',
+        'content_type': serializer.content_type,
+        'count': count,
+        'body_bytes': len(body),
+        'dumps_us': round(dumps_seconds * 1e6, 3),
+        'loads_us': round(loads_seconds * 1e6, 3),
+    }
+
+
+def main():
+    arguments = parser.parse_args()
+
+    for serializer, obj in CASES:
+        print(json.dumps(measure(serializer, obj, arguments.count)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+import asyncio
+import socket
+import pytest
+from pika.adapters.base_connection import BaseConnection
+from aio_pika.adapter import IOLoopAdapter
+from . import AsyncTestCase
+
+
+class TestCase(AsyncTestCase):
+    @pytest.mark.asyncio
+    def test_update_handler(self):
+        left, right = socket.socketpair()
+        self.addCleanup(left.close)
+        self.addCleanup(right.close)
+
+        received = []
+        adapter = IOLoopAdapter(self.loop)
+
+        def on_events(fd, events):
+            received.append(events)
+
+            if events & BaseConnection.READ:
+                left.recv(1024)
+
+        @asyncio.coroutine
+        def poll():
+            received.clear()
+            yield from asyncio.sleep(0.05, loop=self.loop)
+            return set(received)
+
+        adapter.add_handler(left.fileno(), on_events, BaseConnection.READ)
+        right.send(b'ping')
+        self.assertSetEqual((yield from poll()), {BaseConnection.READ})
+
+        # pika waits for the writable socket while the outbound buffer isn't flushed
+        adapter.update_handler(left.fileno(), BaseConnection.READ | BaseConnection.WRITE)
+        self.assertSetEqual((yield from poll()), {BaseConnection.WRITE})
+
+        adapter.update_handler(left.fileno(), BaseConnection.READ)
+        self.assertSetEqual((yield from poll()), set())
+
+        right.send(b'ping')
+        self.assertSetEqual((yield from poll()), {BaseConnection.READ})
+
+        adapter.remove_handler(left.fileno())
+        right.send(b'ping')
+        self.assertSetEqual((yield from poll()), set())
+        self.assertDictEqual(adapter.handlers, {})
@@ -1,5 +1,6 @@
 import asyncio
 import os
+import threading
 import uuid
 import logging
 import pytest
@@ -7,10 +8,15 @@ import shortuuid
 import time
 import unittest
 import aio_pika.exceptions
+from concurrent.futures import ThreadPoolExecutor
 from copy import copy
+from pika.spec import Basic, BasicProperties
 from aio_pika import connect, connect_url, Message, DeliveryMode
 from aio_pika.exceptions import ProbableAuthenticationError, MessageProcessError
+from aio_pika.common import FutureStore
 from aio_pika.exchange import ExchangeType
+from aio_pika.instrumentation import Stage
+from aio_pika.queue import Queue
 from aio_pika.tools import wait
 from unittest import mock
 from . import AsyncTestCase, AMQP_URL
@@ -20,14 +26,6 @@ log = logging.getLogger(__name__)
 
 
 class TestCase(AsyncTestCase):
-    def get_random_name(self, *args):
-        prefix = ['test']
-        for item in args:
-            prefix.append(item)
-        prefix.append(shortuuid.uuid())
-
-        return ".".join(prefix)
-
     @pytest.mark.asyncio
     def test_connection_url_deprecated(self):
         with self.assertWarns(DeprecationWarning):
@@ -96,6 +94,40 @@ class TestCase(AsyncTestCase):
 
         yield from wait((client.close(), client.closing), loop=self.loop)
 
+    @pytest.mark.asyncio
+    def test_declare_queue_counters(self):
+        client = yield from connect(AMQP_URL, loop=self.loop)
+
+        queue_name = self.get_random_name("test_counters")
+
+        channel = yield from client.channel()
+        queue = yield from channel.declare_queue(queue_name, auto_delete=True)
+
+        self.assertEqual(queue.message_count, 0)
+        self.assertEqual(queue.consumer_count, 0)
+
+        for _ in range(3):
+            yield from channel.default_exchange.publish(Message(b'test'), routing_key=queue_name)
+
+        passive_queue = yield from channel.declare_queue(queue_name, passive=True)
+
+        self.assertEqual(passive_queue.name, queue_name)
+        self.assertEqual(passive_queue.message_count, 3)
+        self.assertEqual(passive_queue.consumer_count, 0)
+
+        yield from queue.delete(if_empty=False)
+        yield from wait((client.close(), client.closing), loop=self.loop)
+
+    @pytest.mark.asyncio
+    def test_declare_queue_passive_missing(self):
+        client = yield from connect(AMQP_URL, loop=self.loop)
+        channel = yield from client.channel()
+
+        with self.assertRaises(aio_pika.exceptions.ChannelClosed):
+            yield from channel.declare_queue(self.get_random_name("test_missing"), passive=True)
+
+        yield from wait((client.close(), client.closing), loop=self.loop)
+
     @pytest.mark.asyncio
     def test_simple_publish_and_receive(self):
         client = yield from connect(AMQP_URL, loop=self.loop)
@@ -127,6 +159,34 @@ class TestCase(AsyncTestCase):
         yield from queue.delete()
         yield from wait((client.close(), client.closing), loop=self.loop)
 
+    @pytest.mark.asyncio
+    def test_publish_without_confirms(self):
+        client = yield from connect(AMQP_URL, loop=self.loop)
+        channel = yield from client.channel(publisher_confirms=False)
+        queue = yield from channel.declare_queue(self.get_random_name("without_confirms"))
+
+        body = bytes(shortuuid.uuid(), 'utf-8')
+        self.assertIsNone((yield from channel.default_exchange.publish(Message(body), queue.name)))
+        self.assertEqual(channel.metrics.published, 1)
+        self.assertEqual(channel.metrics.confirmations, {})
+
+        incoming_message = yield from queue.get(timeout=5)
+        incoming_message.ack()
+
+        self.assertEqual(incoming_message.body, body)
+        yield from queue.delete()
+
+        # Broken channel is closed together with the connection
+        with mock.patch('pika.channel.Channel.basic_publish', side_effect=RuntimeError):
+            with pytest.raises(aio_pika.exceptions.ChannelClosed):
+                yield from channel.default_exchange.publish(Message(body), queue.name)
+
+        with pytest.raises(aio_pika.exceptions.ChannelClosed):
+            yield from channel.default_exchange.publish(Message(body), queue.name)
+
+        with pytest.raises(ConnectionError):
+            yield from asyncio.wait_for(client.closing, 5, loop=self.loop)
+
     @pytest.mark.asyncio
     def test_incoming_message_info(self):
         client = yield from connect(AMQP_URL, loop=self.loop)
@@ -451,6 +511,161 @@ class TestCase(AsyncTestCase):
         yield from exchange.delete()
         yield from wait((client.close(), client.closing), loop=self.loop)
 
+    @pytest.mark.asyncio
+    def test_consume_raw(self):
+        client = yield from connect(AMQP_URL, loop=self.loop)
+        channel = yield from client.channel()
+        queue = yield from channel.declare_queue(self.get_random_name("raw"))
+
+        for i in range(3):
+            yield from channel.default_exchange.publish(Message(b'body', message_id=str(i)), queue.name)
+
+        received = []
+        f = asyncio.Future(loop=self.loop)
+
+        def on_message(body, delivery_tag, routing_key, properties):
+            received.append((body, routing_key, properties.message_id))
+
+            if len(received) == 2:
+                channel.ack_multiple(delivery_tag)
+            elif len(received) == 3:
+                channel.ack(delivery_tag)
+                f.set_result(None)
+
+        consumer_tag = queue.consume(on_message, raw=True)
+        yield from f
+
+        self.assertEqual(received, [(b'body', queue.name, str(i)) for i in range(3)])
+        self.assertEqual(queue.metrics.deliveries, 3)
+
+        yield from queue.cancel(consumer_tag)
+        yield from channel.default_exchange.publish(Message(b'coroutine'), queue.name)
+
+        f = asyncio.Future(loop=self.loop)
+
+        @asyncio.coroutine
+        def on_message_coroutine(body, delivery_tag, routing_key, properties):
+            channel.ack(delivery_tag)
+            f.set_result(body)
+
+        queue.consume(on_message_coroutine, raw=True)
+        self.assertEqual((yield from f), b'coroutine')
+
+        # Nothing is left unacknowledged
+        yield from channel.close()
+        channel = yield from client.channel()
+        queue = yield from channel.declare_queue(queue.name, passive=True)
+        self.assertEqual(queue.message_count, 0)
+
+        yield from channel.queue_delete(queue.name)
+        yield from wait((client.close(), client.closing), loop=self.loop)
+
+    @pytest.mark.asyncio
+    def test_consume_executor(self):
+        settled = asyncio.Future(loop=self.loop)
+        settled_tags = []
+
+        def observer(stage, channel_number, delivery_tag, timestamp):
+            if stage != Stage.ACK_SENT:
+                return
+
+            settled_tags.append(delivery_tag)
+
+            if len(settled_tags) == 2:
+                settled.set_result(None)
+
+        client = yield from connect(AMQP_URL, loop=self.loop, handler_timing=True, observer=observer)
+        channel = yield from client.channel()
+        queue = yield from channel.declare_queue(self.get_random_name("executor"))
+        executor = ThreadPoolExecutor(2)
+        self.addCleanup(executor.shutdown)
+
+        received = []
+        f = asyncio.Future(loop=self.loop)
+
+        def on_message(message):
+            received.append((message.body, threading.current_thread()))
+
+            if message.body == b'fail':
+                raise ValueError(message.body)
+
+            if len(received) == 2:
+                self.loop.call_soon_threadsafe(f.set_result, None)
+
+        with pytest.raises(TypeError):
+            queue.consume(asyncio.coroutine(on_message), executor=executor)
+
+        queue.consume(on_message, executor=executor)
+
+        yield from channel.default_exchange.publish(Message(b'fail'), queue.name)
+        yield from channel.default_exchange.publish(Message(b'body'), queue.name)
+        yield from f
+
+        self.assertEqual(sorted(body for body, _ in received), [b'body', b'fail'])
+        self.assertNotIn(threading.main_thread(), [thread for _, thread in received])
+
+        # Settled in the event loop after the callbacks
+        yield from settled
+        self.assertEqual((queue.metrics.acks, queue.metrics.rejects), (1, 1))
+        self.assertEqual(queue.metrics.handler_seconds.count, 2)
+
+        yield from channel.queue_delete(queue.name)
+        yield from wait((client.close(), client.closing), loop=self.loop)
+
+    @pytest.mark.asyncio
+    def test_consume_batch(self):
+        client = yield from connect(AMQP_URL, loop=self.loop)
+        channel = yield from client.channel()
+        queue = yield from channel.declare_queue(self.get_random_name("batch"), auto_delete=True)
+
+        for i in range(5):
+            yield from channel.default_exchange.publish(Message(str(i).encode()), queue.name)
+
+        batches = []
+        f = asyncio.Future(loop=self.loop)
+
+        @asyncio.coroutine
+        def on_messages(messages):
+            batches.append([message.body for message in messages])
+
+            for message in messages:
+                message.ack()
+
+            if sum(map(len, batches)) == 5:
+                f.set_result(None)
+
+        queue.consume(on_messages, batch=2)
+        yield from f
+
+        self.assertTrue(all(0 < len(batch) <= 2 for batch in batches))
+        self.assertEqual(sum(batches, []), [b'0', b'1', b'2', b'3', b'4'])
+        self.assertEqual(queue.metrics.acks, 5)
+
+        yield from channel.queue_delete(queue.name)
+        yield from wait((client.close(), client.closing), loop=self.loop)
+
+    @pytest.mark.asyncio
+    def test_consume_batch_flush(self):
+        channel = mock.Mock(channel_number=1)
+        queue = Queue(self.loop, FutureStore(loop=self.loop), channel, 'batch', False, False, False, None)
+
+        batches = []
+        properties = BasicProperties(delivery_mode=DeliveryMode.NOT_PERSISTENT)
+        queue.consume(lambda messages: batches.append([message.delivery_tag for message in messages]), batch=2)
+        consumer = channel.basic_consume.call_args[1]['consumer_callback']
+
+        def deliver(delivery_tag):
+            consumer(channel, Basic.Deliver('ctag', delivery_tag, False, '', 'batch'), properties, b'')
+
+        # The full batch is flushed right away, the flush scheduled by its first message is cancelled
+        self.loop.call_soon(deliver, 3)
+        deliver(1)
+        deliver(2)
+        self.loop.call_soon(deliver, 4)
+
+        yield from asyncio.sleep(0.01, loop=self.loop)
+        self.assertListEqual(batches, [[1, 2], [3, 4]])
+
     @pytest.mark.asyncio
     def test_ack_reject(self):
         client = yield from connect(AMQP_URL, loop=self.loop)
@@ -0,0 +1,94 @@
+import asyncio
+import concurrent.futures
+import threading
+import unittest
+import pytest
+from aio_pika import blocking, Message
+from aio_pika.exceptions import NackError
+from . import AMQP_URL, get_random_name
+
+
+class TestCase(unittest.TestCase):
+    get_random_name = staticmethod(get_random_name)
+
+    def create_connection(self) -> blocking.BlockingConnection:
+        connection = blocking.connect(AMQP_URL, timeout=10)
+        self.addCleanup(connection.close)
+        return connection
+
+    def test_publish_get(self):
+        connection = self.create_connection()
+        channel = connection.channel()
+
+        queue = channel.declare_queue(self.get_random_name("blocking"), auto_delete=True)
+        exchange = channel.declare_exchange(self.get_random_name("blocking"), auto_delete=True)
+        queue.bind(exchange, 'key')
+
+        self.assertTrue(exchange.publish(Message(b'first'), 'key'))
+
+        futures = [channel.default_exchange.publish_nowait(Message(b'%d' % i), queue.name) for i in range(100)]
+        done, not_done = concurrent.futures.wait(futures, timeout=10)
+
+        self.assertFalse(not_done)
+        self.assertTrue(all(future.result() for future in done))
+
+        message = queue.get()
+        self.assertEqual(message.body, b'first')
+        channel.ack(message)
+
+        message = queue.get()
+        self.assertEqual(message.body, b'0')
+        channel.reject(message, requeue=True)
+
+        self.assertEqual(queue.get(no_ack=True).body, b'0')
+
+        queue.unbind(exchange, 'key')
+        channel.queue_delete(queue.name)
+        channel.exchange_delete(exchange.name)
+        channel.close()
+
+    def test_nack(self):
+        connection = self.create_connection()
+        channel = connection.channel()
+
+        queue = channel.declare_queue(self.get_random_name("blocking"), auto_delete=True, arguments={
+            'x-max-length': 1,
+            'x-overflow': 'reject-publish',
+        })
+
+        channel.default_exchange.publish(Message(b'first'), queue.name)
+
+        with pytest.raises(NackError):
+            channel.default_exchange.publish(Message(b'second'), queue.name)
+
+        channel.queue_delete(queue.name)
+
+    def test_call_timeout(self):
+        connection = self.create_connection()
+        cancelled = threading.Event()
+
+        @asyncio.coroutine
+        def sleep():
+            try:
+                yield from asyncio.sleep(10, loop=connection.loop)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with pytest.raises(concurrent.futures.TimeoutError):
+            connection.call(sleep, timeout=0.1)
+
+        # The abandoned call doesn't keep running in the event loop thread
+        self.assertTrue(cancelled.wait(5))
+
+    def test_close(self):
+        connection = blocking.connect(AMQP_URL, timeout=10)
+
+        with connection:
+            self.assertTrue(connection._thread.is_alive())
+
+        self.assertFalse(connection._thread.is_alive())
+        self.assertTrue(connection.loop.is_closed())
+
+        # Closing twice is a no-op
+        connection.close()
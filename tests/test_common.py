@@ -0,0 +1,49 @@
+import asyncio
+import gc
+import pytest
+from aio_pika.common import FutureStore
+from . import AsyncTestCase
+
+
+class TestCase(AsyncTestCase):
+    @pytest.mark.asyncio
+    def test_reject_subtree(self):
+        root = FutureStore(loop=self.loop)
+        channel = root.get_child()
+        queue = channel.get_child()
+        sibling = root.get_child()
+
+        first = queue.create_future()
+        second = sibling.create_future()
+        done = queue.create_future()
+        done.set_result(True)
+
+        channel.reject_all(RuntimeError("closed"))
+        yield from asyncio.sleep(0, loop=self.loop)
+
+        with pytest.raises(RuntimeError):
+            first.result()
+
+        self.assertFalse(second.done())
+        self.assertTrue(done.result())
+
+        root.reject_all(RuntimeError("closed"))
+        yield from asyncio.sleep(0, loop=self.loop)
+
+        with pytest.raises(RuntimeError):
+            second.result()
+
+    @pytest.mark.asyncio
+    def test_pending_future_keeps_store(self):
+        root = FutureStore(loop=self.loop)
+
+        # The store of the forgotten queue is kept by its pending future only
+        future = root.get_child().get_child().create_future()
+        root.get_child()
+        gc.collect()
+
+        root.reject_all(RuntimeError("closed"))
+        yield from asyncio.sleep(0, loop=self.loop)
+
+        with pytest.raises(RuntimeError):
+            future.result()
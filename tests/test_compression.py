@@ -0,0 +1,250 @@
+import asyncio
+import json
+import zlib
+from unittest import mock
+import pytest
+from pika import BasicProperties
+from aio_pika import connect, Message
+from aio_pika.compression import (
+    CODECS, ZDICT, Codec, Compression, DeflateCodec, DictionaryCodec, GzipCodec, decompress, register, train
+)
+from aio_pika.exceptions import DecompressionLimitError
+from aio_pika.tools import wait
+from . import AsyncTestCase, AMQP_URL
+
+
+PAYLOAD = json.dumps([{'event': 'click', 'user': i, 'page': '/index.html'} for i in range(100)]).encode()
+
+
+def record(i: int) -> bytes:
+    return json.dumps({
+        'event': ('click', 'view', 'purchase')[i % 3],
+        'user_id': i * 7919 % 100000,
+        'session': 'session-%d' % (i * 104729 % 1000),
+        'page': '/catalog/products/%d' % (i % 50),
+        'user_agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36',
+    }).encode()
+
+
+class ReverseCodec(Codec):
+    __slots__ = ()
+
+    def compress(self, body, level, properties):
+        return body[::-1][:len(body) // 2]
+
+    def decompress(self, body, properties):
+        return body[::-1]
+
+
+class TestCase(AsyncTestCase):
+    def test_compression(self):
+        compression = Compression('deflate', threshold=100)
+
+        properties = BasicProperties()
+        self.assertEqual(compression.compress(b'small', properties), b'small')
+        self.assertIsNone(properties.content_encoding)
+
+        # Incompressible
+        body = bytes(range(256))
+        self.assertEqual(compression.compress(body, properties), body)
+        self.assertIsNone(properties.content_encoding)
+
+        compressed = compression.compress(PAYLOAD, properties)
+        self.assertEqual(properties.content_encoding, 'deflate')
+        self.assertEqual(zlib.decompress(compressed), PAYLOAD)
+        self.assertEqual(decompress(compressed, properties), (PAYLOAD, None))
+
+        # Already encoded
+        self.assertEqual(compression.compress(PAYLOAD, properties), PAYLOAD)
+
+        properties = BasicProperties(content_encoding='br')
+        self.assertEqual(decompress(b'data', properties), (b'data', 'br'))
+
+        properties = BasicProperties(content_encoding='gzip')
+
+        with self.assertLogs('aio_pika.compression', 'ERROR'):
+            self.assertEqual(decompress(b'broken', properties), (b'broken', 'gzip'))
+
+        with pytest.raises(ValueError):
+            Compression('br')
+
+    def test_register(self):
+        register(ReverseCodec('x-reverse'))
+        self.addCleanup(CODECS.pop, 'x-reverse')
+
+        properties = BasicProperties()
+        compressed = Compression('x-reverse', threshold=0).compress(b'abcd', properties)
+
+        self.assertEqual(compressed, b'dc')
+        self.assertEqual(decompress(compressed, properties), (b'cd', None))
+
+    def test_dictionary(self):
+        codec = DictionaryCodec('x-test-zdict')
+        register(codec)
+        self.addCleanup(CODECS.pop, 'x-test-zdict')
+
+        zdict = train(record(i) for i in range(200))
+        self.assertLessEqual(len(zdict), 16 * 1024)
+        self.assertLessEqual(len(train((record(i) for i in range(200)), size=100)), 100)
+
+        compression = Compression('x-test-zdict', threshold=0)
+        headers = {'key': 'value'}
+        properties = BasicProperties(headers=headers)
+
+        with pytest.raises(RuntimeError):
+            compression.compress(record(1000), properties)
+
+        dictionary_id = codec.add(zdict)
+        self.assertEqual(codec.add(zdict), dictionary_id)
+
+        body = record(1000)
+        compressed = compression.compress(body, properties)
+
+        self.assertEqual(properties.content_encoding, 'x-test-zdict')
+        self.assertEqual(properties.headers, {'key': 'value', DictionaryCodec.HEADER: dictionary_id})
+        self.assertEqual(headers, {'key': 'value'})
+        self.assertLess(len(compressed) * 2, len(zlib.compress(body)))
+        self.assertEqual(decompress(compressed, properties), (body, None))
+
+        # The consumer doesn't know the dictionary
+        properties.headers[DictionaryCodec.HEADER] = 'unknown'
+
+        with self.assertLogs('aio_pika.compression', 'ERROR'):
+            self.assertEqual(decompress(compressed, properties), (compressed, 'x-test-zdict'))
+
+        # Headers of the message sent uncompressed are untouched
+        properties = BasicProperties(headers=headers)
+        self.assertEqual(compression.compress(b'', properties), b'')
+        self.assertIs(properties.headers, headers)
+
+    def test_max_size(self):
+        body = b'\0' * 100000
+
+        for codec in (DeflateCodec('deflate', max_size=1000), GzipCodec('gzip', max_size=1000)):
+            properties = BasicProperties()
+            compressed = codec.compress(body, 9, properties)
+            self.assertLess(len(compressed), 1000)
+
+            with pytest.raises(DecompressionLimitError):
+                codec.decompress(compressed, properties)
+
+            codec.max_size = len(body)
+            self.assertEqual(codec.decompress(compressed, properties), body)
+
+            # The body of exactly max_size bytes is within the limit, one byte more isn't
+            codec.max_size = len(body) - 1
+
+            with pytest.raises(DecompressionLimitError):
+                codec.decompress(compressed, properties)
+
+            # The truncated stream isn't taken for the oversized one at the boundary
+            codec.max_size = len(body)
+
+            with pytest.raises(zlib.error):
+                codec.decompress(compressed[:-8], properties)
+
+            codec.max_size = None
+            self.assertEqual(codec.decompress(compressed, properties), body)
+
+            with pytest.raises(zlib.error):
+                codec.decompress(compressed[:-8], properties)
+
+        codec = DictionaryCodec('x-test-zdict', max_size=1000)
+        codec.add(b'\0' * 100)
+        properties = BasicProperties()
+        compressed = codec.compress(body, 9, properties)
+
+        with pytest.raises(DecompressionLimitError):
+            codec.decompress(compressed, properties)
+
+        # The oversized body isn't passed as is, unlike the broken one
+        properties = BasicProperties(content_encoding='deflate')
+
+        with mock.patch.object(CODECS['deflate'], 'max_size', 1000):
+            with pytest.raises(DecompressionLimitError):
+                decompress(zlib.compress(body), properties)
+
+    @pytest.mark.asyncio
+    def test_publish_dictionary(self):
+        dictionary_id = ZDICT.add(train(record(i) for i in range(200)), 'test', default=False)
+        self.addCleanup(ZDICT.dictionaries.pop, dictionary_id)
+        self.assertIsNone(ZDICT.default)
+
+        ZDICT.default = dictionary_id
+        self.addCleanup(setattr, ZDICT, 'default', None)
+
+        client = yield from connect(AMQP_URL, loop=self.loop)
+        channel = yield from client.channel(compression=Compression(ZDICT.name, threshold=0))
+        queue = yield from channel.declare_queue(self.get_random_name("compression"), auto_delete=True)
+
+        yield from channel.default_exchange.publish(Message(record(1000), headers={'key': 'value'}), queue.name)
+
+        message = yield from queue.get(timeout=5)
+        self.assertEqual(message.body, record(1000))
+        self.assertIsNone(message.content_encoding)
+        self.assertEqual(message.headers['key'], 'value')
+        self.assertLess(queue.metrics.delivered_bytes * 2, len(record(1000)))
+        message.ack()
+
+        yield from channel.queue_delete(queue.name)
+        yield from wait((client.close(), client.closing), loop=self.loop)
+
+    @pytest.mark.asyncio
+    def test_publish(self):
+        client = yield from connect(AMQP_URL, loop=self.loop)
+        channel = yield from client.channel(compression=Compression('gzip', threshold=1024))
+        queue = yield from channel.declare_queue(self.get_random_name("compression"), auto_delete=True)
+
+        yield from channel.default_exchange.publish(Message(PAYLOAD), queue.name)
+        yield from channel.default_exchange.publish(Message(b'small'), queue.name)
+
+        f = asyncio.Future(loop=self.loop)
+        channel.default_exchange.publish_nowait(Message(PAYLOAD), queue.name, on_confirm=f.set_result)
+        yield from f
+
+        for body in (PAYLOAD, b'small', PAYLOAD):
+            message = yield from queue.get(timeout=5)
+            self.assertEqual(message.body, body)
+            self.assertIsNone(message.content_encoding)
+            message.ack()
+
+        self.assertLess(queue.metrics.delivered_bytes, len(PAYLOAD))
+
+        yield from channel.queue_delete(queue.name)
+        yield from wait((client.close(), client.closing), loop=self.loop)
+
+    @pytest.mark.asyncio
+    def test_reject_oversized(self):
+        client = yield from connect(AMQP_URL, loop=self.loop)
+        channel = yield from client.channel(compression=Compression('deflate', threshold=1024))
+        queue = yield from channel.declare_queue(self.get_random_name("compression"), auto_delete=True)
+
+        patcher = mock.patch.object(CODECS['deflate'], 'max_size', len(PAYLOAD) - 1)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        for body in (PAYLOAD, b'small', PAYLOAD, b'last'):
+            yield from channel.default_exchange.publish(Message(body), queue.name)
+
+        with pytest.raises(DecompressionLimitError):
+            yield from queue.get(timeout=5)
+
+        received = []
+        f = asyncio.Future(loop=self.loop)
+
+        def handle(message):
+            message.ack()
+            received.append(message.body)
+
+            if message.body == b'last':
+                f.set_result(None)
+
+        # The oversized messages are rejected without the callback
+        queue.consume(handle)
+        yield from f
+
+        self.assertListEqual(received, [b'small', b'last'])
+        self.assertEqual((queue.metrics.acks, queue.metrics.rejects), (2, 2))
+
+        yield from channel.queue_delete(queue.name)
+        yield from wait((client.close(), client.closing), loop=self.loop)
@@ -0,0 +1,152 @@
+import asyncio
+import pytest
+from time import perf_counter
+from aio_pika import connect, Message
+from aio_pika.instrumentation import Histogram, LatencyRecorder, Stage
+from aio_pika.tools import wait
+from . import AsyncTestCase, AMQP_URL
+
+
+class TestCase(AsyncTestCase):
+    def test_histogram(self):
+        histogram = Histogram(significant_digits=2)
+
+        for value in range(1, 100001):
+            histogram.record(value * 1e-6)
+
+        self.assertEqual(histogram.count, 100000)
+        self.assertAlmostEqual(histogram.mean, 0.0500005)
+        self.assertAlmostEqual(histogram.max, 0.1)
+
+        for percent in (1, 50, 90, 99, 99.9):
+            expected = percent / 1000.
+            self.assertLessEqual(abs(histogram.percentile(percent) - expected) / expected, 0.01)
+
+        self.assertAlmostEqual(histogram.percentile(100), 0.1)
+        self.assertLess(len(histogram.counts), 2000)
+
+        other = Histogram(significant_digits=2)
+        other.record(1)
+        histogram.merge(other)
+
+        self.assertEqual(histogram.count, 100001)
+        self.assertEqual(histogram.max, 1)
+        self.assertIsNone(Histogram().percentile(50))
+
+        with pytest.raises(ValueError):
+            histogram.merge(Histogram(significant_digits=3))
+
+    def test_recorder(self):
+        recorder = LatencyRecorder()
+
+        recorder(Stage.PUBLISH_ENQUEUED, 1, 1, 1.0)
+        recorder(Stage.FRAMES_WRITTEN, 1, 1, 1.5)
+        recorder(Stage.DELIVERY_RECEIVED, 1, 1, 2.0)
+        recorder(Stage.HANDLER_START, 1, 1, 2.25)
+        recorder(Stage.ACK_SENT, 1, 1, 2.5)
+        recorder(Stage.CONFIRM_RECEIVED, 1, 1, 3.0)
+        recorder(Stage.HANDLER_END, 1, 1, 4.0)
+
+        # Unknown message
+        recorder(Stage.ACK_SENT, 1, 2, 5.0)
+
+        summary = recorder.summary(percentiles=(50,))
+
+        self.assertDictEqual({name: values['max'] for name, values in summary.items()}, {
+            'write': 0.5, 'confirm': 1.5, 'publish': 2.0,
+            'dispatch': 0.25, 'handler': 1.75, 'settle': 0.5,
+        })
+
+        self.assertFalse(recorder._pending)
+
+    def test_recorder_max_pending(self):
+        recorder = LatencyRecorder(max_pending=2)
+
+        for tag in range(3):
+            recorder(Stage.DELIVERY_RECEIVED, 1, tag, 0)
+
+        recorder(Stage.HANDLER_START, 1, 0, 1)
+        recorder(Stage.HANDLER_START, 1, 2, 1)
+
+        self.assertEqual(recorder.histograms['dispatch'].count, 1)
+        self.assertEqual(len(recorder._pending), 2)
+
+    @pytest.mark.asyncio
+    def test_stages(self):
+        events = []
+
+        def observer(stage, channel_number, delivery_tag, timestamp):
+            events.append((stage, channel_number, delivery_tag, timestamp))
+
+        client = yield from connect(AMQP_URL, loop=self.loop, observer=observer)
+        channel = yield from client.channel()
+        queue = yield from channel.declare_queue(self.get_random_name("instrumentation"), auto_delete=True)
+
+        built = []
+
+        class StampedMessage(Message):
+            @property
+            def properties(self):
+                built.append(perf_counter())
+                return super().properties
+
+        yield from channel.default_exchange.publish(StampedMessage(b'observed'), queue.name)
+
+        f = asyncio.Future(loop=self.loop)
+
+        @asyncio.coroutine
+        def handle(message):
+            message.ack()
+            f.set_result(None)
+
+        queue.consume(handle)
+        yield from f
+        yield from asyncio.sleep(0, loop=self.loop)
+
+        self.assertListEqual([event[0] for event in events], [
+            Stage.PUBLISH_ENQUEUED, Stage.FRAMES_WRITTEN, Stage.CONFIRM_RECEIVED,
+            Stage.DELIVERY_RECEIVED, Stage.HANDLER_START, Stage.ACK_SENT, Stage.HANDLER_END,
+        ])
+
+        self.assertSetEqual({event[1:3] for event in events}, {(int(str(channel)), 1)})
+
+        timestamps = [event[3] for event in events]
+        self.assertListEqual(timestamps, sorted(timestamps))
+
+        # The properties encoding is a part of the publishing
+        self.assertLess(timestamps[0], built[0])
+
+        yield from channel.queue_delete(queue.name)
+        yield from wait((client.close(), client.closing), loop=self.loop)
+
+    @pytest.mark.asyncio
+    def test_recorder_connection(self):
+        recorder = LatencyRecorder()
+        client = yield from connect(AMQP_URL, loop=self.loop, observer=recorder)
+        channel = yield from client.channel()
+        queue = yield from channel.declare_queue(self.get_random_name("instrumentation"), auto_delete=True)
+
+        for _ in range(10):
+            yield from channel.default_exchange.publish(Message(b'observed'), queue.name)
+
+        received = []
+        f = asyncio.Future(loop=self.loop)
+
+        def handle(message):
+            message.ack()
+            received.append(message)
+
+            if len(received) == 10:
+                f.set_result(None)
+
+        queue.consume(handle)
+        yield from f
+        yield from asyncio.sleep(0, loop=self.loop)
+
+        for histogram in recorder.histograms.values():
+            self.assertEqual(histogram.count, 10)
+
+        self.assertFalse(recorder._pending)
+
+        yield from channel.queue_delete(queue.name)
+        yield from wait((client.close(), client.closing), loop=self.loop)
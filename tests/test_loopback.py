@@ -0,0 +1,196 @@
+import asyncio
+import pytest
+from aio_pika import connect, Message, ExchangeType
+from aio_pika.instrumentation import Stage
+from aio_pika.tools import topic_match, wait
+from . import AsyncTestCase, AMQP_URL
+
+
+class TestCase(AsyncTestCase):
+    def test_topic_match(self):
+        self.assertTrue(topic_match('a.*.c', 'a.b.c'))
+        self.assertTrue(topic_match('a.#', 'a'))
+        self.assertTrue(topic_match('#.c', 'a.b.c'))
+        self.assertTrue(topic_match('#', 'a.b'))
+        self.assertFalse(topic_match('a.*', 'a'))
+        self.assertFalse(topic_match('a.*.c', 'a.b.b.c'))
+
+    @asyncio.coroutine
+    def create_queue(self, channel, exchange, routing_key):
+        queue = yield from channel.declare_queue(self.get_random_name("loopback"), auto_delete=True)
+        yield from queue.bind(exchange, routing_key)
+        return queue
+
+    @pytest.mark.asyncio
+    def test_short_circuit(self):
+        exchange_name = self.get_random_name("loopback")
+        client = yield from connect(AMQP_URL, loop=self.loop, loopback=[exchange_name])
+        channel = yield from client.channel()
+        exchange = yield from channel.declare_exchange(exchange_name, ExchangeType.TOPIC, auto_delete=True)
+        queue = yield from self.create_queue(channel, exchange, 'events.#')
+
+        f = asyncio.Future(loop=self.loop)
+        queue.consume(f.set_result)
+
+        self.assertTrue((yield from exchange.publish(Message(b'local', message_id='1'), 'events.created')))
+
+        message = yield from f
+        local_queue = client.loopback.queues[queue.name]
+
+        self.assertEqual(message.body, b'local')
+        self.assertEqual(message.message_id, '1')
+        self.assertEqual(message.routing_key, 'events.created')
+        self.assertEqual(message.exchange, exchange_name)
+        self.assertIn(message.delivery_tag, local_queue.unacked)
+
+        message.ack()
+        self.assertDictEqual(local_queue.unacked, {})
+
+        # Nothing went through the broker
+        declared = yield from channel.declare_queue(queue.name, passive=True)
+        self.assertEqual(declared.message_count, 0)
+
+        yield from channel.queue_delete(queue.name)
+        yield from channel.exchange_delete(exchange_name)
+        yield from wait((client.close(), client.closing), loop=self.loop)
+
+    @pytest.mark.asyncio
+    def test_requeue(self):
+        client = yield from connect(AMQP_URL, loop=self.loop, loopback=[''])
+        channel = yield from client.channel()
+        queue = yield from channel.declare_queue(self.get_random_name("loopback"), auto_delete=True)
+
+        deliveries = []
+        f = asyncio.Future(loop=self.loop)
+
+        def handle(message):
+            deliveries.append(message.redelivered)
+
+            if message.redelivered:
+                message.ack()
+                f.set_result(None)
+            else:
+                message.reject(requeue=True)
+
+        queue.consume(handle)
+
+        yield from channel.default_exchange.publish(Message(b'retry'), queue.name)
+        yield from f
+
+        self.assertListEqual(deliveries, [False, True])
+
+        yield from channel.queue_delete(queue.name)
+        yield from wait((client.close(), client.closing), loop=self.loop)
+
+    @pytest.mark.asyncio
+    def test_not_configured_exchange(self):
+        exchange_name = self.get_random_name("loopback")
+        client = yield from connect(AMQP_URL, loop=self.loop, loopback=[''])
+        channel = yield from client.channel()
+        exchange = yield from channel.declare_exchange(exchange_name, auto_delete=True)
+        queue = yield from self.create_queue(channel, exchange, 'key')
+
+        f = asyncio.Future(loop=self.loop)
+        queue.consume(f.set_result)
+
+        self.assertIsNone(client.loopback.route(exchange_name, 'direct', 'key'))
+
+        yield from exchange.publish(Message(b'remote'), 'key')
+
+        message = yield from f
+        self.assertEqual(message.body, b'remote')
+        self.assertDictEqual(client.loopback.queues[queue.name].unacked, {})
+        message.ack()
+
+        yield from channel.queue_delete(queue.name)
+        yield from channel.exchange_delete(exchange_name)
+        yield from wait((client.close(), client.closing), loop=self.loop)
+
+    @pytest.mark.asyncio
+    def test_channel_close_requeue(self):
+        client = yield from connect(AMQP_URL, loop=self.loop, loopback=[''])
+        channel = yield from client.channel()
+        queue_name = self.get_random_name("loopback")
+        queue = yield from channel.declare_queue(queue_name)
+
+        first = asyncio.Future(loop=self.loop)
+        queue.consume(first.set_result)
+
+        yield from channel.default_exchange.publish(Message(b'unacked'), queue_name)
+        yield from first
+
+        yield from channel.close()
+
+        channel = yield from client.channel()
+        queue = yield from channel.declare_queue(queue_name)
+
+        second = asyncio.Future(loop=self.loop)
+        queue.consume(second.set_result)
+
+        message = yield from second
+        self.assertEqual(message.body, b'unacked')
+        self.assertTrue(message.redelivered)
+        message.ack()
+
+        yield from channel.queue_delete(queue_name)
+        yield from wait((client.close(), client.closing), loop=self.loop)
+
+    @pytest.mark.asyncio
+    def test_instrumentation(self):
+        stages = []
+        client = yield from connect(
+            AMQP_URL, loop=self.loop, loopback=[''], handler_timing=True,
+            observer=lambda stage, channel_number, delivery_tag, timestamp: stages.append(stage),
+        )
+        channel = yield from client.channel()
+        queue = yield from channel.declare_queue(self.get_random_name("loopback"), auto_delete=True)
+
+        f = asyncio.Future(loop=self.loop)
+
+        @asyncio.coroutine
+        def handle(message):
+            message.ack()
+            f.set_result(message)
+
+        queue.consume(handle)
+
+        del stages[:]
+        self.assertTrue((yield from channel.default_exchange.publish(Message(b'local'), queue.name)))
+        yield from f
+
+        self.assertIn(Stage.DELIVERY_RECEIVED, stages)
+        self.assertIn(Stage.ACK_SENT, stages)
+        self.assertEqual((queue.metrics.deliveries, queue.metrics.delivered_bytes, queue.metrics.acks), (1, 5, 1))
+        self.assertEqual(queue.metrics.handler_seconds.count, 1)
+
+        yield from channel.queue_delete(queue.name)
+        yield from wait((client.close(), client.closing), loop=self.loop)
+
+    @pytest.mark.asyncio
+    def test_cancel_requeue(self):
+        client = yield from connect(AMQP_URL, loop=self.loop, loopback=[''])
+        channel = yield from client.channel()
+        queue_name = self.get_random_name("loopback")
+        queue = yield from channel.declare_queue(queue_name)
+
+        first = asyncio.Future(loop=self.loop)
+        consumer_tag = queue.consume(first.set_result)
+
+        yield from channel.default_exchange.publish(Message(b'unacked'), queue_name)
+        yield from first
+
+        # No other consumers, the message waits for the next one
+        yield from queue.cancel(consumer_tag)
+        local_queue = client.loopback.queues[queue_name]
+        self.assertEqual((len(local_queue.messages), local_queue.unacked), (1, {}))
+
+        second = asyncio.Future(loop=self.loop)
+        queue.consume(second.set_result)
+
+        message = yield from second
+        self.assertEqual(message.body, b'unacked')
+        self.assertTrue(message.redelivered)
+        message.ack()
+
+        yield from channel.queue_delete(queue_name)
+        yield from wait((client.close(), client.closing), loop=self.loop)
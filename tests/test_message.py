@@ -0,0 +1,192 @@
+import asyncio
+import zlib
+import pytest
+from pika.frame import Header
+from pika.spec import Basic, BasicProperties
+from aio_pika import connect, Message
+from aio_pika.compression import Compression
+from aio_pika.message import DeliveryMode, IncomingMessage, LazyIncomingMessage, MessageTemplate
+from aio_pika.tools import wait
+from . import AsyncTestCase, AMQP_URL
+
+
+PROPERTIES = dict(
+    content_type='application/json',
+    delivery_mode=DeliveryMode.PERSISTENT,
+    headers={'source': 'test'},
+    reply_to='reply',
+    expiration=10,
+    app_id='tests',
+)
+
+
+def header(message: Message) -> bytes:
+    return Header(1, len(message.body), message.properties).marshal()
+
+
+class TestCase(AsyncTestCase):
+    def test_trusted(self):
+        message = Message(b'body', message_id='1', timestamp=1500000000, correlation_id='c', **PROPERTIES)
+        trusted = Message.trusted(
+            b'body', content_type='application/json', delivery_mode=2, headers={'source': 'test'},
+            reply_to='reply', expiration=10000, app_id='tests', message_id='1', timestamp=1500000000,
+            correlation_id=b'c',
+        )
+
+        self.assertEqual(trusted.info(), message.info())
+        self.assertEqual(header(trusted), header(message))
+        self.assertIsInstance(Message(b'', delivery_mode=DeliveryMode.PERSISTENT).delivery_mode, int)
+
+        with pytest.raises(ValueError):
+            Message(b'', delivery_mode=3)
+
+        trusted.lock()
+
+        with pytest.raises(ValueError):
+            trusted.body = b''
+
+    def test_incoming(self):
+        envelope = Basic.Deliver(consumer_tag='ctag', delivery_tag=5, exchange='ex', routing_key='key')
+        properties = BasicProperties(
+            delivery_mode=2, expiration='1500', timestamp=1500000000, correlation_id='c', user_id='guest',
+        )
+
+        message = IncomingMessage(None, envelope, properties, b'body')
+
+        self.assertEqual(message.body, b'body')
+        self.assertEqual(message.delivery_mode, 2)
+        self.assertEqual(message.expiration, 1500)
+        self.assertEqual(message.info()['expiration'], 1.5)
+        self.assertEqual(message.timestamp, 1500000000)
+        self.assertEqual(message.correlation_id, b'c')
+        self.assertEqual(message.user_id, 'guest')
+        self.assertEqual(
+            (message.consumer_tag, message.delivery_tag, message.exchange, message.routing_key),
+            ('ctag', 5, 'ex', 'key'),
+        )
+        self.assertFalse(message.processed)
+        self.assertFalse(message.locked)
+
+    def test_lazy(self):
+        envelope = Basic.Deliver(consumer_tag='ctag', delivery_tag=5, exchange='ex', routing_key='key')
+        properties = BasicProperties(
+            content_encoding='deflate', headers={'a': 1}, delivery_mode=2, expiration='1500',
+            timestamp=1500000000, correlation_id='c', app_id='tests', cluster_id='cluster',
+        )
+        body = zlib.compress(b'body')
+
+        lazy = LazyIncomingMessage(None, envelope, properties, body)
+        eager = IncomingMessage(None, envelope, properties, body)
+
+        self.assertIsInstance(lazy, IncomingMessage)
+        self.assertEqual(lazy.routing_key, 'key')
+        self.assertEqual(lazy.content_encoding, None)
+        self.assertEqual(lazy.body, b'body')
+        self.assertEqual(lazy.info(), eager.info())
+
+        for name in ('cluster_id', 'consumer_tag', 'delivery_tag', 'exchange', 'redelivered', 'synchronous'):
+            self.assertEqual(getattr(lazy, name), getattr(eager, name))
+
+        lazy.message_id = 'changed'
+        self.assertEqual(lazy.message_id, 'changed')
+
+        # The assigned body or encoding isn't replaced by the decompression of the other one
+        lazy = LazyIncomingMessage(None, envelope, properties, body)
+        lazy.body = b'replaced'
+        self.assertEqual((lazy.content_encoding, lazy.body), (None, b'replaced'))
+
+        lazy = LazyIncomingMessage(None, envelope, properties, body)
+        lazy.content_encoding = 'identity'
+        self.assertEqual((lazy.body, lazy.content_encoding), (b'body', 'identity'))
+
+        lazy.lock()
+
+        with pytest.raises(ValueError):
+            lazy.routing_key = 'changed'
+
+    @pytest.mark.asyncio
+    def test_consume_lazy(self):
+        client = yield from connect(AMQP_URL, loop=self.loop)
+        channel = yield from client.channel()
+        queue = yield from channel.declare_queue(self.get_random_name("lazy"), auto_delete=True)
+
+        yield from channel.default_exchange.publish(Message(b'body', message_id='1'), queue.name)
+
+        f = asyncio.Future(loop=self.loop)
+        queue.consume(f.set_result, lazy=True)
+
+        message = yield from f
+
+        self.assertIsInstance(message, LazyIncomingMessage)
+        self.assertEqual((message.body, message.message_id, message.routing_key), (b'body', '1', queue.name))
+        message.ack()
+
+        self.assertTrue(message.processed)
+        self.assertEqual(queue.metrics.acks, 1)
+
+        yield from channel.queue_delete(queue.name)
+        yield from wait((client.close(), client.closing), loop=self.loop)
+
+    def test_template(self):
+        template = MessageTemplate(message_id='default', **PROPERTIES)
+
+        for kwargs in ({}, {'message_id': '1', 'correlation_id': 2, 'timestamp': 1500000000}):
+            message = template.message(bytearray(b'body'), **kwargs)
+            expected = Message(b'body', **dict(dict(PROPERTIES, message_id='default'), **kwargs))
+
+            self.assertEqual(message.body, b'body')
+            self.assertEqual(message.info(), expected.info())
+            self.assertEqual(header(message), header(expected))
+
+        # The changed message is encoded regularly
+        message = template.message(b'body', message_id='1')
+        message.priority = 5
+        self.assertEqual(header(message), header(Message(b'body', message_id='1', priority=5, **PROPERTIES)))
+
+        # The headers shared by the messages can't be changed in place
+        message = template.message(b'body')
+
+        with pytest.raises(TypeError):
+            message.headers['source'] = 'changed'
+
+        message.headers = dict(message.headers, source='changed')
+        expected = Message(b'body', message_id='default', **dict(PROPERTIES, headers={'source': 'changed'}))
+        self.assertEqual(header(message), header(expected))
+        self.assertEqual(template.message(b'body').headers, {'source': 'test'})
+
+        properties = template.message(b'body').properties
+        properties.content_encoding = 'gzip'
+        self.assertIn(b'gzip', Header(1, 4, properties).marshal())
+
+        message = template.message(b'body')
+        message.lock()
+
+        with pytest.raises(ValueError):
+            message.message_id = '2'
+
+    @pytest.mark.asyncio
+    def test_publish_template(self):
+        client = yield from connect(AMQP_URL, loop=self.loop)
+        channel = yield from client.channel(compression=Compression('deflate', threshold=100))
+        queue = yield from channel.declare_queue(self.get_random_name("template"), auto_delete=True)
+
+        template = MessageTemplate(**PROPERTIES)
+
+        yield from channel.default_exchange.publish(template.message(b'first', message_id='1'), queue.name)
+        yield from channel.default_exchange.publish(template.message(b'x' * 1000, message_id='2'), queue.name)
+
+        message = yield from queue.get(timeout=5)
+        self.assertEqual(message.body, b'first')
+        self.assertEqual(message.message_id, '1')
+        self.assertEqual(message.content_type, 'application/json')
+        self.assertEqual(message.headers, {'source': 'test'})
+        self.assertEqual(message.delivery_mode, DeliveryMode.PERSISTENT)
+        message.ack()
+
+        message = yield from queue.get(timeout=5)
+        self.assertEqual(message.body, b'x' * 1000)
+        self.assertEqual(message.message_id, '2')
+        message.ack()
+
+        yield from channel.queue_delete(queue.name)
+        yield from wait((client.close(), client.closing), loop=self.loop)
@@ -0,0 +1,115 @@
+import asyncio
+import pytest
+from aio_pika import connect, Message
+from aio_pika.metrics import Buckets, QueueMetrics, render
+from aio_pika.tools import wait
+from . import AsyncTestCase, AMQP_URL
+
+
+class TestCase(AsyncTestCase):
+    def test_render(self):
+        metrics = QueueMetrics('say "hi"\\')
+        metrics.deliveries = 2
+        metrics.handler_seconds = Buckets((0.1, 1))
+        metrics.handler_seconds.observe(0.1)
+        metrics.handler_seconds.observe(0.5)
+        metrics.handler_seconds.observe(2)
+
+        lines = render(metrics).splitlines()
+
+        self.assertIn('# TYPE aio_pika_deliveries_total counter', lines)
+        self.assertIn('aio_pika_deliveries_total{queue="say \\"hi\\"\\\\"} 2', lines)
+        self.assertIn('# TYPE aio_pika_handler_seconds histogram', lines)
+
+        self.assertListEqual([line.split('{')[1] for line in lines if line.startswith('aio_pika_handler')], [
+            'queue="say \\"hi\\"\\\\",le="0.1"} 1',
+            'queue="say \\"hi\\"\\\\",le="1"} 2',
+            'queue="say \\"hi\\"\\\\",le="+Inf"} 3',
+            'queue="say \\"hi\\"\\\\"} 2.6',
+            'queue="say \\"hi\\"\\\\"} 3',
+        ])
+
+    @pytest.mark.asyncio
+    def test_counters(self):
+        client = yield from connect(AMQP_URL, loop=self.loop, handler_timing=True)
+        channel = yield from client.channel()
+        queue = yield from channel.declare_queue(self.get_random_name("metrics"), auto_delete=True)
+        exchange = yield from channel.declare_exchange(self.get_random_name("metrics"), auto_delete=True)
+
+        for body in (b'ack', b'reject', b'ack'):
+            yield from channel.default_exchange.publish(Message(body), queue.name)
+
+        # Unroutable
+        yield from exchange.publish(Message(b'returned'), 'nowhere')
+
+        received = []
+        f = asyncio.Future(loop=self.loop)
+
+        @asyncio.coroutine
+        def handle(message):
+            if message.body == b'ack':
+                message.ack()
+            else:
+                message.reject()
+
+            received.append(message)
+
+            if len(received) == 3:
+                f.set_result(None)
+
+        queue.consume(handle)
+        yield from f
+        yield from asyncio.sleep(0, loop=self.loop)
+
+        self.assertEqual(channel.metrics.published, 4)
+        self.assertEqual(channel.metrics.confirmed, 4)
+        self.assertEqual(channel.metrics.returned, 1)
+        self.assertIs(queue.metrics, channel.metrics.queue(queue.name))
+        self.assertEqual(queue.metrics.deliveries, 3)
+        self.assertEqual(queue.metrics.delivered_bytes, 12)
+        self.assertEqual(queue.metrics.acks, 2)
+        self.assertEqual(queue.metrics.rejects, 1)
+        self.assertEqual(queue.metrics.handler_seconds.count, 3)
+
+        self.assertEqual(client.metrics.connections, 1)
+        self.assertGreater(client.metrics.bytes_sent, 0)
+        self.assertGreater(client.metrics.bytes_received, 0)
+
+        text = render(client.metrics)
+        labels = 'connection="%s",channel="%s"' % (client, channel)
+
+        self.assertIn('aio_pika_channels{connection="%s"} 1\n' % client, text)
+        self.assertIn('aio_pika_published_total{%s} 4\n' % labels, text)
+        self.assertIn('aio_pika_confirms_in_flight{%s} 0\n' % labels, text)
+        self.assertIn('aio_pika_acks_total{%s,queue="%s"} 2\n' % (labels, queue.name), text)
+        self.assertIn('aio_pika_handler_seconds_count{%s,queue="%s"} 3\n' % (labels, queue.name), text)
+
+        yield from channel.queue_delete(queue.name)
+        yield from channel.exchange_delete(exchange.name)
+        yield from channel.close()
+
+        self.assertNotIn('aio_pika_published_total', render(client.metrics))
+
+        yield from wait((client.close(), client.closing), loop=self.loop)
+
+    @pytest.mark.asyncio
+    def test_handler_timing_disabled(self):
+        client = yield from connect(AMQP_URL, loop=self.loop)
+        channel = yield from client.channel()
+        queue = yield from channel.declare_queue(self.get_random_name("metrics"), auto_delete=True)
+
+        yield from channel.default_exchange.publish(Message(b'body'), queue.name)
+
+        f = asyncio.Future(loop=self.loop)
+        queue.consume(f.set_result)
+
+        # The callback is called directly, without the timing wrapper
+        message = yield from f
+        message.ack()
+
+        self.assertEqual(queue.metrics.deliveries, 1)
+        self.assertEqual(queue.metrics.handler_seconds.count, 0)
+        self.assertNotIn('aio_pika_handler_seconds', render(client.metrics))
+
+        yield from channel.queue_delete(queue.name)
+        yield from wait((client.close(), client.closing), loop=self.loop)
@@ -0,0 +1,55 @@
+import asyncio
+import pytest
+from aio_pika import connect, Message
+from aio_pika.monitoring import QueueMonitor, QueueState
+from aio_pika.tools import wait
+from . import AsyncTestCase, AMQP_URL
+
+
+class TestCase(AsyncTestCase):
+    @pytest.mark.asyncio
+    def test_poll(self):
+        client = yield from connect(AMQP_URL, loop=self.loop)
+        channel = yield from client.channel()
+
+        first = yield from channel.declare_queue(self.get_random_name("monitor"), auto_delete=True)
+        second = yield from channel.declare_queue(self.get_random_name("monitor"), auto_delete=True)
+        missing = self.get_random_name("monitor", "missing")
+
+        yield from channel.default_exchange.publish(Message(b'test'), routing_key=second.name)
+
+        monitor = QueueMonitor(client, [first.name, missing, second.name], None, loop=self.loop)
+
+        states = yield from monitor.poll()
+
+        self.assertDictEqual(states, {
+            first.name: QueueState(first.name, 0, 0),
+            second.name: QueueState(second.name, 1, 0),
+        })
+
+        yield from monitor.close()
+        yield from second.purge()
+        yield from wait((client.close(), client.closing), loop=self.loop)
+
+    @pytest.mark.asyncio
+    def test_background_polling(self):
+        client = yield from connect(AMQP_URL, loop=self.loop)
+        channel = yield from client.channel()
+
+        queue = yield from channel.declare_queue(self.get_random_name("monitor"), auto_delete=True)
+
+        f = asyncio.Future(loop=self.loop)
+
+        def on_states(states):
+            if not f.done():
+                f.set_result(states)
+
+        monitor = QueueMonitor(client, [queue.name], on_states, interval=0.1, loop=self.loop)
+        monitor.start()
+
+        states = yield from f
+
+        self.assertEqual(states[queue.name].message_count, 0)
+
+        yield from monitor.close()
+        yield from wait((client.close(), client.closing), loop=self.loop)
@@ -0,0 +1,118 @@
+import asyncio
+from unittest import mock
+import pytest
+from aio_pika import connect, Message
+from aio_pika.exceptions import NackError
+from aio_pika.patterns import PackingPublisher, unpacking
+from aio_pika.patterns.packing import HEADER, pack, unpack
+from aio_pika.tools import wait
+from . import AsyncTestCase, AMQP_URL
+
+
+class TestCase(AsyncTestCase):
+    def test_pack(self):
+        records = [b'first', b'', b'x' * 70000]
+
+        self.assertEqual(unpack(pack(records)), records)
+        self.assertEqual(unpack(b''), [])
+
+        for body in (pack(records)[:2], pack(records)[:-1]):
+            with pytest.raises(ValueError):
+                unpack(body)
+
+    def test_properties(self):
+        for properties in ({'body': b'data'}, {'app_di': 'tests'}):
+            with pytest.raises(TypeError):
+                PackingPublisher(mock.Mock(), loop=self.loop, **properties)
+
+    @pytest.mark.asyncio
+    def test_failed_envelope(self):
+        @asyncio.coroutine
+        def publish(message, routing_key):
+            raise NackError([message])
+
+        publisher = PackingPublisher(mock.Mock(publish=publish), loop=self.loop)
+        future = publisher.publish(b'record', 'key')
+
+        with self.assertLogs('aio_pika.patterns.packing', 'ERROR'):
+            with pytest.raises(NackError):
+                yield from publisher.flush()
+
+        self.assertIsInstance(future.exception(), NackError)
+
+    @pytest.mark.asyncio
+    def test_publish(self):
+        client = yield from connect(AMQP_URL, loop=self.loop)
+        channel = yield from client.channel()
+        queue = yield from channel.declare_queue(self.get_random_name("packing"), auto_delete=True)
+
+        publisher = PackingPublisher(
+            channel.default_exchange, max_size=100, max_delay=0.05, loop=self.loop, app_id='tests',
+        )
+
+        # 7 records of 14 bytes with the length fit into the envelope
+        futures = [publisher.publish(('record %02d' % i).encode(), queue.name) for i in range(30)]
+        self.assertIs(futures[0], futures[6])
+        self.assertIsNot(futures[6], futures[7])
+
+        # The last envelope is published by the timer
+        yield from futures[-1]
+        self.assertEqual(channel.metrics.published, 5)
+
+        publisher.publish(b'flushed', queue.name)
+        yield from publisher.flush()
+        self.assertEqual(channel.metrics.published, 6)
+
+        yield from channel.default_exchange.publish(Message(b'plain'), queue.name)
+
+        records = []
+        f = asyncio.Future(loop=self.loop)
+
+        @asyncio.coroutine
+        def on_record(record, message):
+            self.assertEqual(message.app_id, 'tests' if HEADER in (message.headers or {}) else None)
+            records.append(record)
+
+            if record == b'plain':
+                f.set_result(None)
+
+        queue.consume(unpacking(on_record))
+        yield from f
+
+        self.assertEqual(records, [('record %02d' % i).encode() for i in range(30)] + [b'flushed', b'plain'])
+        self.assertEqual(queue.metrics.acks, 7)
+
+        yield from channel.queue_delete(queue.name)
+        yield from wait((client.close(), client.closing), loop=self.loop)
+
+    @pytest.mark.asyncio
+    def test_reject(self):
+        client = yield from connect(AMQP_URL, loop=self.loop)
+        channel = yield from client.channel()
+        queue = yield from channel.declare_queue(self.get_random_name("packing"), auto_delete=True)
+
+        publisher = PackingPublisher(channel.default_exchange, loop=self.loop)
+
+        for record in (b'first', b'fail', b'last'):
+            publisher.publish(record, queue.name)
+
+        yield from publisher.flush()
+
+        records = []
+        f = asyncio.Future(loop=self.loop)
+
+        def on_record(record, message):
+            records.append(record)
+
+            if record == b'fail':
+                self.loop.call_soon(f.set_result, None)
+                raise ValueError(record)
+
+        queue.consume(unpacking(on_record))
+        yield from f
+
+        self.assertEqual(records, [b'first', b'fail'])
+        self.assertEqual((queue.metrics.acks, queue.metrics.rejects), (0, 1))
+
+        yield from channel.queue_delete(queue.name)
+        yield from wait((client.close(), client.closing), loop=self.loop)
@@ -0,0 +1,113 @@
+import asyncio
+import unittest
+import pytest
+from aio_pika import connect, Message
+from aio_pika.prefetch import PrefetchController, estimate_prefetch
+from aio_pika.tools import wait
+from . import AsyncTestCase, AMQP_URL
+
+
+class EstimatePrefetchTestCase(unittest.TestCase):
+    def test_littles_law(self):
+        # 100 msg/s * (50ms + 10ms) = 6 messages
+        self.assertEqual(estimate_prefetch([(100, 0.05)], 0.01, headroom=1), 6)
+        self.assertEqual(estimate_prefetch([(100, 0.05), (50, 0.1)], 0.01, headroom=1), 12)
+        self.assertEqual(estimate_prefetch([(100, 0.05)], 0.01, headroom=2), 12)
+
+    def test_bounds(self):
+        self.assertEqual(estimate_prefetch([(0.1, 0.01)], 0.01, min_prefetch=5), 5)
+        self.assertEqual(estimate_prefetch([(10000, 1)], 0.01, max_prefetch=100), 100)
+
+    def test_invalid_bounds(self):
+        with self.assertRaises(ValueError):
+            PrefetchController(None, min_prefetch=10, max_prefetch=1, loop=asyncio.new_event_loop())
+
+
+class FlakyChannel:
+    """ Channel which fails the first ``basic.qos`` """
+
+    def __init__(self):
+        self.calls = []
+
+    @asyncio.coroutine
+    def set_qos(self, **kwargs):
+        self.calls.append(kwargs)
+
+        if len(self.calls) == 1:
+            raise asyncio.TimeoutError
+
+        return True
+
+
+class TestCase(AsyncTestCase):
+    @pytest.mark.asyncio
+    def test_failed_round_trip(self):
+        channel = FlakyChannel()
+        controller = PrefetchController(channel, min_prefetch=2, loop=self.loop)
+
+        @asyncio.coroutine
+        def handle(message):
+            pass
+
+        wrapped = controller.wrap(handle)
+
+        with self.assertRaises(asyncio.TimeoutError):
+            yield from controller.adjust()
+
+        self.assertIsNone(controller.round_trip_time)
+        yield from wrapped(None)
+
+        # The initial prefetch count is set again instead of estimating without the round trip time
+        first = yield from controller.adjust()
+        self.assertEqual((first.prefetch_count, first.throughput), (2, 0.))
+        self.assertIsNotNone(controller.round_trip_time)
+        self.assertEqual(len(channel.calls), 2)
+
+        decision = yield from controller.adjust()
+        self.assertEqual(decision.previous, 2)
+
+    @pytest.mark.asyncio
+    def test_adjust(self):
+        client = yield from connect(AMQP_URL, loop=self.loop)
+        channel = yield from client.channel()
+        queue = yield from channel.declare_queue(self.get_random_name("prefetch"), auto_delete=True)
+
+        decisions = []
+        controller = PrefetchController(
+            channel, min_prefetch=1, max_prefetch=10, on_decision=decisions.append, loop=self.loop
+        )
+
+        first = yield from controller.adjust()
+
+        self.assertEqual(first.prefetch_count, 1)
+        self.assertIsNotNone(controller.round_trip_time)
+
+        received = []
+        done = asyncio.Future(loop=self.loop)
+
+        @asyncio.coroutine
+        def handle(message):
+            yield from asyncio.sleep(0.01, loop=self.loop)
+            message.ack()
+            received.append(message)
+
+            if len(received) == 20:
+                done.set_result(True)
+
+        queue.consume(controller.wrap(handle))
+
+        for i in range(20):
+            yield from channel.default_exchange.publish(Message(b'test'), routing_key=queue.name)
+
+        yield from done
+
+        decision = yield from controller.adjust()
+
+        self.assertGreater(decision.throughput, 0)
+        self.assertGreaterEqual(decision.handler_time, 0.01)
+        self.assertTrue(1 <= decision.prefetch_count <= 10)
+        self.assertEqual(controller.prefetch_count, decision.prefetch_count)
+        self.assertListEqual(list(controller.decisions), [first, decision])
+        self.assertListEqual(decisions, [first, decision])
+
+        yield from wait((client.close(), client.closing), loop=self.loop)
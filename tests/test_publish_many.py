@@ -0,0 +1,144 @@
+import asyncio
+import os
+from unittest import mock
+import pytest
+from aio_pika import connect, Message
+from aio_pika.compression import Compression
+from aio_pika.exceptions import ConnectionClosed, NackError
+from aio_pika.exchange import ExchangeType
+from aio_pika.tools import wait
+from . import AsyncTestCase, AMQP_URL
+
+
+class TestCase(AsyncTestCase):
+    @pytest.mark.asyncio
+    def test_publish_many(self):
+        channel = yield from self.create_channel(compression=Compression('deflate', threshold=100))
+        exchange = yield from channel.declare_exchange(
+            self.get_random_name("many"), ExchangeType.DIRECT, auto_delete=True
+        )
+
+        queues = []
+
+        for tenant in range(3):
+            queue = yield from channel.declare_queue(self.get_random_name("many", str(tenant)), auto_delete=True)
+            yield from queue.bind(exchange, 'tenant.%d' % tenant)
+            queues.append(queue)
+
+        # Bigger than the frame_max, the body is split into several frames
+        body = os.urandom(100 * 1024) * 3
+        message = Message(body, message_id='1', headers={'source': 'test'})
+
+        results = yield from exchange.publish_many(message, ['tenant.0', 'tenant.1', 'tenant.2', 'tenant.0'])
+
+        self.assertEqual(results, [True] * 4)
+        self.assertEqual(channel.metrics.published, 4)
+        self.assertEqual(channel.metrics.confirmations, {})
+
+        for queue, count in zip(queues, (2, 1, 1)):
+            for _ in range(count):
+                received = yield from queue.get(timeout=5)
+                received.ack()
+
+                self.assertEqual(received.body, body)
+                self.assertEqual((received.message_id, received.headers), ('1', {'source': 'test'}))
+                self.assertEqual(received.routing_key, 'tenant.%d' % queues.index(queue))
+
+            yield from queue.delete(if_unused=False, if_empty=False)
+
+        self.assertEqual((yield from exchange.publish_many(message, [])), [])
+
+    @pytest.mark.asyncio
+    def test_nack(self):
+        channel = yield from self.create_channel()
+        full = yield from channel.declare_queue(self.get_random_name("many"), auto_delete=True, arguments={
+            'x-max-length': 1,
+            'x-overflow': 'reject-publish',
+        })
+        queue = yield from channel.declare_queue(self.get_random_name("many"), auto_delete=True)
+
+        results = yield from channel.default_exchange.publish_many(
+            Message(b'data'), [full.name, queue.name, full.name]
+        )
+
+        self.assertEqual(results[:2], [True, True])
+        self.assertIsInstance(results[2], NackError)
+        self.assertEqual((channel.metrics.confirmed, channel.metrics.nacked), (2, 1))
+
+        yield from channel.queue_delete(full.name)
+        yield from channel.queue_delete(queue.name)
+
+    @pytest.mark.asyncio
+    def test_without_confirms(self):
+        channel = yield from self.create_channel(publisher_confirms=False)
+        queue = yield from channel.declare_queue(self.get_random_name("many"), auto_delete=True)
+
+        results = yield from channel.default_exchange.publish_many(Message(b'data'), [queue.name] * 3)
+        self.assertEqual(results, [None] * 3)
+
+        declared = yield from channel.declare_queue(queue.name, passive=True)
+        self.assertEqual(declared.message_count, 3)
+
+        yield from channel.queue_delete(queue.name)
+
+    @pytest.mark.asyncio
+    def test_connection_state(self):
+        client = yield from connect(AMQP_URL, loop=self.loop)
+        self.addCleanup(lambda: wait((client.close(), client.closing), loop=self.loop))
+
+        channel = yield from client.channel()
+        queue = yield from channel.declare_queue(self.get_random_name("many"), auto_delete=True)
+        connection = client._connection
+
+        with mock.patch.object(type(connection), 'is_closed', new_callable=mock.PropertyMock, return_value=True):
+            with self.assertRaises(ConnectionClosed):
+                yield from channel.default_exchange.publish_many(Message(b'data'), [queue.name])
+
+        connection.params.backpressure_detection = True
+
+        with mock.patch.object(type(connection), '_detect_backpressure') as detect:
+            results = yield from channel.default_exchange.publish_many(Message(b'data'), [queue.name] * 2)
+
+        self.assertEqual(results, [True] * 2)
+        detect.assert_called_once_with()
+
+        yield from channel.queue_delete(queue.name)
+
+    @pytest.mark.asyncio
+    def test_loopback(self):
+        exchange_name = self.get_random_name("many")
+        client = yield from connect(AMQP_URL, loop=self.loop, loopback=[exchange_name])
+        self.addCleanup(lambda: wait((client.close(), client.closing), loop=self.loop))
+
+        channel = yield from client.channel()
+        exchange = yield from channel.declare_exchange(exchange_name, ExchangeType.DIRECT, auto_delete=True)
+        received = asyncio.Queue(loop=self.loop)
+
+        for tenant in range(2):
+            queue = yield from channel.declare_queue(self.get_random_name("many", str(tenant)), auto_delete=True)
+            yield from queue.bind(exchange, 'tenant.%d' % tenant)
+            queue.consume(received.put_nowait, no_ack=True)
+
+        remote = yield from channel.declare_queue(self.get_random_name("many"), auto_delete=True)
+        yield from remote.bind(exchange, 'remote')
+
+        message = Message(b'data', message_id='1')
+
+        # The properties are built once for the short-circuited and the published routing keys
+        with mock.patch.object(
+            Message, 'properties', new_callable=mock.PropertyMock, return_value=message.properties
+        ) as properties:
+            results = yield from exchange.publish_many(message, ['tenant.0', 'tenant.1', 'remote', 'tenant.0'])
+
+        self.assertEqual(results, [True] * 4)
+        self.assertEqual(properties.call_count, 1)
+
+        for _ in range(3):
+            incoming = yield from asyncio.wait_for(received.get(), 5, loop=self.loop)
+            self.assertEqual((incoming.body, incoming.message_id), (b'data', '1'))
+
+        incoming = yield from remote.get(timeout=5)
+        incoming.ack()
+        self.assertEqual(incoming.body, b'data')
+
+        yield from channel.queue_delete(remote.name)
@@ -0,0 +1,131 @@
+import asyncio
+from unittest import mock
+import pytest
+from pika import frame, spec
+from aio_pika import connect, Message
+from aio_pika.exceptions import ChannelClosed, NackError
+from aio_pika.tools import wait
+from . import AsyncTestCase, AMQP_URL
+
+
+class TestCase(AsyncTestCase):
+    @pytest.mark.asyncio
+    def test_confirm_callback(self):
+        channel = yield from self.create_channel()
+        queue = yield from channel.declare_queue(self.get_random_name("nowait"), auto_delete=True)
+
+        results = []
+        f = asyncio.Future(loop=self.loop)
+
+        def on_confirm(exc):
+            results.append(exc)
+
+            if len(results) == 100:
+                f.set_result(None)
+
+        tags = [
+            channel.default_exchange.publish_nowait(Message(b'%d' % i), queue.name, on_confirm=on_confirm)
+            for i in range(100)
+        ]
+
+        self.assertListEqual(tags, list(range(1, 101)))
+
+        yield from f
+
+        self.assertListEqual(results, [None] * 100)
+        self.assertEqual(channel.metrics.confirmed, 100)
+        self.assertEqual(channel.metrics.confirmations, {})
+
+        declared = yield from channel.declare_queue(queue.name, passive=True)
+        self.assertEqual(declared.message_count, 100)
+
+        yield from channel.queue_delete(queue.name)
+
+    @pytest.mark.asyncio
+    def test_nack(self):
+        channel = yield from self.create_channel()
+        queue = yield from channel.declare_queue(self.get_random_name("nowait"), auto_delete=True, arguments={
+            'x-max-length': 1,
+            'x-overflow': 'reject-publish',
+        })
+
+        f = asyncio.Future(loop=self.loop)
+
+        channel.default_exchange.publish_nowait(Message(b'first'), queue.name, on_confirm=f.set_result)
+        self.assertIsNone((yield from f))
+
+        f = asyncio.Future(loop=self.loop)
+        channel.default_exchange.publish_nowait(Message(b'second'), queue.name, on_confirm=f.set_result)
+        self.assertIsInstance((yield from f), NackError)
+
+        with self.assertLogs('aio_pika.channel', 'ERROR'):
+            channel.default_exchange.publish_nowait(Message(b'third'), queue.name)
+
+            # Synchronous RPC after the message waits for its confirmation
+            yield from channel.declare_queue(queue.name, passive=True)
+
+        with pytest.raises(NackError):
+            yield from channel.default_exchange.publish(Message(b'fourth'), queue.name)
+
+        self.assertEqual(channel.metrics.nacked, 3)
+
+        yield from channel.queue_delete(queue.name)
+
+    @pytest.mark.asyncio
+    def test_multiple_ack(self):
+        channel = yield from self.create_channel()
+        queue = yield from channel.declare_queue(self.get_random_name("nowait"), auto_delete=True)
+
+        results = []
+        publish = channel.default_exchange.publish_nowait
+
+        first = publish(Message(b'first'), queue.name, on_confirm=lambda exc: results.append((1, exc)))
+        second = publish(Message(b'second'), queue.name, on_confirm=lambda exc: results.append((2, exc)))
+        publish(Message(b'third'), queue.name, on_confirm=lambda exc: results.append((3, exc)))
+
+        # Broker acknowledges all messages up to the delivery tag at once
+        channel._on_delivery_confirmation(
+            frame.Method(int(str(channel)), spec.Basic.Ack(delivery_tag=second, multiple=True))
+        )
+
+        self.assertEqual(first, 1)
+        self.assertListEqual(results, [(1, None), (2, None)])
+        self.assertListEqual(list(channel.metrics.confirmations), [3])
+
+        yield from channel.declare_queue(queue.name, passive=True)
+        self.assertListEqual(results, [(1, None), (2, None), (3, None)])
+
+        yield from channel.queue_delete(queue.name)
+
+    @pytest.mark.asyncio
+    def test_without_confirms(self):
+        client = yield from connect(AMQP_URL, loop=self.loop)
+        channel = yield from client.channel(publisher_confirms=False)
+        queue = yield from channel.declare_queue(self.get_random_name("nowait"), auto_delete=True)
+
+        self.assertIsNone(channel.default_exchange.publish_nowait(Message(b'data'), queue.name))
+
+        with pytest.raises(RuntimeError):
+            channel.default_exchange.publish_nowait(Message(b'data'), queue.name, on_confirm=print)
+
+        yield from channel.queue_delete(queue.name)
+        yield from wait((client.close(), client.closing), loop=self.loop)
+
+    @pytest.mark.asyncio
+    def test_broken_channel(self):
+        client = yield from connect(AMQP_URL, loop=self.loop)
+        channel = yield from client.channel()
+        queue = yield from channel.declare_queue(self.get_random_name("nowait"), auto_delete=True)
+
+        # Like the publishing with the future, the broken channel is closed together with the connection
+        with mock.patch('pika.channel.Channel.basic_publish', side_effect=AttributeError):
+            with self.assertRaises(ChannelClosed):
+                channel.default_exchange.publish_nowait(Message(b'data'), queue.name)
+
+        with self.assertRaises(ChannelClosed):
+            channel.default_exchange.publish_nowait(Message(b'data'), queue.name)
+
+        self.assertEqual(channel.metrics.published, 0)
+
+        with self.assertRaises(ConnectionError):
+            yield from asyncio.wait_for(client.closing, 5, loop=self.loop)
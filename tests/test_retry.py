@@ -0,0 +1,118 @@
+import asyncio
+import pytest
+from aio_pika import connect, Message
+from aio_pika.patterns import DelayedRetry, exponential_delays
+from aio_pika.tools import wait
+from . import AsyncTestCase, AMQP_URL
+
+
+class TestCase(AsyncTestCase):
+    def test_exponential_delays(self):
+        self.assertTupleEqual(exponential_delays(1, 2, 5), (1, 2, 4, 8, 16))
+        self.assertTupleEqual(exponential_delays(0.5, 3, 3), (0.5, 1.5, 4.5))
+
+    @asyncio.coroutine
+    def create_queue(self, channel):
+        queue_name = self.get_random_name("retry")
+        queue = yield from channel.declare_queue(queue_name, auto_delete=True)
+        retry = DelayedRetry(channel, queue_name, delays=(0.05, 0.1), max_retries=3, durable=False)
+        yield from retry.declare()
+        return queue, retry
+
+    @asyncio.coroutine
+    def cleanup(self, channel, retry):
+        for tier in range(len(retry.delays)):
+            yield from channel.queue_delete(retry.tier_name(tier))
+        yield from channel.queue_delete(retry.parking_queue)
+
+    @pytest.mark.asyncio
+    def test_retry_until_success(self):
+        client = yield from connect(AMQP_URL, loop=self.loop)
+        channel = yield from client.channel()
+        queue, retry = yield from self.create_queue(channel)
+
+        attempts = []
+        f = asyncio.Future(loop=self.loop)
+
+        def handle(message):
+            attempts.append(DelayedRetry.attempts(message))
+
+            if len(attempts) < 3:
+                raise RuntimeError("Transient error")
+
+            f.set_result(message)
+
+        queue.consume(retry.wrap(handle))
+
+        yield from channel.default_exchange.publish(
+            Message(b'payload', headers={'foo': 'bar'}, message_id='1'), routing_key=queue.name
+        )
+
+        message = yield from f
+
+        self.assertListEqual(attempts, [0, 1, 2])
+        self.assertEqual(message.body, b'payload')
+        self.assertEqual(message.headers['foo'], 'bar')
+        self.assertEqual(message.message_id, '1')
+
+        yield from self.cleanup(channel, retry)
+        yield from wait((client.close(), client.closing), loop=self.loop)
+
+    @pytest.mark.asyncio
+    def test_parking(self):
+        client = yield from connect(AMQP_URL, loop=self.loop)
+        channel = yield from client.channel()
+        queue, retry = yield from self.create_queue(channel)
+
+        attempts = []
+
+        @asyncio.coroutine
+        def handle(message):
+            attempts.append(DelayedRetry.attempts(message))
+            raise RuntimeError("Permanent error")
+
+        queue.consume(retry.wrap(handle))
+
+        yield from channel.default_exchange.publish(Message(b'payload'), routing_key=queue.name)
+
+        parking = yield from channel.declare_queue(retry.parking_queue, passive=True)
+
+        while not parking.message_count:
+            yield from asyncio.sleep(0.05, loop=self.loop)
+            yield from parking.declare(passive=True)
+
+        self.assertListEqual(attempts, [0, 1, 2, 3])
+
+        parked = yield from parking.get()
+        parked.ack()
+
+        self.assertEqual(parked.headers[DelayedRetry.HEADER], 4)
+
+        yield from self.cleanup(channel, retry)
+        yield from wait((client.close(), client.closing), loop=self.loop)
+
+    @pytest.mark.asyncio
+    def test_not_retried(self):
+        client = yield from connect(AMQP_URL, loop=self.loop)
+        channel = yield from client.channel()
+        queue_name = self.get_random_name("retry")
+        queue = yield from channel.declare_queue(queue_name, auto_delete=True)
+        retry = DelayedRetry(channel, queue_name, delays=(0.05,), durable=False, exceptions=(RuntimeError,))
+        yield from retry.declare()
+
+        f = asyncio.Future(loop=self.loop)
+
+        def handle(message):
+            self.loop.call_soon(f.set_result, message)
+            raise ValueError("Not retried")
+
+        queue.consume(retry.wrap(handle))
+        yield from channel.default_exchange.publish(Message(b'payload'), routing_key=queue.name)
+
+        message = yield from f
+
+        self.assertTrue(message.processed)
+        self.assertEqual((queue.metrics.acks, queue.metrics.rejects), (0, 1))
+
+        yield from self.cleanup(channel, retry)
+        yield from wait((client.close(), client.closing), loop=self.loop)
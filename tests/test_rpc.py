@@ -0,0 +1,188 @@
+import asyncio
+from unittest import mock
+import pytest
+from aio_pika import connect, Message
+from aio_pika.exceptions import RPCError
+from aio_pika.patterns import RPCClient, RPCServer, correlation_ids
+from aio_pika.tools import wait
+from . import AsyncTestCase, AMQP_URL
+
+
+class TestCase(AsyncTestCase):
+    def test_correlation_ids(self):
+        ids = correlation_ids(b'x.')
+        self.assertListEqual([next(ids) for _ in range(18)][-3:], [b'x.f', b'x.10', b'x.11'])
+
+    @asyncio.coroutine
+    def create_server(self, channel, handler=None, **kwargs):
+        queue = yield from channel.declare_queue(self.get_random_name("rpc"), auto_delete=True)
+        server = RPCServer(channel, handler or (lambda message: message.body.upper()), loop=self.loop, **kwargs)
+        server.start(queue)
+        return queue, server
+
+    @pytest.mark.asyncio
+    def test_call(self):
+        client = yield from connect(AMQP_URL, loop=self.loop)
+        server_channel = yield from client.channel()
+        queue, server = yield from self.create_server(server_channel)
+
+        rpc = RPCClient((yield from client.channel()), loop=self.loop)
+        yield from rpc.start()
+
+        replies = yield from asyncio.gather(*[
+            rpc.call(Message(('ping %d' % i).encode()), queue.name, timeout=5) for i in range(10)
+        ], loop=self.loop)
+
+        self.assertListEqual([reply.body for reply in replies], [('PING %d' % i).encode() for i in range(10)])
+        self.assertDictEqual(rpc.futures, {})
+
+        yield from rpc.close()
+        yield from server.close()
+        yield from server_channel.queue_delete(queue.name)
+        yield from wait((client.close(), client.closing), loop=self.loop)
+
+    @pytest.mark.asyncio
+    def test_call_timeout(self):
+        client = yield from connect(AMQP_URL, loop=self.loop)
+        channel = yield from client.channel()
+        queue = yield from channel.declare_queue(self.get_random_name("rpc"), auto_delete=True)
+
+        rpc = RPCClient(channel, loop=self.loop)
+        yield from rpc.start()
+
+        with pytest.raises(asyncio.TimeoutError):
+            yield from rpc.call(Message(b'ping'), queue.name, timeout=0.1)
+
+        self.assertDictEqual(rpc.futures, {})
+
+        yield from rpc.close()
+        yield from channel.queue_delete(queue.name)
+        yield from wait((client.close(), client.closing), loop=self.loop)
+
+    @pytest.mark.asyncio
+    def test_close_rejects_pending(self):
+        client = yield from connect(AMQP_URL, loop=self.loop)
+        channel = yield from client.channel()
+        queue = yield from channel.declare_queue(self.get_random_name("rpc"), auto_delete=True)
+
+        rpc = RPCClient(channel, loop=self.loop)
+        yield from rpc.start()
+
+        call = asyncio.ensure_future(rpc.call(Message(b'ping'), queue.name), loop=self.loop)
+        yield from asyncio.sleep(0.1, loop=self.loop)
+
+        yield from rpc.close()
+
+        with pytest.raises(asyncio.CancelledError):
+            yield from call
+
+        with pytest.raises(RuntimeError):
+            yield from rpc.call(Message(b'ping'), queue.name)
+
+        # Restarted client doesn't watch the channel twice
+        with mock.patch.object(type(channel), 'add_close_callback') as add_close_callback:
+            yield from rpc.start()
+
+        self.assertFalse(add_close_callback.called)
+
+        yield from rpc.close()
+        yield from channel.queue_delete(queue.name)
+        yield from wait((client.close(), client.closing), loop=self.loop)
+
+    @pytest.mark.asyncio
+    def test_handler_error(self):
+        client = yield from connect(AMQP_URL, loop=self.loop)
+        channel = yield from client.channel()
+
+        @asyncio.coroutine
+        def handler(message):
+            raise ValueError(message.body)
+
+        queue, server = yield from self.create_server(channel, handler)
+
+        rpc = RPCClient(channel, loop=self.loop)
+        yield from rpc.start()
+
+        with pytest.raises(RPCError) as e:
+            yield from rpc.call(Message(b'ping'), queue.name, timeout=5)
+
+        self.assertEqual(e.value.args[0], 'ValueError')
+
+        yield from rpc.close()
+        yield from server.close()
+        yield from channel.queue_delete(queue.name)
+        yield from wait((client.close(), client.closing), loop=self.loop)
+
+    @pytest.mark.asyncio
+    def test_server_saturation(self):
+        client = yield from connect(AMQP_URL, loop=self.loop)
+        channel = yield from client.channel()
+        release = asyncio.Event(loop=self.loop)
+
+        @asyncio.coroutine
+        def handler(message):
+            yield from release.wait()
+            return b'done'
+
+        queue, server = yield from self.create_server(channel, handler, concurrency=2, requeue=False)
+
+        rpc = RPCClient(channel, loop=self.loop)
+        yield from rpc.start()
+
+        calls = [
+            asyncio.ensure_future(rpc.call(Message(b'ping'), queue.name, timeout=1), loop=self.loop)
+            for _ in range(5)
+        ]
+
+        yield from asyncio.sleep(0.1, loop=self.loop)
+
+        self.assertEqual(server.in_flight, 2)
+        self.assertEqual(server.rejected, 3)
+
+        release.set()
+
+        results = yield from asyncio.gather(*calls, loop=self.loop, return_exceptions=True)
+        replies = [result.body for result in results if not isinstance(result, Exception)]
+        self.assertListEqual(replies, [b'done', b'done'])
+
+        yield from rpc.close()
+        yield from server.close()
+        yield from channel.queue_delete(queue.name)
+        yield from wait((client.close(), client.closing), loop=self.loop)
+
+    @pytest.mark.asyncio
+    def test_server_saturation_backoff(self):
+        client = yield from connect(AMQP_URL, loop=self.loop)
+        channel = yield from client.channel()
+        release = asyncio.Event(loop=self.loop)
+
+        @asyncio.coroutine
+        def handler(message):
+            yield from release.wait()
+            return message.body
+
+        queue, server = yield from self.create_server(channel, handler, concurrency=1, backoff=0.1)
+
+        rpc = RPCClient(channel, loop=self.loop)
+        yield from rpc.start()
+
+        calls = [
+            asyncio.ensure_future(rpc.call(Message(body), queue.name, timeout=5), loop=self.loop)
+            for body in (b'first', b'second')
+        ]
+
+        yield from asyncio.sleep(0.35, loop=self.loop)
+
+        # The second request is requeued once per backoff instead of spinning
+        self.assertEqual(server.in_flight, 1)
+        self.assertIn(server.rejected, range(1, 5))
+
+        release.set()
+
+        replies = yield from asyncio.gather(*calls, loop=self.loop)
+        self.assertListEqual([reply.body for reply in replies], [b'first', b'second'])
+
+        yield from rpc.close()
+        yield from server.close()
+        yield from channel.queue_delete(queue.name)
+        yield from wait((client.close(), client.closing), loop=self.loop)
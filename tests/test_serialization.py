@@ -0,0 +1,89 @@
+import json
+from collections import namedtuple
+from unittest.mock import patch
+
+import pytest
+from aio_pika import connect, Message
+from aio_pika.serialization import SERIALIZERS, JSONSerializer, StructSerializer, dumps, loads, register
+from aio_pika.tools import wait
+from . import AsyncTestCase, AMQP_URL
+
+
+Point = namedtuple('Point', 'x y')
+
+
+class TestCase(AsyncTestCase):
+    def test_serializers(self):
+        self.assertEqual(dumps({'text': 'привет', 'n': [1, 2]}, 'application/json'),
+                         '{"text":"привет","n":[1,2]}'.encode())
+        self.assertEqual(loads(b'{"a": 1}', 'application/json; charset=utf-8'), {'a': 1})
+        self.assertEqual(dumps(bytearray(b'raw'), 'application/octet-stream'), b'raw')
+        self.assertEqual(loads(b'raw', None), b'raw')
+        self.assertEqual(loads('текст'.encode(), 'text/plain'), 'текст')
+        self.assertEqual(loads('текст'.encode(), 'text/plain; charset="UTF-8"'), 'текст')
+
+        # The charset of the content type is honoured
+        body = dumps('café', 'text/plain; charset=latin-1')
+        self.assertEqual(body, b'caf\xe9')
+        self.assertEqual(loads(body, 'text/plain; charset=ISO-8859-1'), 'café')
+
+        with pytest.raises(ValueError):
+            loads(b'data', 'text/plain; charset=unknown')
+
+        with pytest.raises(ValueError):
+            loads(b'data', 'application/x-unknown')
+
+        register(StructSerializer('application/x-point', '<dd', Point._make))
+        self.addCleanup(SERIALIZERS.pop, 'application/x-point')
+
+        body = dumps(Point(1.5, -2), 'application/x-point')
+        self.assertEqual(len(body), 16)
+        self.assertEqual(loads(body, 'application/x-point'), Point(1.5, -2.0))
+
+        register(StructSerializer('application/x-pair', '!HH'))
+        self.addCleanup(SERIALIZERS.pop, 'application/x-pair')
+        self.assertEqual(loads(b'\x00\x01\x00\x02', 'application/x-pair'), (1, 2))
+
+    def test_from_object(self):
+        message = Message.from_object({'event': 'click'}, message_id='1')
+
+        self.assertEqual(message.body, b'{"event":"click"}')
+        self.assertEqual(message.content_type, 'application/json')
+        self.assertEqual(message.message_id, '1')
+
+        message = Message.from_object('text', 'text/plain')
+        self.assertEqual((message.body, message.content_type), (b'text', 'text/plain'))
+
+        message = Message.from_object('café', 'text/plain; charset=latin-1')
+        self.assertEqual(message.body, b'caf\xe9')
+
+    @pytest.mark.asyncio
+    def test_decoded(self):
+        client = yield from connect(AMQP_URL, loop=self.loop)
+        channel = yield from client.channel()
+        queue = yield from channel.declare_queue(self.get_random_name("serialization"), auto_delete=True)
+
+        yield from channel.default_exchange.publish(Message.from_object({'event': 'click'}), queue.name)
+        yield from channel.default_exchange.publish(Message(b'raw'), queue.name)
+
+        with patch.object(JSONSerializer, 'loads', side_effect=lambda body: json.loads(body.decode())) as loads_:
+            message = yield from queue.get(timeout=5)
+
+            self.assertEqual(message.decoded, {'event': 'click'})
+            self.assertIs(message.decoded, message.decoded)
+            self.assertEqual(loads_.call_count, 1)
+
+        message.ack()
+
+        message = yield from queue.get(no_ack=True, timeout=5)
+        self.assertEqual(message.decoded, b'raw')
+
+        yield from channel.default_exchange.publish(
+            Message.from_object('café', 'text/plain; charset=latin-1'), queue.name
+        )
+
+        message = yield from queue.get(no_ack=True, timeout=5)
+        self.assertEqual(message.decoded, 'café')
+
+        yield from channel.queue_delete(queue.name)
+        yield from wait((client.close(), client.closing), loop=self.loop)
@@ -0,0 +1,232 @@
+import asyncio
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+import pytest
+from pika.spec import BasicProperties
+from aio_pika import connect
+from aio_pika.compression import Compression
+from aio_pika.patterns import StreamPublisher, StreamReassembler
+from aio_pika.patterns.streaming import StopAsyncIteration
+from aio_pika.tools import wait
+from . import AsyncTestCase, AMQP_URL
+
+
+PAYLOAD = os.urandom(9500)
+
+
+class Chunks:
+    """ Asynchronous iterator of the uneven pieces """
+
+    def __init__(self, data: bytes):
+        self.pieces = iter(data[i:i + 777] for i in range(0, len(data), 777))
+
+    def __aiter__(self):
+        return self
+
+    @asyncio.coroutine
+    def __anext__(self):
+        yield from asyncio.sleep(0)
+
+        try:
+            return next(self.pieces)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def chunk(stream_id: str, seq: int) -> tuple:
+    """ Body and properties of the 1000 bytes chunk of the ``PAYLOAD`` """
+
+    headers = {
+        StreamPublisher.HEADER_ID: stream_id,
+        StreamPublisher.HEADER_SEQ: seq,
+        StreamPublisher.HEADER_OFFSET: seq * 1000,
+        StreamPublisher.HEADER_LAST: seq == 9,
+    }
+
+    return PAYLOAD[seq * 1000:(seq + 1) * 1000], BasicProperties(headers=headers)
+
+
+class TestCase(AsyncTestCase):
+    @asyncio.coroutine
+    def consume(self, channel, queue, **kwargs):
+        streams = asyncio.Queue(loop=self.loop)
+
+        def on_stream(stream_id, file, properties):
+            streams.put_nowait((stream_id, file.read(), properties))
+
+        reassembler = StreamReassembler(channel, on_stream, loop=self.loop, **kwargs)
+        queue.consume(reassembler, raw=True)
+        return streams, reassembler
+
+    @asyncio.coroutine
+    def message_count(self, client, queue_name):
+        channel = yield from client.channel()
+        queue = yield from channel.declare_queue(queue_name, passive=True)
+        yield from channel.queue_delete(queue_name)
+        yield from channel.close()
+        return queue.message_count
+
+    @pytest.mark.asyncio
+    def test_stream(self):
+        client = yield from connect(AMQP_URL, loop=self.loop)
+        channel = yield from client.channel(compression=Compression('deflate', threshold=100))
+        queue = yield from channel.declare_queue(self.get_random_name("stream"))
+
+        streams, reassembler = yield from self.consume(channel, queue)
+        publisher = StreamPublisher(channel.default_exchange, chunk_size=1000, window=3, loop=self.loop)
+
+        sources = (io.BytesIO(PAYLOAD), Chunks(PAYLOAD), [PAYLOAD[:10], PAYLOAD[10:]], io.BytesIO())
+
+        for source in sources:
+            stream_id = yield from publisher.publish(source, queue.name, content_type='application/x-test')
+            received_id, body, properties = yield from streams.get()
+
+            self.assertEqual(received_id, stream_id)
+            self.assertEqual(body, b'' if source is sources[-1] else PAYLOAD)
+            self.assertEqual(properties.content_type, 'application/x-test')
+
+        self.assertEqual(reassembler.streams, {})
+
+        yield from channel.close()
+        self.assertEqual((yield from self.message_count(client, queue.name)), 0)
+        yield from wait((client.close(), client.closing), loop=self.loop)
+
+    @pytest.mark.asyncio
+    def test_resume(self):
+        client = yield from connect(AMQP_URL, loop=self.loop)
+        channel = yield from client.channel()
+        queue = yield from channel.declare_queue(self.get_random_name("stream"))
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        # The first chunks were written before the consumer was interrupted
+        with open(os.path.join(directory, 'resumed.part'), 'wb') as file:
+            file.write(PAYLOAD[:3000])
+
+        streams, reassembler = yield from self.consume(channel, queue, directory=directory)
+        publisher = StreamPublisher(channel.default_exchange, chunk_size=1000, loop=self.loop)
+
+        yield from publisher.publish(io.BytesIO(PAYLOAD), queue.name, stream_id='resumed')
+        stream_id, body, _ = yield from streams.get()
+
+        self.assertEqual((stream_id, body), ('resumed', PAYLOAD))
+        self.assertEqual(os.listdir(directory), [])
+
+        # The publishing is resumed from the fourth chunk of the unseekable source
+        yield from publisher.publish(iter([PAYLOAD]), queue.name, stream_id='tail', start=3)
+
+        while 'tail' not in reassembler.streams or reassembler.streams['tail'].last is None:
+            yield from asyncio.sleep(0.01, loop=self.loop)
+
+        stream = reassembler.streams['tail']
+        self.assertFalse(stream.complete)
+        stream.file.flush()
+
+        with open(os.path.join(directory, 'tail.part'), 'rb') as file:
+            self.assertEqual(file.read(), b'\0' * 3000 + PAYLOAD[3000:])
+
+        yield from channel.close()
+        self.assertEqual((yield from self.message_count(client, queue.name)), 7)
+        yield from wait((client.close(), client.closing), loop=self.loop)
+
+    @pytest.mark.asyncio
+    def test_resume_holes(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        # Only the sixth chunk was written before the consumer was interrupted
+        with open(os.path.join(directory, 'holes.part'), 'wb') as file:
+            file.write(b'\0' * 5000 + PAYLOAD[5000:6000])
+
+        f = asyncio.Future(loop=self.loop)
+        channel = mock.Mock()
+        reassembler = StreamReassembler(
+            channel, lambda stream_id, file, _: f.set_result(file.read()), directory=directory, loop=self.loop,
+        )
+
+        for seq in (7, 0, 5, 9, 2, 1, 8, 3, 6, 4):
+            body, properties = chunk('holes', seq)
+            reassembler(body, seq + 1, 'stream', properties)
+
+        self.assertEqual((yield from f), PAYLOAD)
+        self.assertEqual(sorted(c[0][0] for c in channel.ack.call_args_list), list(range(1, 11)))
+
+    @pytest.mark.asyncio
+    def test_duplicate(self):
+        f = asyncio.Future(loop=self.loop)
+        channel = mock.Mock()
+        reassembler = StreamReassembler(channel, lambda stream_id, file, _: f.set_result(file.read()), loop=self.loop)
+
+        body, properties = chunk('duplicate', 0)
+        reassembler(body, 1, 'stream', properties)
+
+        # Published again by the resumed publisher
+        reassembler(body, 2, 'stream', properties)
+        channel.ack.assert_called_once_with(1)
+
+        for seq in range(1, 10):
+            body, properties = chunk('duplicate', seq)
+            reassembler(body, seq + 2, 'stream', properties)
+
+        self.assertEqual((yield from f), PAYLOAD)
+        self.assertEqual(sorted(c[0][0] for c in channel.ack.call_args_list), list(range(1, 12)))
+        channel.reject.assert_not_called()
+
+    @pytest.mark.asyncio
+    def test_malformed_chunk(self):
+        f = asyncio.Future(loop=self.loop)
+        channel = mock.Mock()
+        reassembler = StreamReassembler(channel, lambda stream_id, file, _: f.set_result(file.read()), loop=self.loop)
+
+        for name, value in ((StreamPublisher.HEADER_SEQ, None), (StreamPublisher.HEADER_OFFSET, None),
+                            (StreamPublisher.HEADER_OFFSET, -1000), (StreamPublisher.HEADER_SEQ, '0')):
+            body, properties = chunk('malformed', 0)
+
+            if value is None:
+                del properties.headers[name]
+            else:
+                properties.headers[name] = value
+
+            with self.assertLogs('aio_pika.patterns.streaming', 'WARNING'):
+                reassembler(body, 100, 'stream', properties)
+
+            channel.reject.assert_called_once_with(100, requeue=False)
+            channel.reject.reset_mock()
+
+        self.assertEqual(reassembler.streams, {})
+
+        for seq in range(10):
+            body, properties = chunk('malformed', seq)
+            reassembler(body, seq + 1, 'stream', properties)
+
+        self.assertEqual((yield from f), PAYLOAD)
+        channel.reject.assert_not_called()
+
+    @pytest.mark.asyncio
+    def test_reject(self):
+        client = yield from connect(AMQP_URL, loop=self.loop)
+        channel = yield from client.channel()
+        queue = yield from channel.declare_queue(self.get_random_name("stream"))
+
+        f = asyncio.Future(loop=self.loop)
+
+        @asyncio.coroutine
+        def on_stream(stream_id, file, properties):
+            f.set_result(stream_id)
+            raise ValueError(stream_id)
+
+        queue.consume(StreamReassembler(channel, on_stream, loop=self.loop), raw=True)
+
+        publisher = StreamPublisher(channel.default_exchange, chunk_size=1000, loop=self.loop)
+        stream_id = yield from publisher.publish(io.BytesIO(PAYLOAD), queue.name)
+
+        self.assertEqual((yield from f), stream_id)
+
+        yield from channel.close()
+        self.assertEqual((yield from self.message_count(client, queue.name)), 0)
+        yield from wait((client.close(), client.closing), loop=self.loop)
@@ -0,0 +1,140 @@
+import asyncio
+import pytest
+from pika import frame, spec
+from aio_pika import connect, Message, ExchangeType
+from aio_pika.exceptions import ProbableAuthenticationError
+from aio_pika.testing import LocalBroker
+from aio_pika.tools import wait
+from . import AsyncTestCase
+
+
+class TestCase(AsyncTestCase):
+    @asyncio.coroutine
+    def setUp(self):
+        self.broker = LocalBroker(loop=self.loop)
+        yield from self.broker.start()
+
+        self.client = yield from connect(self.broker.url, loop=self.loop)
+        self.channel = yield from self.client.channel()
+
+    @asyncio.coroutine
+    def tearDown(self):
+        yield from wait((self.client.close(), self.client.closing), loop=self.loop)
+        yield from self.broker.close()
+
+    @asyncio.coroutine
+    def publish_and_count(self, exchange, queues, routing_key, **kwargs):
+        yield from exchange.publish(Message(b'routed', **kwargs), routing_key)
+
+        counts = []
+        for queue in queues:
+            declared = yield from self.channel.declare_queue(queue.name, passive=True)
+            counts.append(declared.message_count)
+
+        return counts
+
+    @pytest.mark.asyncio
+    def test_routing(self):
+        topic = yield from self.channel.declare_exchange('topic', ExchangeType.TOPIC)
+        fanout = yield from self.channel.declare_exchange('fanout', ExchangeType.FANOUT)
+        headers = yield from self.channel.declare_exchange('headers', ExchangeType.HEADERS)
+
+        first = yield from self.channel.declare_queue('first')
+        second = yield from self.channel.declare_queue('second')
+
+        yield from first.bind(topic, 'logs.*.error')
+        yield from second.bind(topic, 'logs.#')
+        yield from first.bind(fanout)
+        yield from second.bind(fanout)
+        yield from first.bind(headers, arguments={'x-match': 'all', 'level': 'error', 'app': 'db'})
+        yield from second.bind(headers, arguments={'x-match': 'any', 'level': 'error', 'app': 'db'})
+
+        queues = first, second
+
+        self.assertListEqual((yield from self.publish_and_count(topic, queues, 'logs.db.error')), [1, 1])
+        self.assertListEqual((yield from self.publish_and_count(topic, queues, 'logs.db')), [1, 2])
+        self.assertListEqual((yield from self.publish_and_count(fanout, queues, 'anything')), [2, 3])
+
+        self.assertListEqual(
+            (yield from self.publish_and_count(headers, queues, '', headers={'level': 'error'})), [2, 4]
+        )
+        self.assertListEqual(
+            (yield from self.publish_and_count(headers, queues, '', headers={'level': 'error', 'app': 'db'})), [3, 5]
+        )
+
+    @pytest.mark.asyncio
+    def test_get_and_qos(self):
+        queue = yield from self.channel.declare_queue('qos')
+
+        for i in range(5):
+            yield from self.channel.default_exchange.publish(Message(str(i).encode()), queue.name)
+
+        message = yield from queue.get()
+        self.assertEqual(message.body, b'0')
+        message.reject(requeue=True)
+
+        yield from self.channel.set_qos(prefetch_count=2)
+
+        received = []
+        queue.consume(received.append)
+        yield from asyncio.sleep(0.1, loop=self.loop)
+
+        # The requeued message comes first and marked as redelivered
+        self.assertListEqual([(m.body, m.redelivered) for m in received], [(b'0', True), (b'1', False)])
+
+        received[0].ack()
+        yield from asyncio.sleep(0.1, loop=self.loop)
+
+        self.assertListEqual([m.body for m in received], [b'0', b'1', b'2'])
+
+    @pytest.mark.asyncio
+    def test_dead_letter(self):
+        dead = yield from self.channel.declare_queue('dead')
+        yield from self.channel.declare_queue('ttl', arguments={
+            'x-message-ttl': 50,
+            'x-dead-letter-exchange': '',
+            'x-dead-letter-routing-key': 'dead',
+        })
+
+        yield from self.channel.default_exchange.publish(Message(b'expired'), 'ttl')
+        yield from asyncio.sleep(0.2, loop=self.loop)
+
+        message = yield from dead.get()
+        self.assertEqual(message.body, b'expired')
+        self.assertEqual(message.headers['x-death'][0]['reason'], 'expired')
+        self.assertEqual(message.headers['x-death'][0]['queue'], 'ttl')
+        message.ack()
+
+    @pytest.mark.asyncio
+    def test_auto_delete_exchange(self):
+        bound = yield from self.channel.declare_exchange('bound', auto_delete=True)
+        unbound = yield from self.channel.declare_exchange('unbound', auto_delete=True)
+
+        queue = yield from self.channel.declare_queue('auto')
+        yield from queue.bind(bound, 'key')
+        yield from queue.delete(if_unused=False, if_empty=False)
+
+        # Only the exchange which lost the binding is deleted
+        self.assertNotIn(bound.name, self.broker.exchanges)
+        self.assertIn(unbound.name, self.broker.exchanges)
+
+    @pytest.mark.asyncio
+    def test_wrong_credentials(self):
+        with pytest.raises(ProbableAuthenticationError):
+            yield from connect(self.broker.url.replace('guest:guest', 'guest:wrong'), loop=self.loop)
+
+    @pytest.mark.asyncio
+    def test_close_ok(self):
+        reader, writer = yield from asyncio.open_connection(self.broker.host, self.broker.port, loop=self.loop)
+        self.addCleanup(writer.close)
+
+        writer.write(b'AMQP\x00\x00\x09\x01')
+        yield from reader.readexactly(1)
+
+        connection, = [c for c in self.broker.connections if not c.opened]
+        connection.close(spec.CONNECTION_FORCED, "CONNECTION_FORCED - test")
+
+        # The broker closes the socket on the reply to its connection.close
+        writer.write(frame.Method(0, spec.Connection.CloseOk()).marshal())
+        yield from asyncio.wait_for(reader.read(), 5, loop=self.loop)
+        self.assertTrue(reader.at_eof())
@@ -0,0 +1,131 @@
+import asyncio
+import threading
+from unittest import mock
+import pytest
+from aio_pika import Message
+from aio_pika.exceptions import NackError
+from aio_pika.threadsafe import ThreadSafePublisher
+from . import AsyncTestCase
+
+
+class TestCase(AsyncTestCase):
+    @pytest.mark.asyncio
+    def test_publish_from_threads(self):
+        channel = yield from self.create_channel()
+        queue = yield from channel.declare_queue(self.get_random_name("threadsafe"), auto_delete=True)
+
+        publisher = ThreadSafePublisher(channel, max_batch=16, loop=self.loop)
+        wakeups = []
+        call_soon_threadsafe = self.loop.call_soon_threadsafe
+
+        def count_wakeups(callback, *args):
+            wakeups.append(callback)
+            return call_soon_threadsafe(callback, *args)
+
+        self.loop.call_soon_threadsafe = count_wakeups
+        self.addCleanup(delattr, self.loop, 'call_soon_threadsafe')
+
+        futures = []
+        lock = threading.Lock()
+
+        def submit(thread):
+            for i in range(50):
+                future = publisher.publish(Message(b'%d.%d' % (thread, i)), queue.name)
+
+                with lock:
+                    futures.append(future)
+
+        threads = [threading.Thread(target=submit, args=(thread,)) for thread in range(4)]
+
+        # The loop is blocked until all threads are done, so the whole batch needs one wakeup
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        results = yield from asyncio.gather(*[asyncio.wrap_future(f, loop=self.loop) for f in futures], loop=self.loop)
+
+        self.assertListEqual(results, [True] * 200)
+        # wrap_future() resolves the asyncio futures through call_soon_threadsafe() too
+        self.assertEqual(wakeups.count(publisher._flush), 1)
+
+        declared = yield from channel.declare_queue(queue.name, passive=True)
+        self.assertEqual(declared.message_count, 200)
+
+        yield from channel.queue_delete(queue.name)
+
+    @pytest.mark.asyncio
+    def test_nack(self):
+        channel = yield from self.create_channel()
+        queue = yield from channel.declare_queue(self.get_random_name("threadsafe"), auto_delete=True, arguments={
+            'x-max-length': 1,
+            'x-overflow': 'reject-publish',
+        })
+
+        publisher = ThreadSafePublisher(channel, loop=self.loop)
+
+        first = publisher.publish(Message(b'first'), queue.name)
+        second = publisher.publish(Message(b'second'), queue.name)
+
+        self.assertTrue((yield from asyncio.wrap_future(first, loop=self.loop)))
+
+        with pytest.raises(NackError):
+            yield from asyncio.wrap_future(second, loop=self.loop)
+
+        yield from channel.queue_delete(queue.name)
+
+    @pytest.mark.asyncio
+    def test_without_confirms(self):
+        channel = yield from self.create_channel(publisher_confirms=False)
+        queue = yield from channel.declare_queue(self.get_random_name("threadsafe"), auto_delete=True)
+        exchange = yield from channel.declare_exchange(self.get_random_name("threadsafe"), auto_delete=True)
+        yield from queue.bind(exchange, 'key')
+
+        publisher = ThreadSafePublisher(channel, loop=self.loop)
+
+        cancelled = publisher.publish(Message(b'cancelled'), queue.name, exchange=exchange)
+        cancelled.cancel()
+
+        future = publisher.publish(Message(b'data'), 'key', exchange=exchange)
+        self.assertTrue((yield from asyncio.wrap_future(future, loop=self.loop)))
+
+        message = yield from queue.get(timeout=5)
+        self.assertEqual(message.body, b'data')
+        message.ack()
+
+        yield from channel.queue_delete(queue.name)
+        yield from channel.exchange_delete(exchange.name)
+
+    def test_flush_scheduled_once(self):
+        publisher = ThreadSafePublisher(mock.Mock(publisher_confirms=False), loop=self.loop)
+
+        class Lock:
+            """ Runs the hook right after the release, like the thread preempted there """
+
+            def __init__(self):
+                self.lock = threading.Lock()
+                self.hook = None
+
+            def __enter__(self):
+                self.lock.acquire()
+
+            def __exit__(self, *exc_info):
+                self.lock.release()
+                hook, self.hook = self.hook, None
+
+                if hook is not None:
+                    hook()
+
+        publisher._lock = Lock()
+        publisher.publish(Message(b'first'), 'key')
+
+        publisher._lock.hook = lambda: publisher.publish(Message(b'second'), 'key')
+
+        with mock.patch.object(self.loop, 'call_soon') as call_soon, \
+                mock.patch.object(self.loop, 'call_soon_threadsafe') as call_soon_threadsafe:
+            publisher._flush()
+
+        # The second message is flushed by the wakeup of its publish() only
+        call_soon_threadsafe.assert_called_once_with(publisher._flush)
+        self.assertFalse(call_soon.called)